@@ -0,0 +1,449 @@
+"""Bounded model checking. Instead of enumerating every combination of always-block paths per
+cycle, each always block is encoded once as guarded If updates over the signals of a frame, which
+gives one transition relation for the module. The relation is unrolled K times with fresh symbols
+per cycle (name@k), and every assertion (a system call reached inside an always block, as the
+path-based engine treats them) is checked with one incremental solver call per depth.
+
+Only the top module is encoded; outputs of submodule instances are free inputs every cycle, and a
+counterexample that needs particular values of them is reported as unconfirmed."""
+
+import z3
+from z3 import BitVec, BitVecVal, If, And, Or, Not, Concat, Extract, LShR
+from pyverilog.vparser.ast import Always, Assign, Block, IfStatement, CaseStatement, CasexStatement, CasezStatement
+from pyverilog.vparser.ast import SingleStatement, SystemCall, BlockingSubstitution, NonblockingSubstitution, EventStatement, Initial
+from pyverilog.vparser.ast import Identifier, IntConst, Constant, Partselect, Pointer, Concat as VConcat, Repeat, Cond
+from pyverilog.vparser.ast import UnaryOperator, Operator, Unot, Ulnot, Uminus, Uplus, Uand, Unand, Uor, Unor, Uxor, Uxnor
+from pyverilog.vparser.ast import Land, Lor, Eq, NotEq, Eql, NotEql, LessThan, GreaterThan, LessEq, GreaterEq
+from pyverilog.vparser.ast import Plus, Minus, Times, Divide, Mod, Sll, Srl, Sla, Sra, And as VAnd, Or as VOr, Xor, Xnor
+from pyverilog.vparser.ast import ModuleDef, InstanceList, Ioport, Input, Decl
+from helpers.bv_encoding import infer_widths, signal_width, parse_int_literal, literal_width, bv_const
+from helpers.bv_encoding import resize, align, align_arith, to_bool, to_bv
+from helpers.query_log import timed_check
+from .execution_manager import ExecutionManager
+from .scheduler import Schedule, changing_signals
+from .levelize import CombNetwork
+from .properties import PropertyMonitor, property_key, system_calls, VIOLATED, HOLDS
+from .signal_index import identifiers, reads_and_writes
+import time
+
+ARITH = {Plus: lambda a, b: a + b, Minus: lambda a, b: a - b, Times: lambda a, b: a * b, Sll: lambda a, b: a << b}
+BITWISE = {VAnd: lambda a, b: a & b, VOr: lambda a, b: a | b, Xor: lambda a, b: a ^ b, Xnor: lambda a, b: ~(a ^ b),
+Srl: LShR, Sra: lambda a, b: a >> b, Sla: lambda a, b: a << b, Divide: z3.UDiv, Mod: z3.URem}
+COMPARE = {Eq: lambda a, b: a == b, NotEq: lambda a, b: a != b, Eql: lambda a, b: a == b, NotEql: lambda a, b: a != b,
+LessThan: z3.ULT, GreaterThan: z3.UGT, LessEq: z3.ULE, GreaterEq: z3.UGE}
+
+
+class Encoder:
+    """Lowers the expressions and statements of one module over a frame (signal -> Z3 term)."""
+    def __init__(self, m: ExecutionManager, module: ModuleDef):
+        self.m = m
+        self.module = module.name
+        self.unsupported = set()
+        self.fresh = 0
+        # the frame a block started from: what a signal holds on the branches that don't write it
+        self.hold = {}
+
+    def width(self, name) -> int:
+        return signal_width(self.m, name, self.module)
+
+    def havoc(self, node, width: int = 1):
+        """A fresh value for something the encoder doesn't model; it over-approximates."""
+        self.unsupported.add(type(node).__name__)
+        self.fresh += 1
+        return BitVec(f"havoc{self.fresh}", width)
+
+    def undefined(self, name):
+        """A fresh value for a signal on the branches that leave it unassigned."""
+        self.fresh += 1
+        return BitVec(f"{name}@undef{self.fresh}", self.width(name))
+
+    def constant(self, value):
+        const, width = parse_int_literal(value)
+        if const is None:
+            return None
+        return bv_const(const, width if width is not None else max(literal_width(const), 32))
+
+    def index(self, node, frame):
+        if isinstance(node, IntConst):
+            return parse_int_literal(node.value)[0]
+        if isinstance(node, Identifier) and node.name in self.m.param_values.get(self.module, {}):
+            return self.m.param_values[self.module][node.name]
+        return None
+
+    def expr(self, node, frame):
+        if isinstance(node, Identifier):
+            if node.name in frame:
+                return frame[node.name]
+            if node.name in self.m.param_values.get(self.module, {}):
+                return bv_const(self.m.param_values[self.module][node.name], 32)
+            return self.havoc(node, self.width(node.name))
+        if isinstance(node, (IntConst, Constant)):
+            value = self.constant(node.value)
+            return value if value is not None else self.havoc(node, 32)
+        if isinstance(node, Partselect):
+            base = to_bv(self.expr(node.var, frame))
+            msb, lsb = self.index(node.msb, frame), self.index(node.lsb, frame)
+            if msb is None or lsb is None or max(msb, lsb) >= base.size():
+                return self.havoc(node, 1)
+            return Extract(max(msb, lsb), min(msb, lsb), base)
+        if isinstance(node, Pointer):
+            base = self.expr(node.var, frame)
+            if z3.is_array(base):
+                # an unpacked array element, see helpers/memory_model.py
+                return z3.Select(base, resize(to_bv(self.expr(node.ptr, frame)), base.domain().size()))
+            base = to_bv(base)
+            ptr = self.index(node.ptr, frame)
+            if ptr is not None:
+                return Extract(ptr, ptr, base) if ptr < base.size() else BitVecVal(0, 1)
+            shift = resize(to_bv(self.expr(node.ptr, frame)), base.size())
+            return Extract(0, 0, LShR(base, shift))
+        if isinstance(node, VConcat):
+            parts = [to_bv(self.expr(item, frame)) for item in node.list]
+            return Concat(parts) if len(parts) > 1 else parts[0]
+        if isinstance(node, Repeat):
+            times = self.index(node.times, frame)
+            value = to_bv(self.expr(node.value, frame))
+            if times is None or times < 1:
+                return self.havoc(node, value.size())
+            return Concat([value] * times) if times > 1 else value
+        if isinstance(node, Cond):
+            cond = to_bool(self.expr(node.cond, frame))
+            t, f = align(to_bv(self.expr(node.true_value, frame)), to_bv(self.expr(node.false_value, frame)))
+            return If(cond, t, f)
+        if isinstance(node, UnaryOperator):
+            right = self.expr(node.right, frame)
+            if isinstance(node, Ulnot):
+                return Not(to_bool(right))
+            right = to_bv(right)
+            if isinstance(node, Unot):
+                return ~right
+            if isinstance(node, Uminus):
+                return -right
+            if isinstance(node, Uplus):
+                return right
+            ones = BitVecVal((1 << right.size()) - 1, right.size())
+            reduce = {Uand: right == ones, Unand: right != ones, Uor: to_bool(right), Unor: Not(to_bool(right))}
+            if type(node) in reduce:
+                return reduce[type(node)]
+            if isinstance(node, (Uxor, Uxnor)):
+                bits = Extract(0, 0, right)
+                for i in range(1, right.size()):
+                    bits = bits ^ Extract(i, i, right)
+                return bits if isinstance(node, Uxor) else ~bits
+            return self.havoc(node, right.size())
+        if isinstance(node, Operator):
+            left, right = self.expr(node.left, frame), self.expr(node.right, frame)
+            if isinstance(node, Land):
+                return And(to_bool(left), to_bool(right))
+            if isinstance(node, Lor):
+                return Or(to_bool(left), to_bool(right))
+            if type(node) in COMPARE:
+                left, right = align(to_bv(left), to_bv(right))
+                return COMPARE[type(node)](left, right)
+            if type(node) in ARITH:
+                left, right = align_arith(left, right)
+                return ARITH[type(node)](left, right)
+            if type(node) in BITWISE:
+                left, right = align(to_bv(left), to_bv(right))
+                return BITWISE[type(node)](left, right)
+        return self.havoc(node, 32)
+
+    def assign_value(self, lvalue, value, frame):
+        """(signal, new value of the whole signal) for a write of value to lvalue, None if unsupported."""
+        if isinstance(lvalue, Identifier):
+            return lvalue.name, resize(to_bv(value, 1), self.width(lvalue.name))
+        if isinstance(lvalue, (Partselect, Pointer)) and isinstance(lvalue.var, Identifier):
+            name = lvalue.var.name
+            if isinstance(lvalue, Partselect):
+                msb, lsb = self.index(lvalue.msb, frame), self.index(lvalue.lsb, frame)
+            else:
+                msb = lsb = self.index(lvalue.ptr, frame)
+            width = self.width(name)
+            if msb is None or lsb is None or max(msb, lsb) >= width:
+                return None
+            hi, lo = max(msb, lsb), min(msb, lsb)
+            old = frame[name] if name in frame else BitVec(f"{name}@?", width)
+            parts = []
+            if hi < width - 1:
+                parts.append(Extract(width - 1, hi + 1, old))
+            parts.append(resize(to_bv(value), hi - lo + 1))
+            if lo > 0:
+                parts.append(Extract(lo - 1, 0, old))
+            return name, Concat(parts) if len(parts) > 1 else parts[0]
+        return None
+
+    def stmt(self, node, guard, cur: dict, nxt: dict, bad: list) -> None:
+        """Symbolically execute node: blocking writes go to cur, non-blocking ones to nxt, and
+        (guard, system call) is recorded for every system call reached."""
+        if node is None:
+            return
+        if isinstance(node, Block):
+            for item in node.statements:
+                self.stmt(item, guard, cur, nxt, bad)
+        elif isinstance(node, SingleStatement):
+            self.stmt(node.statement, guard, cur, nxt, bad)
+        elif isinstance(node, EventStatement):
+            # a null statement, or an event wait that a cycle-level model can't express
+            return
+        elif isinstance(node, SystemCall):
+            for call in system_calls(node):
+                bad.append((guard, call))
+        elif isinstance(node, (BlockingSubstitution, NonblockingSubstitution)):
+            value = self.expr(node.right.var, cur)
+            if isinstance(node, NonblockingSubstitution) and not isinstance(node.left.var, Identifier):
+                # a part select updates whatever the signal is already scheduled to become
+                target = self.assign_value(node.left.var, value, {**cur, **nxt})
+            else:
+                target = self.assign_value(node.left.var, value, cur)
+            if target is None:
+                self.unsupported.add(type(node.left.var).__name__)
+                return
+            name, value = target
+            (cur if isinstance(node, BlockingSubstitution) else nxt)[name] = value
+        elif isinstance(node, IfStatement):
+            self.branch([(to_bool(self.expr(node.cond, cur)), node.true_statement)], node.false_statement, guard, cur, nxt, bad)
+        elif isinstance(node, (CaseStatement, CasexStatement, CasezStatement)):
+            comp = to_bv(self.expr(node.comp, cur))
+            arms, default = [], None
+            for case in node.caselist:
+                if case.cond is None:
+                    default = case.statement
+                    continue
+                matches = []
+                for item in case.cond:
+                    a, b = align(comp, to_bv(self.expr(item, cur)))
+                    matches.append(a == b)
+                arms.append((Or(matches) if len(matches) > 1 else matches[0], case.statement))
+            self.branch(arms, default, guard, cur, nxt, bad)
+        else:
+            self.unsupported.add(type(node).__name__)
+
+    def branch(self, arms, default, guard, cur: dict, nxt: dict, bad: list) -> None:
+        """Run each arm (first matching condition wins) on a copy of the frame, then merge with If."""
+        results = []
+        taken = []
+        for cond, body in arms:
+            arm = And([Not(c) for c in taken] + [cond]) if taken else cond
+            taken.append(cond)
+            arm_cur, arm_nxt = dict(cur), dict(nxt)
+            self.stmt(body, And(guard, arm), arm_cur, arm_nxt, bad)
+            results.append((arm, arm_cur, arm_nxt))
+        rest = And([Not(c) for c in taken]) if taken else z3.BoolVal(True)
+        default_cur, default_nxt = dict(cur), dict(nxt)
+        self.stmt(default, And(guard, rest), default_cur, default_nxt, bad)
+        for target, pick in ((cur, 1), (nxt, 2)):
+            names = set()
+            for result in results:
+                names.update(result[pick])
+            names.update(default_cur if pick == 1 else default_nxt)
+            for name in names:
+                kept = target[name] if name in target else self.hold.get(name)
+                value = (default_cur if pick == 1 else default_nxt).get(name, kept)
+                arm_values = [result[pick].get(name, kept) for result in results]
+                if value is kept and all(arm_value is kept for arm_value in arm_values):
+                    # no arm wrote it
+                    continue
+                if kept is None:
+                    # a temporary written on some arms only holds no known value on the others
+                    kept = self.undefined(name)
+                    value = kept if value is None else value
+                    arm_values = [kept if arm_value is None else arm_value for arm_value in arm_values]
+                for result, arm_value in reversed(list(zip(results, arm_values))):
+                    arm_value, value = align(to_bv(arm_value), to_bv(value))
+                    value = If(result[0], arm_value, value)
+                target[name] = value
+
+
+class BoundedModelChecker:
+    """The transition relation of a module, unrolled one depth at a time in an incremental solver."""
+    def __init__(self, module: ModuleDef, m: ExecutionManager = None):
+        self.module = module
+        self.m = m if m is not None else ExecutionManager()
+        infer_widths(self.m, module)
+        self.encoder = Encoder(self.m, module)
+        always = [item for item in module.items if isinstance(item, Always)]
+        self.schedule = Schedule(always, changing_signals(module))
+        self.clocked = [always[k] for k in self.schedule.clocked]
+        self.network = CombNetwork([item for item in module.items if isinstance(item, Assign)], self.schedule.comb_blocks)
+        self.inputs = set()
+        for port in module.portlist.ports:
+            if isinstance(port, Ioport) and isinstance(port.first, Input):
+                self.inputs.add(port.first.name)
+        # signals connected to submodule instances that aren't inputs of the module
+        self.instance_signals = set()
+        for item in module.items:
+            if isinstance(item, Decl):
+                self.inputs.update(decl.name for decl in item.list if isinstance(decl, Input))
+            elif isinstance(item, InstanceList):
+                # a submodule's outputs are not encoded; anything it connects to is free every cycle
+                self.instance_signals |= identifiers(item)
+        self.instance_signals -= self.inputs
+        self.inputs |= self.instance_signals
+        self.state = set()
+        for block in self.clocked:
+            reads_and_writes(block.statement, set(), self.state)
+        # what a combinational block writes on some branches only keeps its value from the last
+        # cycle on the others, so every signal such a block writes is state as well
+        self.latches = set()
+        for block in self.schedule.comb_blocks.values():
+            reads_and_writes(block.statement, set(), self.latches)
+        self.latches -= self.inputs | self.state
+        self.state -= self.inputs
+        self.state |= self.latches
+        self.monitors = {}
+        # names of the violated properties whose counterexample needs particular instance outputs
+        self.unconfirmed = set()
+        self.solver = z3.Solver()
+        self.frames = []
+        self.solver_time = 0
+
+    def frame(self, k: int) -> dict:
+        """Symbols of cycle k: the registers at the start of the cycle and the inputs during it."""
+        frame = {}
+        for name in sorted(self.state | self.inputs):
+            frame[name] = BitVec(f"{name}@{k}", self.encoder.width(name))
+        return frame
+
+    def step(self, k: int, frame: dict):
+        """Evaluate cycle k on frame: combinational logic in level order, then the clocked blocks.
+        Returns the next-state values and the (guard, call) pairs of the system calls reached."""
+        bad = []
+        start = dict(frame)
+        for i in self.network.order:
+            node = self.network.assigns[i]
+            if isinstance(node, Assign):
+                target = self.encoder.assign_value(node.left.var, self.encoder.expr(node.right.var, frame), frame)
+                if target is not None:
+                    frame[target[0]] = target[1]
+            else:
+                nxt = {}
+                self.encoder.hold = dict(frame)
+                self.encoder.stmt(node.statement, z3.BoolVal(True), frame, nxt, bad)
+                frame.update(nxt)
+        updates = {name: frame[name] for name in self.latches if frame[name] is not start[name]}
+        for block in self.clocked:
+            # non-blocking semantics: every clocked block reads the frame from before the edge
+            cur, nxt = dict(frame), {}
+            self.encoder.hold = frame
+            self.encoder.stmt(block.statement, z3.BoolVal(True), cur, nxt, bad)
+            for name in self.state:
+                if name in nxt:
+                    updates[name] = nxt[name]
+                elif cur.get(name) is not frame.get(name):
+                    updates[name] = cur[name]
+        return updates, bad
+
+    def initial_values(self, frame: dict) -> None:
+        """Registers given a constant by an initial block start from it; the others start free."""
+        for item in self.module.items:
+            if not isinstance(item, Initial):
+                continue
+            cur, nxt = dict(frame), {}
+            self.encoder.hold = frame
+            self.encoder.stmt(item.statement, z3.BoolVal(True), cur, nxt, [])
+            cur.update(nxt)
+            for name in self.state:
+                value = z3.simplify(to_bv(cur[name])) if cur.get(name) is not frame[name] else None
+                if value is not None and z3.is_bv_value(value):
+                    value, start = align(value, frame[name])
+                    self.solver.add(start == value)
+
+    def reached(self, bad) -> dict:
+        """Property name -> condition under which one of its system calls is reached."""
+        guards = {}
+        for guard, call in bad:
+            name = property_key(self.module.name, call)
+            if not name in self.monitors:
+                label = str(call.args[0].value) if len(call.args) > 0 and hasattr(call.args[0], "value") else call.syscall
+                self.monitors[name] = PropertyMonitor(name, label)
+            guards.setdefault(name, []).append(guard)
+        return {name: Or(reached) if len(reached) > 1 else reached[0] for name, reached in guards.items()}
+
+    def unroll(self, solver, frames: list) -> dict:
+        """Add the cycle after the last frame to solver; returns the property guards of that cycle."""
+        k = len(frames) - 1
+        frame = dict(frames[k])
+        updates, bad = self.step(k, frame)
+        following = self.frame(k + 1)
+        for name in self.state:
+            if name in updates:
+                value, old = align(to_bv(updates[name]), following[name])
+                solver.add(old == value)
+            else:
+                solver.add(following[name] == frames[k][name])
+        frames.append(following)
+        return self.reached(bad)
+
+    def solve(self, solver, constraints, source: str) -> str:
+        """Check solver with constraints added for this query only."""
+        solver.push()
+        solver.add(*constraints)
+        start = time.process_time()
+        result = timed_check(solver, source, model=True)
+        self.solver_time += time.process_time() - start
+        model = solver.model() if str(result) == "sat" else None
+        solver.pop()
+        return str(result), model
+
+    def confirmed(self, model, reached, depth: int) -> bool:
+        """Whether the violation follows from the inputs and initial state of the counterexample
+        alone, whatever the free instance outputs do."""
+        if not self.instance_signals:
+            return True
+        pinned = []
+        for k in range(depth + 1):
+            for name in sorted((self.inputs - self.instance_signals) | (self.state if k == 0 else set())):
+                symbol = self.frames[k][name]
+                pinned.append(symbol == model.eval(symbol, model_completion=True))
+        result, _ = self.solve(self.solver, pinned + [Not(reached)], "bmc")
+        return result == "unsat"
+
+    def violated(self, monitor, model, reached, k: int) -> None:
+        monitor.status = VIOLATED
+        monitor.cycle = k
+        monitor.counterexample = self.counterexample(model, k)
+        if not self.confirmed(model, reached, k):
+            self.unconfirmed.add(monitor.name)
+
+    def check(self, depth: int) -> None:
+        """Unroll up to depth cycles, checking every undecided assertion after each one."""
+        self.frames = [self.frame(0)]
+        self.initial_values(self.frames[0])
+        for k in range(depth):
+            guards = self.unroll(self.solver, self.frames)
+            for name, reached in guards.items():
+                monitor = self.monitors[name]
+                if monitor.status == VIOLATED:
+                    continue
+                result, model = self.solve(self.solver, [reached], "bmc")
+                if result == "sat":
+                    self.violated(monitor, model, reached, k)
+        for monitor in self.monitors.values():
+            if monitor.status != VIOLATED:
+                monitor.status = HOLDS
+
+    def counterexample(self, model, depth: int) -> dict:
+        """Values of the inputs at every cycle and of the registers at the start."""
+        values = {}
+        for k in range(depth + 1):
+            for name in sorted(self.inputs | (self.state if k == 0 else set())):
+                value = model.eval(self.frames[k][name], model_completion=True)
+                values[f"{self.module.name}.{name}@{k}"] = value
+        return values
+
+    def confirmation(self, monitor) -> str:
+        if monitor.name not in self.unconfirmed:
+            return ""
+        return f" (unconfirmed: depends on outputs of submodule instances, which are free: {', '.join(sorted(self.instance_signals))})"
+
+    def report(self, depth: int) -> None:
+        print(f"BMC results ({len(self.monitors)} properties, bound {depth} cycles, {len(self.state)} state signals):")
+        for monitor in self.monitors.values():
+            if monitor.status == VIOLATED:
+                print(f"  {monitor.name} {monitor.label}: violated at cycle {monitor.cycle}{self.confirmation(monitor)}")
+                print(f"    counterexample: {monitor.counterexample}")
+            else:
+                print(f"  {monitor.name} {monitor.label}: {monitor.status} within {depth} cycles")
+        if self.encoder.unsupported:
+            print(f"  over-approximated: {', '.join(sorted(self.encoder.unsupported))}")
+        print(f"Solver time {self.solver_time}")
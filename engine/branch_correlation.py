@@ -0,0 +1,202 @@
+"""Static branch correlation across the CFGs of a module. Always blocks of one module often branch
+on the same predicate (rst, rst_n, an enable, the same state compare), so most of the product of
+their paths takes that predicate both ways in the same cycle and can never be feasible. Predicates
+are matched on their normalized text, with negations and compares against zero folded into the
+polarity, and only between CFGs where no CFG in between assigns one of the predicate's signals, or
+a signal one of them follows through continuous assignments."""
+
+import re
+from itertools import product
+import pyslang as ps
+from pyverilog.vparser.ast import IfStatement, Decl, Assign
+from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+
+codegen = ASTCodeGenerator()
+
+LITERAL = re.compile(r"\d*\s*'[sS]?[bodhBODH]\s*[0-9a-fA-FxzXZ_?]+|\d+")
+IDENTIFIER = re.compile(r"[A-Za-z_][\w$]*")
+ZERO = re.compile(r"(?:\d*'[sS]?[bodhBODH])?0+|'0")
+# a signal (or bit/part select of it) on the left of a blocking or nonblocking assignment
+ASSIGNED = re.compile(r"([A-Za-z_][\w$]*)\s*(?:\[[^\]]*\]\s*)*(?:<=|(?<![=!<>])=(?!=))")
+# assign lhs = rhs;
+CONTINUOUS = re.compile(r"\s*assign\s+(.+?)\s*(?<![=!<>])=(?!=)(.*?);?\s*$", re.S)
+
+
+def node_text(node) -> str:
+    """Source text of a pyverilog node, pyslang statement or pyslang syntax node."""
+    if hasattr(node, "syntax") and node.syntax is not None:
+        return str(node.syntax)
+    if hasattr(node, "children") and not hasattr(node, "kind"):
+        try:
+            return codegen.visit(node)
+        except Exception:
+            return str(node)
+    return str(node)
+
+
+def strip_parens(text: str) -> str:
+    while text.startswith("(") and text.endswith(")"):
+        depth = 0
+        for i, ch in enumerate(text):
+            depth += ch == "("
+            depth -= ch == ")"
+            if depth == 0 and i < len(text) - 1:
+                return text
+        text = text[1:-1].strip()
+    return text
+
+
+def normalize(text: str):
+    """(key, polarity) of a branch predicate: !x, ~x, x == 0 are the key of x with polarity False."""
+    text = strip_parens(re.sub(r"\s+", "", text))
+    polarity = True
+    while True:
+        if text[:1] in ("!", "~") and text[1:2] not in ("=", "^", "&", "|"):
+            rest = strip_parens(text[1:])
+            if IDENTIFIER.fullmatch(rest) or rest != text[1:]:
+                text, polarity = rest, not polarity
+                continue
+        compare = re.fullmatch(r"(.+?)(==|!=)(.+)", text)
+        if compare and ZERO.fullmatch(compare.group(3)) and "=" not in compare.group(1):
+            text = strip_parens(compare.group(1))
+            polarity = polarity if compare.group(2) == "!=" else not polarity
+            continue
+        return text, polarity
+
+
+def branch_condition(node):
+    """The condition of an if statement in a basic block, None for any other node."""
+    if isinstance(node, IfStatement):
+        return codegen.visit(node.cond)
+    if getattr(node, "kind", None) == ps.StatementKind.Conditional and node.conditions:
+        return node_text(node.conditions[0].expr)
+    if node.__class__.__name__ == "ConditionalStatementSyntax":
+        return str(node.predicate)
+    return None
+
+
+def path_predicates(cfg, path) -> dict:
+    """Predicate key -> polarity the path gives it; None when the path takes it both ways."""
+    taken = {}
+    directions = cfg.compute_direction(path)
+    k = 0
+    for block_idx in path:
+        if block_idx < 0:
+            continue
+        direction = directions[k] if k < len(directions) else None
+        k += 1
+        if direction is None:
+            continue
+        for node in cfg.basic_block_list[block_idx]:
+            cond = branch_condition(node)
+            if cond is None:
+                continue
+            key, polarity = normalize(cond)
+            value = polarity == bool(direction)
+            taken[key] = value if taken.get(key, value) == value else None
+    return taken
+
+
+def written_signals(cfg) -> set:
+    """Signals assigned anywhere in the CFG; a compare like a <= b is counted too, which only
+    makes the analysis more conservative."""
+    written = set()
+    for block in cfg.basic_block_list:
+        for node in block:
+            written.update(ASSIGNED.findall(node_text(node)))
+    return written
+
+
+def signals_of(key: str) -> set:
+    return set(IDENTIFIER.findall(LITERAL.sub(" ", key)))
+
+
+def continuous_assigns(cfg) -> list:
+    """Continuous assignments of the module a CFG belongs to, including wire x = expr declarations."""
+    assigns = list(getattr(cfg, "comb", []))
+    for decl in getattr(cfg, "decls", []):
+        if isinstance(decl, Decl):
+            assigns += [item for item in decl.list if isinstance(item, Assign)]
+    return assigns
+
+
+def assign_sources(cfgs) -> dict:
+    """Signal -> signals its continuous assignments read."""
+    sources = {}
+    for cfg in cfgs:
+        for node in continuous_assigns(cfg):
+            if isinstance(node, Assign):
+                lhs, rhs = codegen.visit(node.left), codegen.visit(node.right)
+            else:
+                match = CONTINUOUS.match(node_text(node))
+                if match is None:
+                    continue
+                lhs, rhs = match.groups()
+            for target in signals_of(lhs):
+                sources.setdefault(target, set()).update(signals_of(rhs))
+    return sources
+
+
+def followed_signals(signals: set, sources: dict) -> set:
+    """signals and every signal they follow through continuous assignments."""
+    closure = set(signals)
+    pending = list(signals)
+    while pending:
+        for source in sources.get(pending.pop(), ()):
+            if source not in closure:
+                closure.add(source)
+                pending.append(source)
+    return closure
+
+
+def consistent_paths(cfgs):
+    """The combinations of one path per CFG (in CFG order, as itertools.product would give them)
+    that never take a shared predicate both ways, and the size of the full product."""
+    predicates = [[path_predicates(cfg, path) for path in cfg.paths] for cfg in cfgs]
+    writes = [written_signals(cfg) for cfg in cfgs]
+    sources = assign_sources(cfgs)
+    full = 1
+    for cfg in cfgs:
+        full *= len(cfg.paths)
+
+    def correlated(key: str, i: int, j: int) -> bool:
+        # the predicate keeps its value from CFG i to CFG j only if nothing in between assigns it,
+        # directly or through a wire it reads
+        signals = followed_signals(signals_of(key), sources)
+        return not any(signals & writes[k] for k in range(i, j + 1))
+
+    safe = {}
+    kept = []
+
+    def extend(idx: int, chosen: list, assigned: dict) -> None:
+        if idx == len(cfgs):
+            kept.append(tuple(cfgs[i].paths[p] for i, p in enumerate(chosen)))
+            return
+        for p in range(len(cfgs[idx].paths)):
+            ok = True
+            for key, value in predicates[idx][p].items():
+                if value is None:
+                    continue
+                for i, other in assigned.get(key, ()):
+                    if other != value:
+                        if (key, i, idx) not in safe:
+                            safe[(key, i, idx)] = correlated(key, i, idx)
+                        if safe[(key, i, idx)]:
+                            ok = False
+                            break
+                if not ok:
+                    break
+            if not ok:
+                continue
+            for key, value in predicates[idx][p].items():
+                if value is not None:
+                    assigned.setdefault(key, []).append((idx, value))
+            chosen.append(p)
+            extend(idx + 1, chosen, assigned)
+            chosen.pop()
+            for key, value in predicates[idx][p].items():
+                if value is not None:
+                    assigned[key].pop()
+
+    extend(0, [], {})
+    return kept, full
@@ -0,0 +1,146 @@
+"""Case statements as one n-way branch. Each arm, the default arm included (implicit when the case has
+none), is an alternative of its own, so a decoder with n items has n + 1 paths, not 2^n. An arm's guard
+excludes every earlier item, as the first matching item wins. When the items are distinct constants
+the arms are parallel, and an arm's guard is only its own match; so are the arms of a SystemVerilog
+unique or unique0 case, whatever its items. The default arm's guard is a single disjunction over all items.
+Both front ends are covered: pyverilog CaseStatements and bound pyslang Case statements."""
+
+import z3
+from z3 import And, Or, Not, BitVecVal
+from pyverilog.vparser.ast import Case, CasexStatement, CasezStatement, IntConst
+from helpers.bv_encoding import BASES, parse_int_literal, align, to_bv
+import pyslang as ps
+
+# digits that match anything in a casez item, and in a casex item
+CASEZ_WILDCARDS = "zZ?"
+CASEX_WILDCARDS = "zZ?xX"
+
+
+class Arm(int):
+    """Direction of an n-way branch: the index of the arm a path takes."""
+
+
+class SlangArm:
+    """An item group of a pyslang case statement in the shape of a pyverilog Case: cond holds its
+    expressions (None for the default arm). Its kind makes the SV visitor pass over the arm node."""
+    kind = ps.StatementKind.Empty
+
+    def __init__(self, cond, statement):
+        self.cond = cond
+        self.statement = statement
+
+
+def arms_of(case_stmt) -> list:
+    """The Case items of a case statement, with an empty default arm added when it has none."""
+    if isinstance(case_stmt, ps.Statement):
+        arms = [SlangArm(list(item.expressions), item.stmt) for item in case_stmt.items]
+        return arms + [SlangArm(None, case_stmt.defaultCase)]
+    arms = list(case_stmt.caselist)
+    if not any(arm.cond is None for arm in arms):
+        arms.append(Case(None, None, lineno=case_stmt.lineno))
+    return arms
+
+
+def arm_count(case_stmt) -> int:
+    return len(arms_of(case_stmt))
+
+
+def literal_text(item):
+    """Source text of an integer literal item, like 4'b1?0z, None for anything else."""
+    if isinstance(item, IntConst):
+        return item.value
+    if isinstance(item, ps.Expression):
+        while item.kind == ps.ExpressionKind.Conversion:
+            item = item.operand
+        if item.kind == ps.ExpressionKind.IntegerLiteral:
+            return str(item.value)
+    return None
+
+
+def case_wildcards(case_stmt) -> str:
+    """The digits that match anything in the items of a case statement."""
+    if isinstance(case_stmt, ps.Statement):
+        return {ps.CaseStatementCondition.WildcardXOrZ: CASEX_WILDCARDS,
+                ps.CaseStatementCondition.WildcardJustZ: CASEZ_WILDCARDS}.get(case_stmt.condition, "")
+    return CASEX_WILDCARDS if isinstance(case_stmt, CasexStatement) else CASEZ_WILDCARDS if isinstance(case_stmt, CasezStatement) else ""
+
+
+def unique_case(case_stmt) -> bool:
+    """Whether a case statement is declared unique, so at most one of its items matches."""
+    return isinstance(case_stmt, ps.Statement) and case_stmt.check in (ps.UniquePriorityCheck.Unique, ps.UniquePriorityCheck.Unique0)
+
+
+def wildcard_literal(item, wildcards: str):
+    """(care mask, value, width) of a based literal with wildcard digits, None for anything else."""
+    text = literal_text(item)
+    if text is None or "'" not in text:
+        return None
+    size, _, rest = text.partition("'")
+    rest = rest.lstrip("sS")
+    base, digits = rest[:1].lower(), rest[1:].replace("_", "")
+    if base not in ("b", "o", "h") or not any(d in wildcards for d in digits):
+        return None
+    bits = {"b": 1, "o": 3, "h": 4}[base]
+    care, value = 0, 0
+    for digit in digits:
+        care <<= bits
+        value <<= bits
+        if digit not in wildcards:
+            care |= (1 << bits) - 1
+            value |= int(digit, BASES[base])
+    width = int(size) if size.strip().isdigit() else len(digits) * bits
+    return care, value, width
+
+
+def unknown_digits(item) -> bool:
+    """Whether an item is a based literal with x or z digits."""
+    text = literal_text(item)
+    if text is None or "'" not in text:
+        return False
+    digits = text.partition("'")[2].lstrip("sS")[1:]
+    return any(d in CASEX_WILDCARDS for d in digits)
+
+
+def item_match(comp, item, lower, case_stmt):
+    """Whether the case expression matches one item expression."""
+    wildcards = case_wildcards(case_stmt)
+    pattern = wildcard_literal(item, wildcards) if wildcards else None
+    if pattern is not None:
+        care, value, width = pattern
+        subject, _ = align(to_bv(comp), BitVecVal(0, width))
+        return subject & BitVecVal(care, subject.size()) == BitVecVal(value, subject.size())
+    if unknown_digits(item):
+        # x or z digits that aren't wildcards here never equal a two-valued case expression
+        return z3.BoolVal(False)
+    a, b = align(to_bv(comp), to_bv(lower(item)))
+    return a == b
+
+
+def constant_items(arms) -> bool:
+    """Whether every item is a distinct constant, so at most one arm can match."""
+    seen = set()
+    for arm in arms:
+        for item in arm.cond or ():
+            text = literal_text(item)
+            value = parse_int_literal(text)[0] if text is not None else None
+            if value is None or value in seen:
+                return False
+            seen.add(value)
+    return True
+
+
+def arm_guards(comp, case_stmt, lower) -> list:
+    """Guard of every arm of arms_of(case_stmt), in order, over the lowered case expression."""
+    arms = arms_of(case_stmt)
+    matches = [None if arm.cond is None else Or([item_match(comp, item, lower, case_stmt) for item in arm.cond]) for arm in arms]
+    parallel = unique_case(case_stmt) or (not case_wildcards(case_stmt) and constant_items(arms))
+    items = [match for match in matches if match is not None]
+    guards = []
+    earlier = []
+    for match in matches:
+        if match is None:
+            guards.append(Not(Or(items)) if items else z3.BoolVal(True))
+            continue
+        guards.append(match if parallel or not earlier else And(match, Not(Or(earlier))))
+        earlier.append(match)
+    return guards
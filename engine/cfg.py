@@ -10,6 +10,7 @@ from pyverilog.vparser.ast import Value, Reg, Initial, Eq, Identifier, Initial,
 from pyverilog.vparser.ast import Concat, BlockingSubstitution, Parameter, StringConst, Wire, PortArg, Instance
 from .execution_manager import ExecutionManager
 from .symbolic_state import SymbolicState
+from .case_encoding import Arm, arms_of
 import os
 from optparse import OptionParser
 from typing import Optional
@@ -24,6 +25,7 @@ import sys
 import networkx as nx
 import matplotlib.pyplot as plt
 from pyslang import ConditionalStatementSyntax, DataDeclarationSyntax
+import pyslang as ps
 
 class CFG:
     """CFG of Verilog RTL."""
@@ -77,6 +79,12 @@ class CFG:
     #submodules defined
     submodules = []
 
+    # (case statement node idx, first node idx of an arm, arm index) of every n-way case branch
+    case_edges = []
+
+    # (block, arm block) -> arm index, see engine/case_encoding.py
+    arms = {}
+
     def reset(self):
         """Return to defaults."""
         self.basic_block_list = []
@@ -92,12 +100,16 @@ class CFG:
         self.ind_branch_points = {1: set()}
         self.block_smt = [False]
         self.block_stmt_depth = 0
+        self.case_edges = []
+        self.arms = {}
 
     def compute_direction(self, path):
         """Given a path, figure out the direction"""
         directions = []
         for i in range(1, len(path)-1):
-            if path[i] + 1 == path[i + 1]:
+            if (path[i], path[i + 1]) in self.arms:
+                directions.append(Arm(self.arms[(path[i], path[i + 1])]))
+            elif path[i] + 1 == path[i + 1]:
                 directions.append(1)
             else:
                 directions.append(0)
@@ -108,7 +120,8 @@ class CFG:
         if len(self.ind_branch_points[idx]) <= 1:
             return 
 
-        res = list(combinations(self.ind_branch_points[idx], r=len(self.ind_branch_points[idx])))
+        # in source order: set order stops being ascending once node indices pass the set's table size
+        res = list(combinations(sorted(self.ind_branch_points[idx]), r=len(self.ind_branch_points[idx])))
 
         self.edgelist += res 
 
@@ -238,6 +251,9 @@ class CFG:
     def basic_blocks(self, m:ExecutionManager, s: SymbolicState, ast):
         """We want to get a list of AST nodes partitioned into basic blocks.
         Need to keep track of children/parent indices of each block in the list."""
+        if isinstance(ast, ps.Statement):
+            self.slang_blocks(m, s, ast)
+            return
         if hasattr(ast, '__iter__'):
             for item in ast:
                 if self.block_smt[self.block_stmt_depth] and (isinstance(item, IfStatement) or isinstance(item, CaseStatement)
@@ -261,10 +277,7 @@ class CFG:
                     self.edgelist.append(edge_1)
                     self.edgelist.append(edge_2)
                 elif isinstance(item, CaseStatement):
-                    self.all_nodes.append(ast)
-                    self.partition_points.add(self.curr_idx)
-                    self.curr_idx += 1
-                    self.basic_blocks(m, s, item.caselist) 
+                    self.case_blocks(m, s, item)
                 elif isinstance(item, ForStatement):
                     self.all_nodes.append(ast)
                     self.partition_points.add(self.curr_idx)
@@ -300,10 +313,7 @@ class CFG:
                 self.edgelist.append(edge_1)
                 self.edgelist.append(edge_2)
             elif isinstance(ast, CaseStatement):
-                self.all_nodes.append(ast)
-                self.partition_points.add(self.curr_idx)
-                self.curr_idx += 1
-                self.basic_blocks(m, s, ast.caselist)
+                self.case_blocks(m, s, ast)
             elif isinstance(ast, ForStatement):
                 self.all_nodes.append(ast)
                 self.partition_points.add(self.curr_idx)
@@ -330,6 +340,40 @@ class CFG:
                 self.all_nodes.append(ast)
                 self.curr_idx += 1
 
+    def slang_blocks(self, m: ExecutionManager, s: SymbolicState, stmt):
+        """basic_blocks for a bound pyslang statement. Lists, blocks and timing controls are flattened
+        and a case is an n-way branch; any other statement is one node the SV visitor runs whole."""
+        if stmt.kind == ps.StatementKind.List:
+            for item in stmt.list:
+                self.slang_blocks(m, s, item)
+        elif stmt.kind == ps.StatementKind.Block:
+            self.slang_blocks(m, s, stmt.body)
+        elif stmt.kind == ps.StatementKind.Timed:
+            self.slang_blocks(m, s, stmt.stmt)
+        elif stmt.kind == ps.StatementKind.Case:
+            self.case_blocks(m, s, stmt)
+        else:
+            self.all_nodes.append(stmt)
+            self.curr_idx += 1
+
+    def case_blocks(self, m: ExecutionManager, s: SymbolicState, case_stmt):
+        """A case statement is an n-way branch: it ends its basic block, and every arm (see
+        arms_of) is a block of its own starting with its Case node, so a path takes exactly one."""
+        start = len(self.all_nodes)
+        if not isinstance(case_stmt, ps.Statement):
+            # pyslang statements take no attributes; the SV visitor goes by the Arm direction alone
+            case_stmt.n_way = True
+        self.all_nodes.append(case_stmt)
+        self.partition_points.add(start)
+        self.curr_idx += 1
+        for k, arm in enumerate(arms_of(case_stmt)):
+            arm.n_way = True
+            self.case_edges.append((start, len(self.all_nodes), k))
+            self.all_nodes.append(arm)
+            self.curr_idx += 1
+            self.basic_blocks(m, s, arm.statement)
+            self.partition_points.add(len(self.all_nodes) - 1)
+
     def map_to_path(self):
         """Just return the paths"""
         return self.paths
@@ -352,11 +396,11 @@ class CFG:
             node = self.all_nodes[node_idx]
         else:
             node = self.all_nodes[len(self.all_nodes)-1]
-        found_block = None
-        for block in self.basic_block_list:
-            if node in block:
-                found_block = indexOf(self.basic_block_list, block)
-                return found_block
+        # by identity: equal statements can sit in different blocks, and comparing case items
+        # with different numbers of values trips up pyverilog's Node.__eq__
+        for i, block in enumerate(self.basic_block_list):
+            if any(item is node for item in block):
+                return i
 
     def make_paths(self):
         """Map the edge between AST nodes to a path between basic blocks."""
@@ -365,6 +409,10 @@ class CFG:
             block2 = self.find_basic_block(edge[1])
             path = (block1, block2)
             self.cfg_edges.append(path)
+        for case_idx, arm_idx, k in self.case_edges:
+            path = (self.find_basic_block(case_idx), self.find_basic_block(arm_idx))
+            self.arms[path] = k
+            self.cfg_edges.append(path)
 
     def find_leaves(self):
         """Find leaves in cfg, to know which nodes need to connect to dummy exit."""
@@ -385,9 +433,9 @@ class CFG:
         # print(self.cfg_edges)
 
         G = nx.DiGraph()
-        for block in self.basic_block_list:
+        for i, block in enumerate(self.basic_block_list):
             # converts the list into a tuple. Needs to be hashable type
-            G.add_node(indexOf(self.basic_block_list, block), data=tuple(block))
+            G.add_node(i, data=tuple(block))
         
         G.add_node(-1, data="Dummy Start")
         G.add_node(-2, data="Dummy End")
@@ -398,7 +446,7 @@ class CFG:
             G.add_edge(start, end)
         
         # edgecase lol
-        if self.edgelist == []:
+        if self.edgelist == [] and self.case_edges == []:
             G.add_edge(0, -2)
 
         # link up dummy start
@@ -0,0 +1,52 @@
+"""Flyweight CFGs. All instances of a module definition with the same parameter overrides share one
+list of always-block CFGs (with its schedule) and one single-cycle path table. These are built once
+and never changed per instance. Per instance there is only the instance name that keys its part of
+the store, and the port bindings on its Instance node."""
+
+from pyverilog.vparser.ast import Instance
+from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+
+codegen = ASTCodeGenerator()
+
+
+def parameter_overrides(instance) -> tuple:
+    """(parameter, value) overrides of a pyverilog Instance, as source text."""
+    if not isinstance(instance, Instance) or not instance.parameterlist:
+        return ()
+    return tuple((param.paramname, codegen.visit(param.argname)) for param in instance.parameterlist)
+
+
+def definition_key(name: str, overrides: list, i: int) -> tuple:
+    """Pool key of instance i of a definition; instances not seen by module_count get no overrides."""
+    return (name, overrides[i] if i < len(overrides) else ())
+
+
+class CFGPool:
+    """Shared CFGs by definition key, and path tables by CFG list."""
+    def __init__(self):
+        self.entries = {}
+        # id of a shared cfg list -> its path table; the lists live in entries, so ids stay valid
+        self.tables = {}
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, key: tuple, build):
+        """The (cfgs, schedule) for key, from build() the first time it's asked for."""
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = build()
+            self.entries[key] = entry
+            self.builds += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def table(self, cfgs: list, compute):
+        """The path table of a cfg list, from compute() once per distinct list."""
+        key = id(cfgs)
+        if key not in self.tables:
+            self.tables[key] = (cfgs, compute())
+        return self.tables[key][1]
+
+    def summary(self) -> str:
+        return f"CFG pool: {self.builds} definitions built, {self.hits} instances shared"
@@ -0,0 +1,138 @@
+"""Cooperative deadline and on-disk checkpoints for long explorations. The exploration loop asks
+the deadline between paths instead of being killed from a timer thread, and periodically saves
+where the path enumeration stands so an expired or killed run can resume from there.
+
+A checkpoint holds the next path, the run totals, the property results and the covered SVA
+monitors. What the solver side learned is not saved: the --branch_table entries and --model_cache
+models start empty after --resume and fill in again, which costs queries but no results. The
+--correlate_branches filter is recomputed from the CFGs, so it enumerates the same paths."""
+
+import json
+import os
+import signal
+import time
+from contextlib import contextmanager
+from .execution_manager import ExecutionManager
+from .properties import UNKNOWN
+
+CHECKPOINT_VERSION = 1
+
+
+class Deadline:
+    """Wall clock budget for an exploration. stop() ends it early, e.g. from a signal handler."""
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.start = time.monotonic()
+        self.stopped = False
+
+    def stop(self, signum=None, frame=None) -> None:
+        if self.stopped and signum == signal.SIGINT:
+            # a second Ctrl-C doesn't wait for the current path to finish
+            raise KeyboardInterrupt
+        self.stopped = True
+
+    @contextmanager
+    def handling_signals(self):
+        """SIGINT and SIGTERM stop the deadline inside the block; the previous handlers are back after it."""
+        previous = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            yield self
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def expired(self) -> bool:
+        return self.stopped or (self.seconds is not None and self.elapsed() >= self.seconds)
+
+
+class Checkpoint:
+    """Exploration progress in a JSON file, keyed by the design and bound so it is never resumed
+    against a different run."""
+    def __init__(self, path: str, key: str, interval: int = 100, every_seconds: int = 300):
+        self.path = path
+        self.key = key
+        self.interval = interval
+        self.every_seconds = every_seconds
+        self.last_path = 0
+        self.last_time = time.monotonic()
+        # totals carried over from the runs this one resumes
+        self.prior = {"elapsed": 0.0, "solver_time": 0.0, "paths_explored": 0}
+
+    def due(self, next_path: int) -> bool:
+        """Save after interval paths or every_seconds, whichever comes first."""
+        return next_path - self.last_path >= self.interval or time.monotonic() - self.last_time >= self.every_seconds
+
+    def save(self, m: ExecutionManager, next_path: int, total_paths: int, paths_explored: int, elapsed: float, cache=None) -> None:
+        """Write the checkpoint atomically, and persist the query cache alongside it."""
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "key": self.key,
+            "total_paths": total_paths,
+            "next_path": next_path,
+            "metrics": {
+                "elapsed": self.prior["elapsed"] + elapsed,
+                "solver_time": m.solver_time,
+                "paths_explored": self.prior["paths_explored"] + paths_explored,
+            },
+            "properties": {},
+            "covered": [],
+        }
+        if m.properties is not None:
+            for monitor in m.properties.monitors.values():
+                data["properties"][monitor.name] = {
+                    "label": monitor.label,
+                    "status": monitor.status,
+                    "cycle": monitor.cycle,
+                    "path": monitor.path,
+                    "counterexample": None if monitor.counterexample is None else {k: str(v) for k, v in monitor.counterexample.items()},
+                }
+        if m.sva_monitors is not None:
+            data["covered"] = sorted(m.sva_monitors.covered)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
+        if cache is not None:
+            try:
+                cache.save()
+            except Exception as e:
+                print(f"Failed to save Redis cache: {e}")
+        self.last_path = next_path
+        self.last_time = time.monotonic()
+        print(f"Checkpoint saved: path {next_path} of {total_paths} -> {self.path}")
+
+    def load(self, total_paths: int):
+        """The saved checkpoint for this run, or None if there is none or it belongs to another run."""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Ignoring unreadable checkpoint {self.path}")
+                return None
+        if data.get("version") != CHECKPOINT_VERSION or data.get("key") != self.key or data.get("total_paths") != total_paths:
+            print(f"Ignoring checkpoint {self.path}: it was written for a different design or bound")
+            return None
+        return data
+
+    def restore(self, m: ExecutionManager, data) -> int:
+        """Put the saved metrics and property results back into the manager; returns the next path."""
+        self.prior = dict(data["metrics"])
+        m.solver_time = data["metrics"]["solver_time"]
+        if m.properties is not None:
+            for name, saved in data["properties"].items():
+                m.properties.add(name, saved["label"])
+                monitor = m.properties.monitors[name]
+                if saved["status"] != UNKNOWN:
+                    monitor.status = saved["status"]
+                    monitor.cycle = saved["cycle"]
+                    monitor.path = saved["path"]
+                    monitor.counterexample = saved["counterexample"]
+        if m.sva_monitors is not None:
+            m.sva_monitors.covered |= set(data["covered"])
+        self.last_path = data["next_path"]
+        return data["next_path"]
@@ -0,0 +1,169 @@
+"""One-time elaboration of a SystemVerilog design into per-module tables of ports, parameters,
+variables with their widths, continuous assigns and initial values. The tables are built once per
+design; every path then starts from a store reset from them instead of re-walking the symbols.
+
+Tables are keyed by the names the engine gives module instances, and instances with the same
+parameter values share one."""
+
+import z3
+import pyslang as ps
+from helpers.utils import init_symbol
+from helpers.bv_encoding import parse_int_literal, bv_symbol, to_bv, resize
+from helpers.rvalue_to_z3 import slang_expr_to_z3
+from .execution_manager import ExecutionManager
+from .symbolic_state import SymbolicState
+
+
+def constant_int(value):
+    """Integer of an elaborated constant, None when it has unknown bits or isn't an integer."""
+    if value is None:
+        return None
+    try:
+        if value.hasUnknown():
+            return None
+        return int(value.convertToInt())
+    except Exception:
+        const, _ = parse_int_literal(str(value))
+        return const
+
+
+class ModuleTable:
+    """What a module declares, as far as initializing its part of the store is concerned."""
+    def __init__(self, name: str):
+        self.name = name
+        # port name -> (direction, width)
+        self.ports = {}
+        # parameter name -> value, None when it isn't a known integer
+        self.params = {}
+        # variable and net name -> width
+        self.variables = {}
+        # continuous assign expressions, in declaration order
+        self.assigns = []
+        # signal -> constant from its declaration initializer or an initial block
+        self.initial = {}
+
+    def add_initial(self, stmt, ctx) -> None:
+        """Constant assignments at the top level of an initial block."""
+        if stmt is None:
+            return
+        if stmt.kind in (ps.StatementKind.Block, ps.StatementKind.Timed) and hasattr(stmt, "body"):
+            self.add_initial(stmt.body, ctx)
+        elif stmt.kind == ps.StatementKind.List:
+            for item in stmt.body:
+                self.add_initial(item, ctx)
+        elif stmt.kind == ps.StatementKind.ExpressionStatement and stmt.expr.kind == ps.ExpressionKind.Assignment:
+            left = stmt.expr.left
+            if left.kind == ps.ExpressionKind.NamedValue:
+                value = constant_int(stmt.expr.right.eval(ctx))
+                if value is not None:
+                    self.initial[left.symbol.name] = value
+
+    def reset(self, m: ExecutionManager, s: SymbolicState, instance_name: str) -> None:
+        """Start an instance's store over: fresh symbols for ports and variables, constants for
+        parameters and initialized signals, and the drivers of continuously assigned signals."""
+        store = {}
+        for name in self.variables:
+            store[name] = init_symbol()
+        for name in self.ports:
+            store[name] = init_symbol()
+        for name, value in self.initial.items():
+            store[name] = str(value)
+        for name, value in self.params.items():
+            store[name] = str(value) if value is not None else init_symbol()
+        s.store[instance_name] = store
+        for assignment in self.assigns:
+            self.connect(m, s, s.store[instance_name], assignment)
+
+    def connect(self, m: ExecutionManager, s: SymbolicState, store: dict, assignment) -> None:
+        """assign lhs = rhs: lhs follows a signal or constant on the right, and is otherwise a
+        fresh symbol constrained to equal the right hand side."""
+        left, right = assignment.left, assignment.right
+        if left.kind != ps.ExpressionKind.NamedValue:
+            return
+        name = left.symbol.name
+        if right.kind == ps.ExpressionKind.NamedValue and right.symbol.name in store:
+            store[name] = store[right.symbol.name]
+            return
+        width = left.type.bitWidth
+        value = z3.simplify(resize(to_bv(slang_expr_to_z3(right, s, m, lambda signal, _: store.setdefault(signal, init_symbol()))), width))
+        if z3.is_bv_value(value):
+            store[name] = str(value.as_long())
+            return
+        store[name] = init_symbol()
+        s.pc.add(bv_symbol(m, store[name], width) == value)
+
+
+def parameter_values(body) -> tuple:
+    """What tells instances of one definition apart for the tables."""
+    return tuple((member.name, constant_int(member.value)) for member in body if member.kind == ps.SymbolKind.Parameter)
+
+
+def module_table(body, ctx) -> ModuleTable:
+    table = ModuleTable(body.definition.name)
+    for member in body:
+        kind = member.kind
+        if kind == ps.SymbolKind.Port:
+            table.ports[member.name] = (member.direction.name, member.type.bitWidth)
+        elif kind == ps.SymbolKind.Parameter:
+            table.params[member.name] = constant_int(member.value)
+        elif kind in (ps.SymbolKind.Variable, ps.SymbolKind.Net):
+            table.variables[member.name] = member.type.bitWidth
+            if member.initializer is not None:
+                value = constant_int(member.initializer.eval(ctx))
+                if value is not None:
+                    table.initial[member.name] = value
+        elif kind == ps.SymbolKind.ContinuousAssign:
+            table.assigns.append(member.assignment)
+        elif kind == ps.SymbolKind.ProceduralBlock and member.procedureKind == ps.ProceduralBlockKind.Initial:
+            table.add_initial(member.body, ctx)
+    return table
+
+
+def instance_bodies(instance, bodies: list) -> list:
+    """Bodies of an instance and every instance below it, depth first in source order."""
+    bodies.append(instance.body)
+    for member in instance.body:
+        if member.kind == ps.SymbolKind.Instance:
+            instance_bodies(member, bodies)
+    return bodies
+
+
+def elaborate(compilation) -> dict:
+    """Instance name -> ModuleTable for every module instantiated from the top instances. A
+    definition instantiated once is named after itself, otherwise instances are <definition>_<i>."""
+    ctx = ps.EvalContext(compilation)
+    bodies = []
+    for instance in compilation.getRoot().topInstances:
+        instance_bodies(instance, bodies)
+    counts = {}
+    for body in bodies:
+        counts[body.definition.name] = counts.get(body.definition.name, 0) + 1
+    built = {}
+    seen = {}
+    tables = {}
+    for body in bodies:
+        definition = body.definition.name
+        key = (definition, parameter_values(body))
+        if key not in built:
+            built[key] = module_table(body, ctx)
+        index = seen.get(definition, 0)
+        seen[definition] = index + 1
+        tables[definition if counts[definition] == 1 else f"{definition}_{index}"] = built[key]
+    return tables
+
+
+def attach(m: ExecutionManager, tables: dict) -> None:
+    """Declared widths and parameter values for the encoders, set once per design."""
+    for name, table in tables.items():
+        widths = m.sig_widths.setdefault(name, {})
+        widths.update(table.variables)
+        widths.update({port: width for port, (_, width) in table.ports.items()})
+        m.param_values.setdefault(name, {}).update({p: v for p, v in table.params.items() if v is not None})
+
+
+def init_store(m: ExecutionManager, s: SymbolicState, tables: dict) -> None:
+    """Table-driven initialization of the store at the start of a path."""
+    for name in m.names_list:
+        table = tables.get(name)
+        if table is not None:
+            table.reset(m, s, name)
@@ -8,6 +8,21 @@ from pyverilog.vparser.ast import Concat, BlockingSubstitution, Parameter, Strin
 from .execution_manager import ExecutionManager
 from .symbolic_state import SymbolicState
 from .cfg import CFG
+from .properties import PropertySet, PROVED
+from .random_sim import simulate
+from helpers.query_log import timed_check
+from .solver_portfolio import SolverPortfolio
+from .branch_correlation import consistent_paths
+from .elaboration import attach, init_store
+from .signal_index import UpdateTable
+from .levelize import CombNetwork
+from .scheduler import Schedule, changing_signals, written
+from .bmc import BoundedModelChecker
+from .kinduction import KInduction
+from .cfg_pool import CFGPool, definition_key, parameter_overrides
+from .case_encoding import arm_count
+from .planner import PathPlan
+from .incremental import ResultCache
 import re
 import os
 from optparse import OptionParser
@@ -32,14 +47,120 @@ class ExecutionEngine:
     search_strategy = DepthFirst()
     debug: bool = False
     done: bool = False
+    multi_property: bool = False
+    sva_monitors = None
+    # cooperative time budget and on-disk progress, see engine/checkpoint.py
+    deadline = None
+    checkpoint = None
+    resume: bool = False
+    sim_prepass: bool = False
+    model_cache = None
+    slicer = None
+    branch_table = None
+    correlate_branches: bool = False
+    # module name -> ModuleTable built once per SystemVerilog design, see engine/elaboration.py
+    elaboration = None
+    # propagate only the signals updated since the previous always block, see engine/signal_index.py
+    event_driven: bool = False
+    # evaluate the continuous assigns in level order, see engine/levelize.py
+    levelize: bool = False
+    # run always blocks by their timing control, see engine/scheduler.py
+    schedule: bool = False
+    # unpacked arrays as Z3 arrays, see helpers/memory_model.py
+    memory_model: bool = False
+    # unroll the transition relation this many cycles instead of enumerating paths, see engine/bmc.py
+    bmc_depth: int = 0
+    # try to prove the assertions by k-induction up to this k before exploring, see engine/kinduction.py
+    kinduction_depth: int = 0
+    # property name -> (label, k) of the assertions k-induction proved
+    proofs = {}
+    # report the size of the path space instead of exploring it, see engine/planner.py
+    plan: bool = False
+    # ResultCache of property results reused across runs for unchanged definitions, see engine/incremental.py
+    results = None
+
+    def start_path(self, m: ExecutionManager, total_paths: int) -> int:
+        """Index of the first path to explore, taken from the checkpoint when resuming."""
+        if self.checkpoint is None or not self.resume:
+            return 0
+        data = self.checkpoint.load(total_paths)
+        if data is None:
+            return 0
+        first_path = self.checkpoint.restore(m, data)
+        print(f"Resuming at path {first_path} of {total_paths}")
+        return first_path
+
+    def out_of_time(self, m: ExecutionManager, next_path: int, total_paths: int, explored: int) -> bool:
+        """Checked between paths: checkpoint when one is due and stop once the deadline expired."""
+        elapsed = self.deadline.elapsed() if self.deadline is not None else 0.0
+        if self.checkpoint is not None and self.checkpoint.due(next_path):
+            self.checkpoint.save(m, next_path, total_paths, explored, elapsed, getattr(self, "cache", None))
+        if self.deadline is not None and self.deadline.expired():
+            print("Execution time limit exceeded. Stopping exploration.")
+            return True
+        return False
+
+    def interruptible(self, paths):
+        """The path indices of an exploration loop, with SIGINT and SIGTERM stopping the deadline
+        only while the loop runs. The previous handlers are back once the loop is left, whether
+        it ends, breaks, returns or raises, as that closes this generator."""
+        if self.deadline is None:
+            yield from paths
+            return
+        with self.deadline.handling_signals():
+            yield from paths
+
+    def reuse_results(self, m: ExecutionManager, definitions: dict, num_cycles) -> bool:
+        """Put back the saved results of unchanged definitions; True when nothing is left to explore."""
+        if self.results is None or m.properties is None:
+            return False
+        self.results.reuse(m.properties, definitions, int(num_cycles))
+        return m.properties.all_decided()
+
+    def finish_exploration(self, m: ExecutionManager, next_path: int, total_paths: int, explored: int, stopped: bool, num_cycles) -> None:
+        """Save the final checkpoint and print the run summary, also when the run was cut short."""
+        elapsed = self.deadline.elapsed() if self.deadline is not None else 0.0
+        if self.checkpoint is not None:
+            self.checkpoint.save(m, next_path, total_paths, explored, elapsed, getattr(self, "cache", None))
+        print(f"Explored {explored} paths this run, {next_path} of {total_paths} enumerated, solver time {m.solver_time:.2f}s")
+        if len(m.domain_stats) > 0:
+            decided = sum(stats[0] + stats[1] for stats in m.domain_stats.values())
+            simulated = sum(stats[3] for stats in m.domain_stats.values())
+            queries = decided + simulated + sum(stats[2] for stats in m.domain_stats.values())
+            print(f"Abstract domain decided {decided} of {queries} branch feasibility queries, {simulated} taken by simulation")
+            if self.debug:
+                for label, stats in m.domain_stats.items():
+                    print(f"  {label}: {stats[0]} feasible, {stats[1]} infeasible, {stats[2]} solver, {stats[3]} simulated")
+        if m.model_cache is not None:
+            print(m.model_cache.summary())
+        if m.slicer is not None:
+            print(m.slicer.summary())
+        if m.branch_table is not None:
+            print(m.branch_table.summary())
+        if m.comb_networks is not None:
+            for module_name, network in m.comb_networks.items():
+                print(f"{module_name}: {network.summary()}")
+        if SolverPortfolio.active is not None:
+            print(SolverPortfolio.active.summary())
+        self.search_strategy.report()
+        if stopped:
+            print(f"Stopped before path {next_path}" + (", rerun with --resume to continue" if self.checkpoint is not None else ""))
+        if m.properties is not None:
+            # properties still unknown after an interrupted run have not been checked on every path
+            if not stopped:
+                m.properties.finish()
+            if self.results is not None:
+                self.results.save(m.properties, int(num_cycles))
+            m.properties.report(num_cycles)
 
     def check_pc_SAT(self, s: Solver, constraint: ExprRef) -> bool:
         """Check if pc is satisfiable before taking path."""
         # the push adds a backtracking point if unsat
         s.push()
         s.add(constraint)
-        result = s.check()
-        if str(result) == "sat":
+        result = timed_check(s, "check_pc_SAT")
+        # unknown keeps the path, like an undecided branch in solve_pc
+        if str(result) in ("sat", "unknown"):
             return True
         else:
             s.pop()
@@ -54,7 +175,7 @@ class ExecutionEngine:
 
     def solve_pc(self, s: Solver) -> bool:
         """Solve path condition."""
-        result = str(s.check())
+        result = timed_check(s, "engine.solve_pc", model=True)
         if str(result) == "sat":
             model = s.model()
             return True
@@ -107,8 +228,8 @@ class ExecutionEngine:
                         self.count_conditionals(m, item.true_statement)
                         self.count_conditionals(m, item.false_statement)
                     elif isinstance(item, CaseStatement):
+                        m.num_paths *= arm_count(item)
                         for case in item.caselist:
-                            m.num_paths *= 2
                             self.count_conditionals(m, case.statement)
                     elif isinstance(item, ForStatement):
                         m.num_paths *= 2
@@ -127,8 +248,8 @@ class ExecutionEngine:
                 self.count_conditionals(m, items.true_statement)
                 self.count_conditionals(m, items.false_statement)
             if isinstance(items, CaseStatement):
+                m.num_paths *= arm_count(items)
                 for case in items.caselist:
-                    m.num_paths *= 2
                     self.count_conditionals(m, case.statement)
             if isinstance(items, ForStatement):
                 m.num_paths *= 2
@@ -363,6 +484,7 @@ class ExecutionEngine:
                         ...
                     else:
                         m.instance_count[item.module] = 1
+                    m.instance_parameters.setdefault(item.module, []).append(parameter_overrides(item))
                 if isinstance(item, Block):
                     self.module_count(m, item.items)
                 elif isinstance(item, Always):
@@ -463,18 +585,9 @@ class ExecutionEngine:
                                     pass
                                 
                             elif 'Case' in stmt_kind:
-                                # For case statements, we need to count the number of cases
-                                # Default to 2 paths if we can't determine case count
-                                case_multiplier = 2
-                                try:
-                                    if hasattr(obj, 'items') and obj.items:
-                                        case_multiplier = len(obj.items)
-                                        print(f"[count_conditionals_sv]   Case has {case_multiplier} items")
-                                    else:
-                                        print(f"[count_conditionals_sv]   Case items not accessible, using default multiplier")
-                                except Exception as e:
-                                    print(f"[count_conditionals_sv]   Error accessing case items: {e}")
-                                    pass
+                                # one path per arm, the implicit default arm included, see engine/case_encoding.py
+                                case_multiplier = arm_count(obj) if obj.kind == ps.StatementKind.Case else len(obj.items)
+                                print(f"[count_conditionals_sv]   Case has {case_multiplier} arms")
                                 
                                 old_paths = self.manager.num_paths
                                 self.manager.num_paths *= case_multiplier
@@ -922,7 +1035,7 @@ class ExecutionEngine:
                         manager.config[name] = paths[i][j]
 
                 manager.path_code = paths[i][0]
-                manager.prev_store = state.store
+                manager.prev_store = state.store.fork()
                 init_state(state, manager.prev_store, ast)
                 self.search_strategy.visit_module(manager, state, ast, modules_dict)
                 manager.cycle += 1
@@ -967,6 +1080,7 @@ class ExecutionEngine:
                 for module in manager.intermodule_dependencies:
                     module = {}
                 state.pc.reset()
+                state.domain.reset()
 
                 manager.ignore = False
                 manager.abandon = False
@@ -994,6 +1108,8 @@ class ExecutionEngine:
         # modules => List of DefinitionSymbol
         # visitor => SymbolicDFS
         gc.collect()
+        if self.bmc_depth > 0:
+            print("BMC encodes pyverilog modules only, exploring paths instead")
         print(f"Executing for {num_cycles} clock cycles")
         self.module_depth += 1
         state: SymbolicState = SymbolicState()
@@ -1001,7 +1117,9 @@ class ExecutionEngine:
             manager: ExecutionManager = ExecutionManager()
             manager.cache = self.cache
             manager.sv = True
+            manager.schedules = {} if self.schedule or self.plan else None
             manager.debugging = False
+            manager.cfg_pool = CFGPool()
             modules_dict = {}
             # a dictionary keyed by module name, that gives the list of cfgs
             cfgs_by_module = {}
@@ -1019,7 +1137,9 @@ class ExecutionEngine:
                 #print(f"[execute_sv]getKindString: f{module.getKindString()}")
                 instanceCount = module.instanceCount
                 print(f"instanceCount of {module.getArticleKindString()}: {instanceCount}")
-                self.init_run_sv(sub_manager, module) # module : DefinitionSymbol
+                if not self.plan:
+                    # a plan counts the CFG paths instead of this per-branch estimate
+                    self.init_run_sv(sub_manager, module) # module : DefinitionSymbol
                 print(f"module_count_sv:")
                 self.module_count_sv(manager, module) 
                 if sv_module_name in manager.instance_count:
@@ -1030,25 +1150,13 @@ class ExecutionEngine:
                     for i in range(num_instances):
                         instance_name = f"{sv_module_name}_{i}"
                         manager.names_list.append(instance_name)
-                        cfgs_by_module[instance_name] = []
-                        # build X CFGx for the particular module 
-                        cfg = CFG()
-                        cfg.reset()
-                        cfg.get_always(manager, state, module.items)
-                        cfg_count = len(cfg.always_blocks)
-                        for k in range(cfg_count):
-                            cfg.basic_blocks(manager, state, cfg.always_blocks[k])
-                            cfg.partition()
-                            # print(cfg.all_nodes)
-                            # print(cfg.partition_points)
-                            # print(len(cfg.basic_block_list))
-                            # print(cfg.edgelist)
-                            cfg.build_cfg(manager, state)
-                            cfg.module_name = ast.name
-
-                            cfgs_by_module[instance_name].append(deepcopy(cfg))
-                            cfg.reset()
-                            #print(cfg.paths)
+                        # instances with the same overrides share their CFGs, see engine/cfg_pool.py
+                        key = definition_key(sv_module_name, manager.instance_parameters.get(sv_module_name, []), i)
+                        cfgs, schedule = manager.cfg_pool.get(key, lambda: self.definition_cfgs(manager, state, module, ast.name))
+                        cfg_count = len(cfgs)
+                        cfgs_by_module[instance_name] = cfgs
+                        if manager.schedules is not None:
+                            manager.schedules[instance_name] = schedule
                         state.store[instance_name] = {}
                         manager.dependencies[instance_name] = {}
                         manager.intermodule_dependencies[instance_name] = {}
@@ -1062,6 +1170,8 @@ class ExecutionEngine:
                     cfg.get_always_sv(manager, state, module)
                     cfg_count = len(cfg.always_blocks)
                     always_blocks_by_module[sv_module_name] = deepcopy(cfg.always_blocks)
+                    if manager.schedules is not None:
+                        manager.schedules[sv_module_name] = Schedule(always_blocks_by_module[sv_module_name])
                     for k in range(cfg_count):
                         cfg.basic_blocks(manager, state, always_blocks_by_module[sv_module_name][k])
                         cfg.partition()
@@ -1079,6 +1189,9 @@ class ExecutionEngine:
                     manager.dependencies[sv_module_name] = {}
                     manager.intermodule_dependencies[sv_module_name] = {}
                     manager.cond_assigns[sv_module_name] = {}
+            if self.plan:
+                PathPlan(cfgs_by_module, int(num_cycles), manager.schedules).report()
+                return
             total_paths = 1
             for x in manager.child_num_paths.values():
                 total_paths *= x
@@ -1117,6 +1230,11 @@ class ExecutionEngine:
             mapped_paths[name] = {}
         manager.curr_module = manager.names_list[0]
 
+        if manager.schedules is not None:
+            for module_name, schedule in manager.schedules.items():
+                schedule.prune(cfgs_by_module.get(module_name, []))
+                print(f"Schedule of {module_name}: {schedule.summary()}")
+
         # index into cfgs list
         curr_cfg = 0
         for module_name in cfgs_by_module:
@@ -1129,8 +1247,9 @@ class ExecutionEngine:
         single_paths_by_module = {}
         total_paths_by_module = {}
         for module_name in cfgs_by_module:
-            single_paths_by_module[module_name] = list(product(*mapped_paths[module_name].values()))
-            total_paths_by_module[module_name] = list(tuple(product(single_paths_by_module[module_name], repeat=int(num_cycles))))
+            # instances sharing their CFGs share the path table too
+            single_paths_by_module[module_name], total_paths_by_module[module_name] = manager.cfg_pool.table(cfgs_by_module[module_name], lambda: self.path_table(cfgs_by_module[module_name], module_name, num_cycles))
+        print(manager.cfg_pool.summary())
         # {total_paths_by_module}")
         keys, values = zip(*total_paths_by_module.items())
         total_paths = [dict(zip(keys, path)) for path in product(*values)]
@@ -1142,27 +1261,64 @@ class ExecutionEngine:
         # for each combinatoin of multicycle paths
 
         print(f"Total paths: {len(total_paths)}")
-        for i in range(len(total_paths)):
-            manager.prev_store = state.store
+        if self.multi_property:
+            manager.properties = PropertySet()
+            manager.properties.collect(cfgs_by_module)
+        manager.sva_monitors = self.sva_monitors
+        if manager.sva_monitors is not None and manager.properties is not None:
+            manager.sva_monitors.register(manager.properties, cfgs_by_module.keys())
+        if self.reuse_results(manager, {get_module_name(module): module for module in modules}, num_cycles):
+            self.finish_exploration(manager, 0, len(total_paths), 0, False, num_cycles)
+            return
+        manager.model_cache = self.model_cache
+        manager.slicer = self.slicer
+        manager.branch_table = self.branch_table
+        if self.elaboration is not None:
+            attach(manager, self.elaboration)
+        first_path = self.start_path(manager, len(total_paths))
+        next_path = len(total_paths)
+        explored = 0
+        stopped = False
+        for i in self.interruptible(range(first_path, len(total_paths))):
+            if self.out_of_time(manager, i, len(total_paths), explored):
+                next_path = i
+                stopped = True
+                break
+            if manager.properties is not None:
+                manager.properties.path_index = i
+                reachable = manager.properties.reachable(total_paths[i], cfgs_by_module)
+                if manager.sva_monitors is not None:
+                    # compiled properties are checked at every cycle of every path
+                    reachable |= manager.sva_monitors.asserted()
+                # nothing left to decide on this path
+                if not manager.properties.undecided(reachable):
+                    continue
+            manager.prev_store = state.store.fork()
+            if manager.sva_monitors is not None:
+                manager.sva_monitors.reset()
             print("------------------------")
             print("initializing state")
-            init_state(state, manager.prev_store, module, visitor) # state, module, SymbolicDFS
-            # initalize inputs with symbols for all submodules too
-            for module_name in manager.names_list:
-                manager.curr_module = module_name
-                # actually want to terminate this part after the decl and comb part
-                # TODO:compilation.getRoot().visit(my_visitor_for_symbol.visit)
-                print(f"module name: {type(modules_dict[module_name])}")
-                visitor.dfs(modules_dict[module_name])
-                #self.search_strategy.visit_module(manager, state, ast, modules_dict)
-                
-            for cfg_idx in range(cfg_count):
-                for node in cfgs_by_module[manager.curr_module][cfg_idx].decls:
-                    visitor.dfs(node)
-                    #self.search_strategy.visit_stmt(manager, state, node, modules_dict, None)
-                for node in cfgs_by_module[manager.curr_module][cfg_idx].comb:
-                    visitor.dfs(node)
-                    #self.search_strategy.visit_stmt(manager, state, node, modules_dict, None) 
+            if self.elaboration is not None:
+                # the symbols were walked once up front, so the store is reset from the tables
+                init_store(manager, state, self.elaboration)
+            else:
+                init_state(state, manager.prev_store, module, visitor) # state, module, SymbolicDFS
+                # initalize inputs with symbols for all submodules too
+                for module_name in manager.names_list:
+                    manager.curr_module = module_name
+                    # actually want to terminate this part after the decl and comb part
+                    # TODO:compilation.getRoot().visit(my_visitor_for_symbol.visit)
+                    print(f"module name: {type(modules_dict[module_name])}")
+                    visitor.dfs(modules_dict[module_name])
+                    #self.search_strategy.visit_module(manager, state, ast, modules_dict)
+
+                for cfg_idx in range(cfg_count):
+                    for node in cfgs_by_module[manager.curr_module][cfg_idx].decls:
+                        visitor.dfs(node)
+                        #self.search_strategy.visit_stmt(manager, state, node, modules_dict, None)
+                    for node in cfgs_by_module[manager.curr_module][cfg_idx].comb:
+                        visitor.dfs(node)
+                        #self.search_strategy.visit_stmt(manager, state, node, modules_dict, None) 
    
             manager.curr_module = manager.names_list[0]
             # makes assumption top level module is first in line
@@ -1177,30 +1333,38 @@ class ExecutionEngine:
                 manager.curr_module = manager.names_list[modules_seen]
                 manager.cycle = 0
                 for complete_single_cycle_path in curr_path[module_name]:
-                    for cfg_path in complete_single_cycle_path:
-                        directions = cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].compute_direction(cfg_path)
-                        k: int = 0
-                        for basic_block_idx in cfg_path:
-                            if basic_block_idx < 0: 
-                                # dummy node
-                                continue
-                            else:
-                                direction = directions[k]
-                                k += 1
-                                basic_block = cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].basic_block_list[basic_block_idx]
-                                for stmt in basic_block:
-                                    # print(f"updating curr mod {manager.curr_module}")
-                                    #self.check_state(manager, state)
-                                    self.search_strategy.visit_stmt(manager, state, stmt, modules_dict, direction)
+                    if manager.schedules is not None and module_name in manager.schedules:
+                        self.scheduled_cycle(manager, state, module_name, complete_single_cycle_path, cfgs_by_module[module_name], modules_dict)
+                    else:
+                        for cfg_path in complete_single_cycle_path:
+                            directions = cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].compute_direction(cfg_path)
+                            k: int = 0
+                            for basic_block_idx in cfg_path:
+                                if basic_block_idx < 0: 
+                                    # dummy node
+                                    continue
+                                else:
+                                    direction = directions[k]
+                                    k += 1
+                                    basic_block = cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].basic_block_list[basic_block_idx]
+                                    for stmt in basic_block:
+                                        # print(f"updating curr mod {manager.curr_module}")
+                                        #self.check_state(manager, state)
+                                        self.search_strategy.visit_stmt(manager, state, stmt, modules_dict, direction)
                     # only do once, and the last CFG 
                     #for node in cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].comb:
                         #self.search_strategy.visit_stmt(manager, state, node, modules_dict, None)  
+                    if manager.sva_monitors is not None:
+                        manager.sva_monitors.step(manager, state)
                     manager.cycle += 1
+                    if manager.properties is not None and not manager.properties.undecided(reachable):
+                        break
                 modules_seen += 1
             manager.cycle = 0
             self.done = True
             self.check_state(manager, state)
             self.done = False
+            explored += 1
 
             manager.curr_level = 0
             for module_name in manager.instances_seen:
@@ -1208,7 +1372,12 @@ class ExecutionEngine:
                 manager.instances_loc[module_name] = ""
             if self.debug:
                 print("------------------------")
-            if (manager.assertion_violation):
+            if manager.properties is not None:
+                # violations were recorded per property as they fired
+                manager.assertion_violation = False
+                if manager.properties.all_decided():
+                    break
+            elif (manager.assertion_violation):
                 print("Assertion violation")
                 #manager.assertion_violation = False
                 counterexample = {}
@@ -1232,9 +1401,11 @@ class ExecutionEngine:
                     print(counterexample)
                 else:
                     print("UNSAT")
+                self.finish_exploration(manager, i + 1, len(total_paths), explored, False, num_cycles)
                 return
             
             state.pc.reset()
+            state.domain.reset()
 
             for module in manager.dependencies:
                 module = {}
@@ -1246,18 +1417,103 @@ class ExecutionEngine:
             for name in manager.names_list:
                 state.store[name] = {}
 
+        self.finish_exploration(manager, next_path, len(total_paths), explored, stopped, num_cycles)
         self.module_depth -= 1
 
+    def definition_cfgs(self, manager: ExecutionManager, state: SymbolicState, module, top_name: str):
+        """CFGs of the always blocks of a module definition, and their schedule when scheduling."""
+        cfgs = []
+        cfg = CFG()
+        cfg.reset()
+        cfg.get_always(manager, state, module.items)
+        # reset() drops always_blocks, so keep them for the blocks after the first
+        blocks = list(cfg.always_blocks)
+        schedule = None
+        if manager.schedules is not None:
+            schedule = Schedule(blocks, changing_signals(module) if isinstance(module, ModuleDef) else None)
+        for block in blocks:
+            cfg.basic_blocks(manager, state, block)
+            cfg.partition()
+            cfg.build_cfg(manager, state)
+            cfg.module_name = top_name
+            cfgs.append(deepcopy(cfg))
+            cfg.reset()
+        return cfgs, schedule
+
+    def path_table(self, cfgs, module_name: str, num_cycles: int):
+        """Single cycle paths through a module's CFGs, and their sequences over num_cycles."""
+        if self.correlate_branches:
+            single_paths, full = consistent_paths(cfgs)
+            print(f"Branch correlation kept {len(single_paths)} of {full} single cycle paths of {module_name}")
+        else:
+            single_paths = list(product(*[cfg.paths for cfg in cfgs]))
+        return single_paths, list(tuple(product(single_paths, repeat=int(num_cycles))))
+
+    def run_cfg_path(self, manager: ExecutionManager, state: SymbolicState, cfg, cfg_path, modules_dict) -> None:
+        """Visit the basic blocks along one path of a CFG."""
+        directions = cfg.compute_direction(cfg_path)
+        k: int = 0
+        for basic_block_idx in cfg_path:
+            if basic_block_idx < 0:
+                # dummy node
+                continue
+            direction = directions[k]
+            k += 1
+            for stmt in cfg.basic_block_list[basic_block_idx]:
+                self.search_strategy.visit_stmt(manager, state, stmt, modules_dict, direction)
+
+    def scheduled_cycle(self, manager: ExecutionManager, state: SymbolicState, module_name: str, single_cycle_path, cfgs, modules_dict) -> None:
+        """One clock edge of a module under its Schedule: the clocked blocks with non-blocking
+        updates, then the combinational blocks and assigns in level order."""
+        schedule = manager.schedules[module_name]
+        before = state.store.snapshot()
+        changes = []
+        for k in schedule.clocked:
+            # every clocked block reads the values from before the edge
+            state.store.restore(before)
+            self.run_cfg_path(manager, state, cfgs[k], single_cycle_path[k], modules_dict)
+            changes += written(before, state.store.snapshot())
+        state.store.restore(before)
+        for module, signal, value in changes:
+            state.store.setdefault(module)[signal] = value
+
+        run_block = lambda k: self.run_cfg_path(manager, state, cfgs[k], single_cycle_path[k], modules_dict)
+        for k in schedule.comb:
+            if k not in schedule.comb_blocks:
+                run_block(k)
+        network = manager.comb_networks.get(module_name) if manager.comb_networks is not None else None
+        if network is not None:
+            visit = lambda node: self.search_strategy.visit_stmt(manager, state, node, modules_dict, None)
+            network.evaluate(manager, state, visit, run_block, dict(enumerate(single_cycle_path)))
+        else:
+            for k in schedule.comb_blocks:
+                run_block(k)
+
     #@profile     
     def execute(self, ast: ModuleDef, modules, manager: Optional[ExecutionManager], directives, num_cycles: int) -> None:
         """Drives symbolic execution."""
         gc.collect()
+        if self.bmc_depth > 0 and manager is None:
+            checker = BoundedModelChecker(ast)
+            checker.check(self.bmc_depth)
+            checker.report(self.bmc_depth)
+            return
+        if self.kinduction_depth > 0 and manager is None:
+            prover = KInduction(ast)
+            prover.prove(self.kinduction_depth)
+            prover.report(self.kinduction_depth)
+            self.proofs = {monitor.name: (monitor.label, monitor.cycle) for monitor in prover.monitors.values() if monitor.status == PROVED}
+            if prover.decided():
+                # every assertion is proved or has a counterexample; nothing left to explore
+                return
         print(f"Executing for {num_cycles} clock cycles")
         self.module_depth += 1
         state: SymbolicState = SymbolicState()
         if manager is None:
             manager: ExecutionManager = ExecutionManager()
             manager.debugging = False
+            manager.cfg_pool = CFGPool()
+            manager.schedules = {} if self.schedule or self.plan else None
             modules_dict = {}
             # a dictionary keyed by module name, that gives the list of cfgs
             cfgs_by_module = {}
@@ -1278,25 +1534,13 @@ class ExecutionEngine:
                     for i in range(num_instances):
                         instance_name = f"{module.name}_{i}"
                         manager.names_list.append(instance_name)
-                        cfgs_by_module[instance_name] = []
-                        # build X CFGx for the particular module 
-                        cfg = CFG()
-                        cfg.reset()
-                        cfg.get_always(manager, state, module.items)
-                        cfg_count = len(cfg.always_blocks)
-                        for k in range(cfg_count):
-                            cfg.basic_blocks(manager, state, cfg.always_blocks[k])
-                            cfg.partition()
-                            # print(cfg.all_nodes)
-                            # print(cfg.partition_points)
-                            # print(len(cfg.basic_block_list))
-                            # print(cfg.edgelist)
-                            cfg.build_cfg(manager, state)
-                            cfg.module_name = ast.name
-
-                            cfgs_by_module[instance_name].append(deepcopy(cfg))
-                            cfg.reset()
-                            #print(cfg.paths)
+                        # instances with the same overrides share their CFGs, see engine/cfg_pool.py
+                        key = definition_key(module.name, manager.instance_parameters.get(module.name, []), i)
+                        cfgs, schedule = manager.cfg_pool.get(key, lambda: self.definition_cfgs(manager, state, module, ast.name))
+                        cfg_count = len(cfgs)
+                        cfgs_by_module[instance_name] = cfgs
+                        if manager.schedules is not None:
+                            manager.schedules[instance_name] = schedule
 
 
                         state.store[instance_name] = {}
@@ -1312,6 +1556,8 @@ class ExecutionEngine:
                     cfg.get_always(manager, state, ast.items)
                     cfg_count = len(cfg.always_blocks)
                     always_blocks_by_module[module.name] = deepcopy(cfg.always_blocks)
+                    if manager.schedules is not None:
+                        manager.schedules[module.name] = Schedule(always_blocks_by_module[module.name], changing_signals(module))
                     for k in range(cfg_count):
                         cfg.basic_blocks(manager, state, always_blocks_by_module[module.name][k])
                         cfg.partition()
@@ -1329,6 +1575,9 @@ class ExecutionEngine:
                     manager.dependencies[module.name] = {}
                     manager.intermodule_dependencies[module.name] = {}
                     manager.cond_assigns[module.name] = {}
+            if self.plan:
+                PathPlan(cfgs_by_module, int(num_cycles), manager.schedules).report()
+                return
             total_paths = 1
             for x in manager.child_num_paths.values():
                 total_paths *= x
@@ -1365,6 +1614,11 @@ class ExecutionEngine:
             mapped_paths[name] = {}
         manager.curr_module = manager.names_list[0]
 
+        if manager.schedules is not None:
+            for module_name, schedule in manager.schedules.items():
+                schedule.prune(cfgs_by_module.get(module_name, []))
+                print(f"Schedule of {module_name}: {schedule.summary()}")
+
         # index into cfgs list
         curr_cfg = 0
         for module_name in cfgs_by_module:
@@ -1379,8 +1633,9 @@ class ExecutionEngine:
         single_paths_by_module = {}
         total_paths_by_module = {}
         for module_name in cfgs_by_module:
-            single_paths_by_module[module_name] = list(product(*mapped_paths[module_name].values()))
-            total_paths_by_module[module_name] = list(tuple(product(single_paths_by_module[module_name], repeat=int(num_cycles))))
+            # instances sharing their CFGs share the path table too
+            single_paths_by_module[module_name], total_paths_by_module[module_name] = manager.cfg_pool.table(cfgs_by_module[module_name], lambda: self.path_table(cfgs_by_module[module_name], module_name, num_cycles))
+        print(manager.cfg_pool.summary())
         #print(f"tp {total_paths_by_module}")
         keys, values = zip(*total_paths_by_module.items())
         total_paths = [dict(zip(keys, path)) for path in product(*values)]
@@ -1391,8 +1646,54 @@ class ExecutionEngine:
 
         # for each combinatoin of multicycle paths
 
-        for i in range(len(total_paths)):
-            manager.prev_store = state.store
+        if self.multi_property:
+            manager.properties = PropertySet()
+            manager.properties.collect(cfgs_by_module)
+            for name, (label, k) in self.proofs.items():
+                manager.properties.prove(name, label, k)
+        if self.reuse_results(manager, {module.name: module for module in modules}, num_cycles):
+            self.finish_exploration(manager, 0, len(total_paths), 0, False, num_cycles)
+            return
+        if self.sim_prepass:
+            violations = simulate(manager, modules, num_cycles)
+            for name, (stmt, cycle, witness) in violations.items():
+                if manager.properties is not None:
+                    manager.properties.witness(name, str(stmt.syscall), cycle, witness)
+                else:
+                    print(f"Assertion violation {name} found by simulation at cycle {cycle}")
+                    print(witness)
+            if manager.properties is None and len(violations) > 0:
+                self.finish_exploration(manager, 0, len(total_paths), 0, False, num_cycles)
+                return
+        manager.model_cache = self.model_cache
+        manager.slicer = self.slicer
+        manager.branch_table = self.branch_table
+        manager.event_driven = self.event_driven
+        manager.memory_model = self.memory_model
+        if self.event_driven:
+            manager.updates = UpdateTable(manager.updates)
+        if self.levelize or manager.schedules is not None:
+            blocks = lambda name: manager.schedules[name].comb_blocks if manager.schedules is not None and name in manager.schedules else None
+            manager.comb_networks = {name: CombNetwork(cfgs[0].comb, blocks(name)) for name, cfgs in cfgs_by_module.items() if cfgs}
+        first_path = self.start_path(manager, len(total_paths))
+        next_path = len(total_paths)
+        explored = 0
+        stopped = False
+        # the strategy picks the order; DepthFirst keeps the lexical one
+        for i in self.interruptible(self.search_strategy.order(manager, first_path, total_paths, cfgs_by_module)):
+            if self.out_of_time(manager, i, len(total_paths), explored):
+                next_path = i
+                stopped = True
+                break
+            if manager.properties is not None:
+                manager.properties.path_index = i
+                reachable = manager.properties.reachable(total_paths[i], cfgs_by_module)
+                # nothing left to decide on this path
+                if not manager.properties.undecided(reachable):
+                    continue
+            manager.prev_store = state.store.fork()
+            # the symbols standing for memory reads belong to the path that made them
+            manager.memory_reads = {}
             init_state(state, manager.prev_store, ast)
             # initalize inputs with symbols for all submodules too
             for module_name in manager.names_list:
@@ -1403,8 +1704,15 @@ class ExecutionEngine:
             for cfg_idx in range(cfg_count):
                 for node in cfgs_by_module[manager.curr_module][cfg_idx].decls:
                     self.search_strategy.visit_stmt(manager, state, node, modules_dict, None)
-                for node in cfgs_by_module[manager.curr_module][cfg_idx].comb:
-                    self.search_strategy.visit_stmt(manager, state, node, modules_dict, None) 
+                if manager.comb_networks is None:
+                    for node in cfgs_by_module[manager.curr_module][cfg_idx].comb:
+                        self.search_strategy.visit_stmt(manager, state, node, modules_dict, None) 
+            if manager.comb_networks is not None:
+                for network in manager.comb_networks.values():
+                    network.reset()
+            if manager.comb_networks is not None and manager.curr_module in manager.comb_networks:
+                network = manager.comb_networks[manager.curr_module]
+                network.evaluate(manager, state, lambda node: self.search_strategy.visit_stmt(manager, state, node, modules_dict, None))
 
    
             manager.curr_module = manager.names_list[0]
@@ -1421,31 +1729,42 @@ class ExecutionEngine:
                 manager.curr_module = manager.names_list[modules_seen]
                 manager.cycle = 0
                 for complete_single_cycle_path in curr_path[module_name]:
-                    for cfg_path in complete_single_cycle_path:
-                        directions = cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].compute_direction(cfg_path)
-                        k: int = 0
-                        for basic_block_idx in cfg_path:
-                            if basic_block_idx < 0: 
-                                # dummy node
-                                continue
-                            else:
-                                direction = directions[k]
-                                k += 1
-                                basic_block = cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].basic_block_list[basic_block_idx]
-                                for stmt in basic_block:
-                                    # print(f"updating curr mod {manager.curr_module}")
-                                    #self.check_state(manager, state)
-                                    self.search_strategy.visit_stmt(manager, state, stmt, modules_dict, direction)
-                                            # only do once, and the last CFG 
-                    for node in cfgs_by_module[module_name][cfg_count-1].comb:
-                        self.search_strategy.visit_stmt(manager, state, node, modules_dict, None)  
-                        print(state.store)
+                    if manager.schedules is not None and module_name in manager.schedules:
+                        self.scheduled_cycle(manager, state, module_name, complete_single_cycle_path, cfgs_by_module[module_name], modules_dict)
+                    else:
+                        for cfg_path in complete_single_cycle_path:
+                            directions = cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].compute_direction(cfg_path)
+                            k: int = 0
+                            for basic_block_idx in cfg_path:
+                                if basic_block_idx < 0: 
+                                    # dummy node
+                                    continue
+                                else:
+                                    direction = directions[k]
+                                    k += 1
+                                    basic_block = cfgs_by_module[module_name][complete_single_cycle_path.index(cfg_path)].basic_block_list[basic_block_idx]
+                                    for stmt in basic_block:
+                                        # print(f"updating curr mod {manager.curr_module}")
+                                        #self.check_state(manager, state)
+                                        self.search_strategy.visit_stmt(manager, state, stmt, modules_dict, direction)
+                                                # only do once, and the last CFG 
+                        if manager.comb_networks is not None:
+                            manager.comb_networks[module_name].evaluate(manager, state, lambda node: self.search_strategy.visit_stmt(manager, state, node, modules_dict, None))
+                            print(state.store)
+                        else:
+                            for node in cfgs_by_module[module_name][cfg_count-1].comb:
+                                self.search_strategy.visit_stmt(manager, state, node, modules_dict, None)  
+                                print(state.store)
                     manager.cycle += 1
+                    if manager.properties is not None and not manager.properties.undecided(reachable):
+                        break
                 modules_seen += 1
             manager.cycle = 0
             self.done = True
             self.check_state(manager, state)
             self.done = False
+            explored += 1
+            self.search_strategy.finish_path(manager, i)
 
             manager.curr_level = 0
             for module_name in manager.instances_seen:
@@ -1453,7 +1772,12 @@ class ExecutionEngine:
                 manager.instances_loc[module_name] = ""
             if self.debug:
                 print("------------------------")
-            if (manager.assertion_violation):
+            if manager.properties is not None:
+                # violations were recorded per property as they fired
+                manager.assertion_violation = False
+                if manager.properties.all_decided():
+                    break
+            elif (manager.assertion_violation):
                 print("Assertion violation")
                 #manager.assertion_violation = False
                 counterexample = {}
@@ -1477,9 +1801,11 @@ class ExecutionEngine:
                     print(counterexample)
                 else:
                     print("UNSAT")
+                self.finish_exploration(manager, i + 1, len(total_paths), explored, False, num_cycles)
                 return
             
             state.pc.reset()
+            state.domain.reset()
 
             for module in manager.dependencies:
                 module = {}
@@ -1491,6 +1817,7 @@ class ExecutionEngine:
             for name in manager.names_list:
                 state.store[name] = {}
 
+        self.finish_exploration(manager, next_path, len(total_paths), explored, stopped, num_cycles)
         self.module_depth -= 1
 
 
@@ -1509,7 +1836,7 @@ class ExecutionEngine:
 
         # mark this exploration of the submodule as seen and store the state so we don't have to explore it again.
         if manager.seen_mod[ast.name][manager_sub.path_code] == {}:
-            manager.seen_mod[ast.name][manager_sub.path_code] = state.store
+            manager.seen_mod[ast.name][manager_sub.path_code] = state.store.fork()
         else:
             ...
             #print("already seen this")
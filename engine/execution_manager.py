@@ -8,7 +8,9 @@ from pyverilog.vparser.ast import WhileStatement, ForStatement, CaseStatement, B
 from pyverilog.vparser.ast import Value, Reg, Initial, Eq, Identifier, Initial,  NonblockingSubstitution, Decl, Always, Assign, NotEql, Case
 from pyverilog.vparser.ast import Concat, BlockingSubstitution, Parameter, StringConst, Wire, PortArg
 from helpers.utils import init_symbol
+from .case_encoding import arm_count
 from typing import Optional
+from collections.abc import Mapping
 # import pkg_resources
 # pkg_resources.require("pyslang==3.0.310")
 import pyslang as ps
@@ -42,6 +44,8 @@ class ExecutionManager:
     config = {}
     names_list = []
     instance_count = {}
+    # module name -> parameter overrides of each instance, in module_count order
+    instance_parameters = {}
     seen_mod = {}
     opt_1: bool = False
     curr_module: str = ""
@@ -65,6 +69,7 @@ class ExecutionManager:
     prev_store = {}
     reg_decls = set()
     reg_widths = {}
+    # the case statement whose items are being matched
     curr_case = None
     debug: bool = False
     initial_store = {}
@@ -75,11 +80,44 @@ class ExecutionManager:
     cache = None
     path_count = 0
     branch_count = 0
+    # declared bit widths per module, and the width each z3 symbol was first created with
+    sig_widths = {}
+    symbol_widths = {}
+    param_values = {}
+    # PropertySet when checking all assertions in one pass
+    properties = None
+    # MonitorSet of compiled SVA properties, stepped at every cycle boundary
+    sva_monitors = None
+    # (module, lineno, direction, cycle) branch directions reached by the simulation pre-pass
+    sim_covered = set()
+    # (lineno, direction) of the branch being decided, looked up in sim_covered
+    curr_branch = None
+    # branch label -> [decided feasible by the abstract domain, decided infeasible, sent to the solver,
+    # taken by the simulation pre-pass]
+    domain_stats = {}
+    # ModelCache consulted by solve_pc before calling the solver
+    model_cache = None
+    # ConstraintSlicer that solves only the part of the pc connected to a new branch condition
+    slicer = None
+    # BranchTable that solves both directions of a branch and shares the answers with sibling paths
+    branch_table = None
+    # always blocks propagate only the signals updated since the previous propagation, see engine/signal_index.py
+    event_driven: bool = False
+    # module name -> CombNetwork evaluating its continuous assigns in level order
+    comb_networks = None
+    # module name -> Schedule of its always blocks by timing control
+    schedules = None
+    # CFGPool sharing the CFGs and path tables of instances of the same definition
+    cfg_pool = None
+    # model unpacked arrays as Z3 arrays, see helpers/memory_model.py
+    memory_model: bool = False
+    # store symbol -> Z3 term of the memory read it stands for, reset at the start of every path
+    memory_reads = {}
 
     def merge_states(self, state: SymbolicState, store, flag, module_name=""):
         """Merges two states. The flag is for when we are just merging a particular module"""
         for key, val in state.store.items():
-            if type(val) != dict:
+            if not isinstance(val, Mapping):
                 continue
             else:
                 for key2, var in val.items():
@@ -117,8 +155,9 @@ class ExecutionManager:
                             self.count_conditionals(m, item.true_statement)
                             self.count_conditionals(m, item.false_statement)
                         if isinstance(item, CaseStatement):
+                            # one path per arm, the implicit default arm included
+                            m.num_paths *= arm_count(item)
                             for case in item.caselist:
-                                m.num_paths *= 2
                                 self.count_conditionals(m, case.statement)
                 if isinstance(item, Block):
                     self.count_conditionals(m, item.items)
@@ -134,8 +173,8 @@ class ExecutionManager:
                 self.count_conditionals(m, items.true_statement)
                 self.count_conditionals(m, items.false_statement)
             if isinstance(items, CaseStatement):
+                m.num_paths *= arm_count(items)
                 for case in items.caselist:
-                    m.num_paths *= 2
                     self.count_conditionals(m, case.statement)
 
     def count_conditionals_2(self, m:ExecutionManager, items) -> int:
@@ -0,0 +1,178 @@
+"""Incremental re-exploration. Every module definition gets a content hash of its source and,
+transitively, of the definitions it instantiates. Property results are saved along with these
+hashes. On the next run, a result whose definition hash is unchanged is put back before exploring,
+and PropertySet.reachable then skips the paths that only reach reused properties, as it does for
+proved ones. An instance's ports are bound to the values its parent drives, so the cone of influence
+of an assertion is its own definition, whatever it instantiates, and every definition instantiating
+it along with everything those instantiate: results are keyed by this context hash."""
+
+import hashlib
+import json
+import os
+import re
+from pyverilog.vparser.ast import Node, ModuleDef, InstanceList
+from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+from .properties import PropertySet, UNKNOWN, VIOLATED, HOLDS, PROVED
+
+RESULTS_VERSION = 2
+
+codegen = ASTCodeGenerator()
+
+
+def source_text(module) -> str:
+    """Source of a pyverilog ModuleDef (regenerated, so comments and layout don't count) or of a
+    pyslang DefinitionSymbol."""
+    if isinstance(module, ModuleDef):
+        return codegen.visit(module)
+    return str(module.syntax)
+
+
+def instantiated(node) -> set:
+    """Names of the definitions a pyverilog node instantiates."""
+    if isinstance(node, InstanceList):
+        return {node.module}
+    if isinstance(node, Node):
+        return set().union(*[instantiated(child) for child in node.children()])
+    return set()
+
+
+def definition_children(definitions: dict, texts: dict) -> dict:
+    """Definition name -> names of the definitions it instantiates."""
+    children = {}
+    for name, module in definitions.items():
+        if isinstance(module, ModuleDef):
+            children[name] = instantiated(module) & texts.keys()
+        else:
+            # any other definition the text names; a superset of what it instantiates
+            children[name] = {other for other in texts if other != name and re.search(rf"\b{re.escape(other)}\b", texts[name])}
+    return children
+
+
+def definition_hashes(definitions: dict) -> dict:
+    """Definition name -> hash of its source and of the hashes of the definitions it instantiates."""
+    texts = {name: source_text(module) for name, module in definitions.items()}
+    children = definition_children(definitions, texts)
+    hashes = {}
+
+    def visit(name: str, stack: tuple) -> str:
+        if name not in hashes:
+            digest = hashlib.sha256(texts[name].encode())
+            for child in sorted(children[name]):
+                if child not in stack:
+                    digest.update(visit(child, stack + (name,)).encode())
+            hashes[name] = digest.hexdigest()
+        return hashes[name]
+
+    for name in texts:
+        visit(name, ())
+    return hashes
+
+
+def context_hashes(definitions: dict) -> dict:
+    """Definition name -> hash of its definition hash and those of every definition that instantiates
+    it, transitively. An ancestor's hash covers all it instantiates, so an edit anywhere in a design
+    a definition is instantiated in changes its context hash."""
+    hashes = definition_hashes(definitions)
+    children = definition_children(definitions, {name: source_text(module) for name, module in definitions.items()})
+    parents = {name: set() for name in hashes}
+    for name in children:
+        for child in children[name]:
+            parents[child].add(name)
+    contexts = {}
+    for name in hashes:
+        ancestors, stack = set(), [name]
+        while stack:
+            for parent in parents[stack.pop()] - ancestors:
+                ancestors.add(parent)
+                stack.append(parent)
+        digest = hashlib.sha256(hashes[name].encode())
+        for ancestor in sorted(ancestors - {name}):
+            digest.update(hashes[ancestor].encode())
+        contexts[name] = digest.hexdigest()
+    return contexts
+
+
+def definition_of(module_name: str, hashes: dict):
+    """The definition of a module or instance name (instances are named <definition>_<i>)."""
+    if module_name in hashes:
+        return module_name
+    base, _, index = module_name.rpartition("_")
+    return base if index.isdigit() and base in hashes else None
+
+
+def still_valid(saved: dict, num_cycles: int) -> bool:
+    """Whether a result saved for some bound also answers this bound."""
+    if saved["status"] == PROVED:
+        return True
+    if saved["status"] == VIOLATED:
+        # a violation simulation found has no cycle to compare against the bound
+        return saved["cycle"] is None or saved["cycle"] < num_cycles
+    return saved["status"] == HOLDS and saved["bound"] >= num_cycles
+
+
+class ResultCache:
+    """Property results of earlier runs in a JSON file, with the context hashes they hold for."""
+    def __init__(self, path: str):
+        self.path = path
+        self.hashes = {}
+        # name -> saved entry of every result put back this run
+        self.reused = {}
+        self.saved = {}
+
+    def load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Ignoring unreadable results {self.path}")
+                return {}
+        if data.get("version") != RESULTS_VERSION:
+            print(f"Ignoring results {self.path}: written by another version")
+            return {}
+        return data
+
+    def unchanged(self, name: str, definitions: dict) -> bool:
+        definition = definition_of(name.partition(":")[0], self.hashes)
+        return definition is not None and definitions.get(definition) == self.hashes[definition]
+
+    def reuse(self, properties: PropertySet, definitions: dict, num_cycles: int) -> None:
+        """Hash the design and put back the saved results of definitions whose context is unchanged."""
+        self.hashes = context_hashes(definitions)
+        data = self.load()
+        self.saved = data.get("properties", {})
+        old_hashes = data.get("definitions", {})
+        for name, saved in self.saved.items():
+            if not self.unchanged(name, old_hashes) or not still_valid(saved, num_cycles):
+                continue
+            # a property this run doesn't have, e.g. of an instance that is gone, stays on file only
+            if name not in properties.monitors or properties.monitors[name].status != UNKNOWN:
+                continue
+            properties.reuse(name, saved["label"], saved["status"], saved["cycle"], saved["counterexample"])
+            self.reused[name] = saved
+        changed = sorted(name for name in self.hashes if old_hashes.get(name) != self.hashes[name])
+        print(f"Reused {len(self.reused)} property results from {self.path}; invalidated definitions: {', '.join(changed) if changed else 'none'}")
+
+    def save(self, properties: PropertySet, num_cycles: int) -> None:
+        """Write the decided results of this run, and keep earlier ones of unchanged definitions
+        that this run didn't have (e.g. of an instance that is gone)."""
+        old_hashes = self.load().get("definitions", {})
+        results = {name: saved for name, saved in self.saved.items() if self.unchanged(name, old_hashes)}
+        for monitor in properties.monitors.values():
+            if monitor.name in self.reused:
+                results[monitor.name] = self.reused[monitor.name]
+            elif monitor.status != UNKNOWN:
+                results[monitor.name] = {
+                    "label": monitor.label,
+                    "status": monitor.status,
+                    "cycle": monitor.cycle,
+                    "bound": num_cycles,
+                    "counterexample": None if monitor.counterexample is None else {k: str(v) for k, v in monitor.counterexample.items()},
+                }
+        data = {"version": RESULTS_VERSION, "definitions": self.hashes, "properties": results}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
+        print(f"Property results saved -> {self.path}")
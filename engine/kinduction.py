@@ -0,0 +1,82 @@
+"""k-induction on the BMC transition relation. For k = 0, 1, ... the base case checks that no
+assertion fires within k cycles of the initial state (that is plain BMC), and the inductive step
+checks that a trace of k cycles on which the assertion never fires, through distinct states (the
+simple-path constraint), can't fire it in the next cycle. A property whose step is unsat while its
+base case holds is proved for every depth, not just within a bound. Both solvers keep their
+unrolling from one k to the next."""
+
+import z3
+from z3 import Or, Not
+from .bmc import BoundedModelChecker
+from .properties import VIOLATED, HOLDS, UNKNOWN, PROVED
+
+
+class KInduction(BoundedModelChecker):
+    """Base case and inductive step side by side, one more cycle of each per k."""
+    def __init__(self, module, m=None):
+        super().__init__(module, m)
+        # the inductive step starts anywhere, so its solver has no initial values
+        self.step_solver = z3.Solver()
+        self.step_frames = []
+
+    def distinct(self, frames: list) -> None:
+        """Simple path: the state at the start of the last frame differs from every earlier one."""
+        if not self.state:
+            return
+        last = frames[-1]
+        for earlier in frames[:-1]:
+            self.step_solver.add(Or([last[name] != earlier[name] for name in sorted(self.state)]))
+
+    def prove(self, max_k: int) -> None:
+        self.frames = [self.frame(0)]
+        self.initial_values(self.frames[0])
+        self.step_frames = [self.frame(0)]
+        step_guards = []
+        for k in range(max_k):
+            base = self.unroll(self.solver, self.frames)
+            for name, reached in base.items():
+                monitor = self.monitors[name]
+                if monitor.status != UNKNOWN:
+                    continue
+                result, model = self.solve(self.solver, [reached], "base")
+                if result == "sat":
+                    self.violated(monitor, model, reached, k)
+
+            self.distinct(self.step_frames)
+            step_guards.append(self.unroll(self.step_solver, self.step_frames))
+            for name, reached in step_guards[k].items():
+                monitor = self.monitors[name]
+                if monitor.status != UNKNOWN:
+                    continue
+                # holds for k cycles from any state, fires in the next one
+                held = [Not(guards[name]) for guards in step_guards[:k] if name in guards]
+                result, _ = self.solve(self.step_solver, held + [reached], "step")
+                if result == "unsat":
+                    monitor.status = PROVED
+                    monitor.cycle = k
+            if self.monitors and all(monitor.status != UNKNOWN for monitor in self.monitors.values()):
+                print(f"k-induction decided every property at k={k}")
+                break
+        for monitor in self.monitors.values():
+            if monitor.status == UNKNOWN:
+                # neither violated nor proved: holds within the bound, like BMC
+                monitor.status = HOLDS
+
+    def decided(self) -> bool:
+        # an unconfirmed counterexample may be spurious, so exploration still has to look
+        return len(self.monitors) > 0 and all(monitor.status == PROVED or (monitor.status == VIOLATED and monitor.name not in self.unconfirmed)
+                                              for monitor in self.monitors.values())
+
+    def report(self, depth: int) -> None:
+        print(f"k-induction results ({len(self.monitors)} properties, up to k={depth}, {len(self.state)} state signals):")
+        for monitor in self.monitors.values():
+            if monitor.status == VIOLATED:
+                print(f"  {monitor.name} {monitor.label}: violated at cycle {monitor.cycle}{self.confirmation(monitor)}")
+                print(f"    counterexample: {monitor.counterexample}")
+            elif monitor.status == PROVED:
+                print(f"  {monitor.name} {monitor.label}: proved at k={monitor.cycle}")
+            else:
+                print(f"  {monitor.name} {monitor.label}: {monitor.status} within {depth} cycles, not inductive up to k={depth}")
+        if self.encoder.unsupported:
+            print(f"  over-approximated: {', '.join(sorted(self.encoder.unsupported))}")
+        print(f"Solver time {self.solver_time}")
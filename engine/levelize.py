@@ -0,0 +1,103 @@
+"""Levelized evaluation of the continuous assigns. The assign network is sorted topologically once
+per design, so each assign is visited after the assigns driving its inputs and at most once per
+cycle. An assign whose inputs and outputs are unchanged since its last visit on the path is
+skipped. Assigns on a combinational loop can't be ordered; they are reported when the network is
+built and visited once, in source order."""
+
+import networkx as nx
+from pyverilog.vparser.ast import Assign
+from .signal_index import identifiers, reads_and_writes
+from .execution_manager import ExecutionManager
+from .symbolic_state import SymbolicState
+
+
+def frozen(value):
+    """Store value in a form that can be compared later even if the value is a dict."""
+    if isinstance(value, dict):
+        return tuple(value.items())
+    return value
+
+
+class CombNetwork:
+    """The continuous assigns (and combinational always blocks) of a module in level order, with the
+    inputs they were last visited with."""
+    def __init__(self, assigns, blocks=None):
+        # the same assign can be collected once per CFG and instance
+        seen = {}
+        for assign in assigns:
+            if isinstance(assign, Assign):
+                seen.setdefault(id(assign), assign)
+        self.assigns = list(seen.values())
+        self.reads = [sorted(identifiers(assign.right)) for assign in self.assigns]
+        self.writes = [sorted(identifiers(assign.left)) for assign in self.assigns]
+        # combinational always blocks, by CFG index, ordered together with the assigns
+        self.blocks = {}
+        for key, block in (blocks or {}).items():
+            reads, writes = set(), set()
+            reads_and_writes(block.statement, reads, writes)
+            self.blocks[len(self.assigns)] = key
+            self.assigns.append(block)
+            self.reads.append(sorted(reads - writes))
+            self.writes.append(sorted(writes))
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from(range(len(self.assigns)))
+        drivers = {}
+        for i, written in enumerate(self.writes):
+            for signal in written:
+                drivers.setdefault(signal, []).append(i)
+        for j, read in enumerate(self.reads):
+            for signal in read:
+                for i in drivers.get(signal, ()):
+                    graph.add_edge(i, j)
+
+        # each loop collapses into one node of the condensation, which is acyclic
+        condensed = nx.condensation(graph)
+        self.loops = []
+        for node in condensed.nodes:
+            members = sorted(condensed.nodes[node]["members"])
+            if len(members) > 1 or graph.has_edge(members[0], members[0]):
+                self.loops.append(sorted({signal for i in members for signal in self.writes[i]}))
+        self.levels = []
+        for generation in nx.topological_generations(condensed):
+            self.levels.append(sorted(i for node in generation for i in condensed.nodes[node]["members"]))
+        self.order = [i for level in self.levels for i in level]
+        # assign index -> (inputs, outputs) after its last visit on the current path
+        self.memo = {}
+        self.visits = 0
+        self.skips = 0
+        for loop in self.loops:
+            print(f"Combinational loop through {', '.join(loop)}")
+
+    def reset(self) -> None:
+        """Forget the memoized inputs; called at the start of every path."""
+        self.memo = {}
+
+    def values(self, store, signals) -> tuple:
+        return tuple(frozen(store.get(signal)) for signal in signals)
+
+    def evaluate(self, m: ExecutionManager, s: SymbolicState, visit, run_block=None, tags=None) -> None:
+        """Visit the assigns in level order, skipping those whose inputs didn't change. Blocks are
+        run through run_block(cfg index) only when it is given; tags (cfg index -> the path taken
+        this cycle) are part of a block's inputs."""
+        store = s.store[m.curr_module]
+        for i in self.order:
+            key = self.blocks.get(i)
+            if key is not None and run_block is None:
+                continue
+            inputs = self.values(store, self.reads[i])
+            if key is not None and tags is not None:
+                inputs = (tags.get(key),) + inputs
+            last = self.memo.get(i)
+            if last is not None and last[0] == inputs and last[1] == self.values(store, self.writes[i]):
+                self.skips += 1
+                continue
+            if key is not None:
+                run_block(key)
+            else:
+                visit(self.assigns[i])
+            self.visits += 1
+            self.memo[i] = (inputs, self.values(store, self.writes[i]))
+
+    def summary(self) -> str:
+        return f"Comb network: {len(self.assigns) - len(self.blocks)} assigns, {len(self.blocks)} blocks, {len(self.levels)} levels, {len(self.loops)} loops, {self.visits} visits, {self.skips} skipped"
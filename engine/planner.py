@@ -0,0 +1,128 @@
+"""Dry-run planning. Sizes the path space the exploration loop would enumerate from the CFGs alone:
+nothing is executed and no path product is built, so a plan takes seconds. Counts are exact Python
+ints, products of per-CFG path counts raised to the number of cycles, and every branch decision a
+path takes is counted as one solver query, the cost before any caching."""
+
+from .branch_correlation import consistent_paths
+
+# largest single cycle product of a module that --correlate_branches is evaluated on
+CORRELATION_LIMIT = 100000
+
+
+def product(counts) -> int:
+    total = 1
+    for count in counts:
+        total *= count
+    return total
+
+
+def magnitude(count: int) -> str:
+    """An exact count, with its order of magnitude when it is long."""
+    digits = str(count)
+    if len(digits) <= 9:
+        return digits
+    return f"{digits} (~{digits[0]}.{digits[1:3]}e{len(digits) - 1})"
+
+
+class CFGPlan:
+    """Size of one always block's CFG."""
+    def __init__(self, cfg):
+        successors = {}
+        for start, end in cfg.cfg_edges:
+            successors.setdefault(start, set()).add(end)
+        branching = {block for block, ends in successors.items() if len(ends) > 1}
+        self.blocks = len(cfg.basic_block_list)
+        self.branches = len(branching)
+        self.arms = len(cfg.arms)
+        # branch decisions, each a feasibility query, along every path
+        self.decisions = [sum(1 for block in path if block in branching) for path in cfg.paths]
+        self.paths = len(cfg.paths)
+
+    def summary(self) -> str:
+        low, high = (min(self.decisions), max(self.decisions)) if self.decisions else (0, 0)
+        return f"{self.blocks} blocks, {self.branches} branches, {self.arms} case arms, {self.paths} paths, {low}..{high} decisions per path"
+
+
+class ModulePlan:
+    """Single cycle path space of one module instance: one path per CFG, every combination."""
+    def __init__(self, cfgs, never=()):
+        self.cfgs = [CFGPlan(cfg) for cfg in cfgs]
+        self.never = [k for k in never if k < len(cfgs)]
+        self.single = product(plan.paths for plan in self.cfgs)
+        self.single_decisions = self.decision_total(range(len(self.cfgs)))
+        # a block --schedule finds can't be triggered contributes one empty path
+        live = [k for k in range(len(self.cfgs)) if k not in self.never]
+        self.scheduled = product(self.cfgs[k].paths for k in live)
+        self.scheduled_decisions = self.decision_total(live)
+        self.correlated = None
+        if self.single <= CORRELATION_LIMIT:
+            self.correlated = len(consistent_paths(cfgs)[0])
+
+    def decision_total(self, live) -> int:
+        """Sum of the decisions of every combination of paths through the live CFGs."""
+        counts = [self.cfgs[k].paths for k in live]
+        total = 0
+        for i, k in enumerate(live):
+            total += sum(self.cfgs[k].decisions) * product(counts[:i] + counts[i + 1:])
+        return total
+
+
+class PathPlan:
+    """Path counts and query estimates of a design over num_cycles, per module, CFG and cycle.
+    Like the exploration loop, a multi cycle path is one single cycle path per module per cycle."""
+    def __init__(self, cfgs_by_module: dict, num_cycles: int, schedules=None):
+        self.num_cycles = num_cycles
+        self.modules = {}
+        self.shared = {}
+        first = {}
+        for name, cfgs in cfgs_by_module.items():
+            schedule = schedules.get(name) if schedules else None
+            self.modules[name] = ModulePlan(cfgs, schedule.never if schedule is not None else ())
+            # instances of one definition share a cfg list, see engine/cfg_pool.py
+            self.shared[name] = first.setdefault(id(cfgs), name)
+
+    def paths(self, counts: dict, cycles: int) -> int:
+        return product(count ** cycles for count in counts.values())
+
+    def queries(self, counts: dict, decisions: dict) -> int:
+        """Decisions summed over every multi cycle path. A module with s single cycle paths that
+        take d decisions between them takes n * s^(n-1) * d over n cycles, once per path of the
+        other modules."""
+        n = self.num_cycles
+        total = 0
+        for name in counts:
+            others = product(count ** n for other, count in counts.items() if other != name)
+            total += n * counts[name] ** (n - 1) * decisions[name] * others
+        return total
+
+    def report(self) -> None:
+        n = self.num_cycles
+        single = {name: plan.single for name, plan in self.modules.items()}
+        decisions = {name: plan.single_decisions for name, plan in self.modules.items()}
+        print(f"Plan for {n} cycles, {len(self.modules)} modules:")
+        for name, plan in self.modules.items():
+            shared = f" (shares its CFGs with {self.shared[name]})" if self.shared[name] != name else ""
+            print(f"  {name}{shared}:")
+            for k, cfg in enumerate(plan.cfgs):
+                never = ", never triggered" if k in plan.never else ""
+                print(f"    cfg {k}: {cfg.summary()}{never}")
+            print(f"    single cycle: {magnitude(plan.single)} paths, {magnitude(plan.single_decisions)} decisions")
+            if plan.never:
+                print(f"      with --schedule: {magnitude(plan.scheduled)} paths")
+            if plan.correlated is not None:
+                print(f"      with --correlate_branches: {magnitude(plan.correlated)} paths")
+            else:
+                print(f"      with --correlate_branches: not evaluated above {CORRELATION_LIMIT} paths")
+            print(f"    over {n} cycles: {magnitude(plan.single ** n)} paths")
+        for cycle in range(1, n + 1):
+            print(f"  cycle {cycle}: {magnitude(self.paths(single, cycle))} paths")
+        print(f"Total: {magnitude(self.paths(single, n))} paths, {magnitude(self.queries(single, decisions))} solver queries")
+        depth = n * sum(max(cfg.decisions, default=0) for plan in self.modules.values() for cfg in plan.cfgs)
+        print(f"  up to {depth} branch constraints per query; --slice_constraints solves only the part connected to the new branch")
+        if any(plan.never for plan in self.modules.values()):
+            scheduled = {name: plan.scheduled for name, plan in self.modules.items()}
+            scheduled_decisions = {name: plan.scheduled_decisions for name, plan in self.modules.items()}
+            print(f"  with --schedule: {magnitude(self.paths(scheduled, n))} paths, {magnitude(self.queries(scheduled, scheduled_decisions))} solver queries")
+        if all(plan.correlated is not None for plan in self.modules.values()):
+            correlated = {name: plan.correlated for name, plan in self.modules.items()}
+            print(f"  with --correlate_branches: {magnitude(self.paths(correlated, n))} paths")
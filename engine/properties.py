@@ -0,0 +1,165 @@
+"""Property monitors for checking many assertions in one exploration pass. Each assertion
+keeps its own status and counterexample, so a violation of one property no longer ends the run."""
+
+from pyverilog.vparser.ast import SystemCall, SingleStatement, Block
+from .execution_manager import ExecutionManager
+from .symbolic_state import SymbolicState
+import time
+from helpers.query_log import timed_check
+
+UNKNOWN = "unknown"
+VIOLATED = "violated"
+HOLDS = "unviolated"
+# holds at every depth, e.g. by k-induction
+PROVED = "proved"
+
+
+def property_key(module_name: str, stmt) -> str:
+    """Stable name for the assertion a system call belongs to."""
+    return f"{module_name}:{stmt.lineno}"
+
+
+def system_calls(stmt):
+    """All system calls reachable inside a statement of a basic block."""
+    if isinstance(stmt, SystemCall):
+        return [stmt]
+    if isinstance(stmt, SingleStatement):
+        return system_calls(stmt.statement)
+    if isinstance(stmt, Block):
+        return [call for item in stmt.statements for call in system_calls(item)]
+    return []
+
+
+def get_counterexample(s: SymbolicState) -> dict:
+    """Map each signal in the store to its value in the current model of the path condition."""
+    counterexample = {}
+    symbols_to_values = {}
+    solved_model = s.pc.model()
+    for item in solved_model.decls():
+        symbols_to_values[item.name()] = solved_model[item]
+    for module in s.store:
+        for signal in s.store[module]:
+            symbol = s.store[module][signal]
+            if isinstance(symbol, str) and symbol in symbols_to_values:
+                counterexample[f"{module}.{signal}"] = symbols_to_values[symbol]
+    return counterexample
+
+
+class PropertyMonitor:
+    """Status of a single assertion."""
+    def __init__(self, name: str, label: str):
+        self.name = name
+        self.label = label
+        self.status = UNKNOWN
+        self.counterexample = None
+        self.cycle = None
+        self.path = None
+        # decided by an earlier run on the same definition, see engine/incremental.py
+        self.reused = False
+
+
+class PropertySet:
+    """The monitors carried through one exploration, indexed by the basic blocks that can fire them."""
+    def __init__(self):
+        self.monitors = {}
+        # (module name, cfg index, basic block index) -> names of the monitors in that block
+        self.blocks = {}
+        self.path_index = 0
+
+    def collect(self, cfgs_by_module) -> None:
+        """Find the assertion system calls in every CFG."""
+        for module_name in cfgs_by_module:
+            for cfg_idx, cfg in enumerate(cfgs_by_module[module_name]):
+                for block_idx, block in enumerate(cfg.basic_block_list):
+                    for stmt in block:
+                        for call in system_calls(stmt):
+                            name = property_key(module_name, call)
+                            label = str(call.args[0].value) if len(call.args) > 0 and hasattr(call.args[0], "value") else call.syscall
+                            self.monitors[name] = PropertyMonitor(name, label)
+                            self.blocks.setdefault((module_name, cfg_idx, block_idx), set()).add(name)
+
+    def reachable(self, curr_path, cfgs_by_module) -> set:
+        """Monitors whose firing block lies on some cycle of this multi-module path."""
+        names = set()
+        for module_name in curr_path:
+            for single_cycle_path in curr_path[module_name]:
+                for cfg_idx, cfg_path in enumerate(single_cycle_path):
+                    for block_idx in cfg_path:
+                        names |= self.blocks.get((module_name, cfg_idx, block_idx), set())
+        return names
+
+    def undecided(self, names=None) -> set:
+        """Names of the monitors (optionally among names) that have not been violated yet."""
+        names = self.monitors.keys() if names is None else names
+        return set(name for name in names if self.monitors[name].status == UNKNOWN)
+
+    def all_decided(self) -> bool:
+        return len(self.monitors) > 0 and len(self.undecided()) == 0
+
+    def add(self, name: str, label: str) -> None:
+        """Register a monitor that is not tied to a system call, e.g. a compiled SVA property."""
+        if not name in self.monitors:
+            self.monitors[name] = PropertyMonitor(name, label)
+
+    def prove(self, name: str, label: str, k: int) -> None:
+        """name was proved by k-induction; exploration no longer needs to look for its violation."""
+        self.add(name, label)
+        self.monitors[name].status = PROVED
+        self.monitors[name].cycle = k
+
+    def reuse(self, name: str, label: str, status: str, cycle, counterexample) -> None:
+        """name was decided by an earlier run and nothing it depends on changed since."""
+        self.add(name, label)
+        monitor = self.monitors[name]
+        monitor.status = status
+        monitor.cycle = cycle
+        monitor.counterexample = counterexample
+        monitor.reused = True
+
+    def record(self, m: ExecutionManager, s: SymbolicState, name: str, label: str) -> None:
+        """The violation of name is reachable if the path condition is sat; keep its first counterexample."""
+        self.add(name, label)
+        monitor = self.monitors[name]
+        if monitor.status != UNKNOWN:
+            return
+        solver_start = time.process_time()
+        result = timed_check(s.pc, "property", model=True)
+        m.solver_time += time.process_time() - solver_start
+        if str(result) == "sat":
+            monitor.status = VIOLATED
+            monitor.counterexample = get_counterexample(s)
+            monitor.cycle = m.cycle
+            monitor.path = self.path_index
+
+    def witness(self, name: str, label: str, cycle: int, counterexample: dict) -> None:
+        """A violation already demonstrated concretely, e.g. by the simulation pre-pass."""
+        self.add(name, label)
+        monitor = self.monitors[name]
+        if monitor.status == UNKNOWN:
+            monitor.status = VIOLATED
+            monitor.counterexample = counterexample
+            monitor.cycle = cycle
+
+    def fire(self, m: ExecutionManager, s: SymbolicState, stmt) -> None:
+        """An assertion system call was reached on a feasible path; record its first counterexample."""
+        self.record(m, s, property_key(m.curr_module, stmt), str(stmt.syscall))
+
+    def finish(self) -> None:
+        """Everything not violated by the end of exploration holds within the explored bound."""
+        for monitor in self.monitors.values():
+            if monitor.status == UNKNOWN:
+                monitor.status = HOLDS
+
+    def report(self, num_cycles) -> None:
+        """Print the per-property results."""
+        print(f"Property results ({len(self.monitors)} properties, bound {num_cycles} cycles):")
+        for monitor in self.monitors.values():
+            if monitor.status == VIOLATED:
+                found = "in an earlier run" if monitor.reused else f"on path {monitor.path}" if monitor.path is not None else "by simulation"
+                print(f"  {monitor.name} {monitor.label}: violated at cycle {monitor.cycle} {found}")
+                print(f"    counterexample: {monitor.counterexample}")
+            elif monitor.status == PROVED:
+                print(f"  {monitor.name} {monitor.label}: proved at k={monitor.cycle}")
+            else:
+                earlier = " (earlier run)" if monitor.reused else ""
+                print(f"  {monitor.name} {monitor.label}: {monitor.status} within {num_cycles} cycles{earlier}")
@@ -0,0 +1,490 @@
+"""Bit-parallel random simulation run before symbolic execution. Every signal holds one NumPy
+uint64 lane per random stimulus, and statements execute under a lane mask, so both sides of every
+branch are simulated for thousands of input vectors at once. Assertions reached this way come with
+a concrete witness and need no solver time.
+
+Submodule instances are simulated inside their parent, with their ports bound to the parent's
+expressions, so only modules no other module instantiates are simulated on their own. Values wider
+than a lane and signed declarations are not modelled; such modules are left to symbolic execution
+rather than reported with a witness that doesn't hold."""
+
+import numpy as np
+from pyverilog.vparser.ast import ModuleDef, IfStatement, SingleStatement, Block, SystemCall, Always, Assign, Decl, InstanceList
+from pyverilog.vparser.ast import CaseStatement, CasexStatement, CasezStatement, BlockingSubstitution, NonblockingSubstitution
+from pyverilog.vparser.ast import Identifier, IntConst, Pointer, Partselect, Concat, LConcat, Repeat, Cond, Lvalue, Rvalue
+from pyverilog.vparser.ast import UnaryOperator, Operator, Input, Inout, Parameter, Localparam
+from helpers.bv_encoding import infer_widths, parse_int_literal, eval_width_bound, literal_width, DEFAULT_WIDTH
+from .execution_manager import ExecutionManager
+from .properties import property_key
+import time
+
+LANES = 4096
+# share of lanes whose inputs are drawn from the constants appearing in the module
+CONST_BIAS = 0.25
+
+BINARY_OPS = {
+    "Plus": lambda a, b: a + b,
+    "Minus": lambda a, b: a - b,
+    "Times": lambda a, b: a * b,
+    "And": lambda a, b: a & b,
+    "Or": lambda a, b: a | b,
+    "Xor": lambda a, b: a ^ b,
+    "Xnor": lambda a, b: ~(a ^ b),
+}
+
+# evaluated at least at integer width, as align_arith does for the symbolic encodings
+ARITH_OPS = ("Plus", "Minus", "Times")
+
+COMPARE_OPS = {
+    "LessThan": lambda a, b: a < b,
+    "GreaterThan": lambda a, b: a > b,
+    "LessEq": lambda a, b: a <= b,
+    "GreaterEq": lambda a, b: a >= b,
+    "Eq": lambda a, b: a == b,
+    "NotEq": lambda a, b: a != b,
+    "Eql": lambda a, b: a == b,
+    "NotEql": lambda a, b: a != b,
+}
+
+
+# bits a lane holds; wider values are left to symbolic execution
+LANE_WIDTH = 64
+
+
+def mask_of(width: int) -> np.uint64:
+    """All-ones value of a width, capped at the 64 bits a lane holds."""
+    return np.uint64((1 << min(width, LANE_WIDTH)) - 1)
+
+
+def lane_width(width: int, what) -> int:
+    """width, when a lane can hold it."""
+    if width > LANE_WIDTH:
+        raise Unsupported(f"{width}-bit {what}")
+    return width
+
+
+def as_lanes(value: bool, lanes: int) -> np.ndarray:
+    return np.full(lanes, value, dtype=bool)
+
+
+class Unsupported(Exception):
+    """A construct the simulator does not model; the module is left to symbolic execution."""
+
+
+def port_names(module: ModuleDef) -> list:
+    """Port names of a module in declaration order, for positional port connections."""
+    return [port.first.name if hasattr(port, "first") else port.name for port in module.portlist.ports]
+
+
+class ModuleSimulator:
+    """Lane-parallel simulation of one pyverilog module with random inputs and initial state.
+    definitions are the modules its instances may refer to; parent is set for an instance."""
+    def __init__(self, m: ExecutionManager, module: ModuleDef, lanes: int = LANES, seed: int = 0,
+                 definitions: dict = None, parent=None, name: str = None):
+        self.m = m
+        self.module = module
+        self.name = module.name if name is None else name
+        self.lanes = lanes
+        self.rng = np.random.default_rng(seed) if parent is None else parent.rng
+        self.definitions = {} if definitions is None else definitions
+        # instances seen so far per definition, numbered as the engine numbers them
+        self.counts = {} if parent is None else parent.counts
+        infer_widths(m, module, module.name)
+        self.widths = dict(m.sig_widths[module.name])
+        self.params = m.param_values.setdefault(module.name, {})
+        self.inputs = []
+        self.assigns = []
+        self.always = []
+        # (simulator, [(input port, parent expression)], [(output port, parent lvalue)]) per instance
+        self.children = []
+        self.constants = set()
+        self.collect(module.items)
+        self.env = {}
+        self.pending = []
+        self.covered = set()
+        self.violations = {}
+        self.stimulus = []
+        # random initial values of registers and undriven nets, fixed when first read or written
+        self.initial = {}
+
+    def collect(self, items) -> None:
+        """Split module items into inputs, continuous assignments and clocked always blocks."""
+        for item in items:
+            if isinstance(item, Decl):
+                for decl in item.list:
+                    if getattr(decl, "signed", False):
+                        # lanes are unsigned; comparisons and >>> would be wrong
+                        raise Unsupported(f"signed {decl.name}")
+                    if isinstance(decl, (Input, Inout)):
+                        self.inputs.append(decl.name)
+                    elif isinstance(decl, Assign):
+                        # wire x = expr;
+                        self.assigns.append(decl)
+                    elif isinstance(decl, (Parameter, Localparam)) and not decl.name in self.params:
+                        value = eval_width_bound(decl.value.var, self.m, self.module.name)
+                        if value is not None:
+                            self.params[decl.name] = value
+            elif isinstance(item, Assign):
+                self.assigns.append(item)
+            elif isinstance(item, Always):
+                self.always.append(item)
+            elif isinstance(item, InstanceList):
+                for instance in item.instances:
+                    self.instantiate(instance)
+        for port in self.module.portlist.ports:
+            if hasattr(port, "first") and getattr(port.first, "signed", False):
+                raise Unsupported(f"signed {port.first.name}")
+            if hasattr(port, "first") and isinstance(port.first, (Input, Inout)) and not port.first.name in self.inputs:
+                self.inputs.append(port.first.name)
+        self.find_constants(self.module)
+
+    def instantiate(self, instance) -> None:
+        """Simulator of a submodule instance and the bindings of its ports."""
+        definition = self.definitions.get(instance.module)
+        if definition is None:
+            raise Unsupported(f"instance of {instance.module}")
+        if len(instance.parameterlist) > 0:
+            raise Unsupported(f"parameter overrides of {instance.module}")
+        index = self.counts.get(instance.module, 0)
+        self.counts[instance.module] = index + 1
+        child = ModuleSimulator(self.m, definition, self.lanes, definitions=self.definitions, parent=self,
+                                name=f"{instance.module}_{index}")
+        positions = port_names(definition)
+        inputs, outputs = [], []
+        for position, arg in enumerate(instance.portlist):
+            name = arg.portname if arg.portname is not None else positions[position]
+            if arg.argname is None:
+                continue
+            if name in child.inputs:
+                inputs.append((name, arg.argname))
+            else:
+                outputs.append((name, arg.argname))
+        self.children.append((child, inputs, outputs))
+
+    def simulators(self):
+        """This simulator and those of every instance below it."""
+        yield self
+        for child, _, _ in self.children:
+            yield from child.simulators()
+
+    def find_constants(self, node) -> None:
+        if isinstance(node, IntConst):
+            value, _ = parse_int_literal(node.value)
+            if value is not None:
+                self.constants.add(value)
+        for child in node.children():
+            self.find_constants(child)
+
+    def width(self, name: str) -> int:
+        return lane_width(self.widths.get(name, DEFAULT_WIDTH), name)
+
+    def fresh(self, name: str) -> np.ndarray:
+        """A signal with no value yet starts out random."""
+        self.initial[name] = self.random_values(name)
+        return self.initial[name]
+
+    def random_values(self, name: str) -> np.ndarray:
+        """Uniform random lanes, with a share of lanes set to constants of the design to hit equality checks."""
+        mask = mask_of(self.width(name))
+        values = self.rng.integers(0, np.iinfo(np.uint64).max, size=self.lanes, dtype=np.uint64, endpoint=True) & mask
+        if len(self.constants) > 0:
+            biased = self.rng.random(self.lanes) < CONST_BIAS
+            pool = np.array(sorted(self.constants), dtype=object)
+            picks = np.array([int(v) & int(mask) for v in self.rng.choice(pool, size=int(biased.sum()))], dtype=np.uint64)
+            values[biased] = picks
+        return values
+
+    def eval(self, node):
+        """Value of an rvalue as (lanes, width)."""
+        if isinstance(node, Rvalue):
+            return self.eval(node.var)
+        if isinstance(node, IntConst):
+            value, width = parse_int_literal(node.value)
+            if value is None or "'s" in node.value.lower():
+                raise Unsupported(node.value)
+            width = lane_width(width if width is not None else max(literal_width(value), DEFAULT_WIDTH), node.value)
+            return np.full(self.lanes, value & int(mask_of(width)), dtype=np.uint64), width
+        if isinstance(node, Identifier):
+            if node.name in self.params:
+                value = self.params[node.name]
+                if value < 0:
+                    raise Unsupported(f"negative {node.name}")
+                width = lane_width(max(literal_width(value), DEFAULT_WIDTH), node.name)
+                return np.full(self.lanes, value, dtype=np.uint64), width
+            if not node.name in self.env:
+                self.env[node.name] = self.fresh(node.name)
+            return self.env[node.name], self.width(node.name)
+        if isinstance(node, Pointer):
+            value, _ = self.eval(node.var)
+            index, _ = self.eval(node.ptr)
+            index = np.minimum(index, np.uint64(63))
+            return (value >> index) & np.uint64(1), 1
+        if isinstance(node, Partselect):
+            value, _ = self.eval(node.var)
+            msb, lsb = self.const(node.msb), self.const(node.lsb)
+            width = msb - lsb + 1
+            return (value >> np.uint64(lsb)) & mask_of(width), width
+        if isinstance(node, (Concat, LConcat)):
+            result = np.zeros(self.lanes, dtype=np.uint64)
+            total = 0
+            for part in node.list:
+                value, width = self.eval(part)
+                result = (result << np.uint64(min(width, 63))) | (value & mask_of(width))
+                total += width
+            return result, lane_width(total, "concatenation")
+        if isinstance(node, Repeat):
+            value, width = self.eval(node.value)
+            times = self.const(node.times)
+            total = lane_width(width * times, "replication")
+            result = np.zeros(self.lanes, dtype=np.uint64)
+            for _ in range(times):
+                result = (result << np.uint64(min(width, 63))) | value
+            return result, total
+        if isinstance(node, Cond):
+            cond = self.truth(node.cond)
+            true_value, true_width = self.eval(node.true_value)
+            false_value, false_width = self.eval(node.false_value)
+            return np.where(cond, true_value, false_value), max(true_width, false_width)
+        if isinstance(node, UnaryOperator):
+            return self.eval_unary(node)
+        if isinstance(node, Operator):
+            return self.eval_binary(node)
+        raise Unsupported(type(node).__name__)
+
+    def eval_unary(self, node):
+        value, width = self.eval(node.right)
+        op = type(node).__name__
+        mask = mask_of(width)
+        if op == "Ulnot":
+            return (value == 0).astype(np.uint64), 1
+        if op == "Unot":
+            return ~value & mask, width
+        if op == "Uminus":
+            return (~value + np.uint64(1)) & mask, width
+        if op == "Uplus":
+            return value, width
+        if op in ("Uand", "Unand"):
+            result = value == mask
+        elif op in ("Uor", "Unor"):
+            result = value != 0
+        elif op in ("Uxor", "Uxnor"):
+            result = np.array([bin(int(v)).count("1") & 1 for v in value], dtype=bool)
+        else:
+            raise Unsupported(op)
+        if op in ("Unand", "Unor", "Uxnor"):
+            result = ~result
+        return result.astype(np.uint64), 1
+
+    def eval_binary(self, node):
+        op = type(node).__name__
+        if op == "Land":
+            return (self.truth(node.left) & self.truth(node.right)).astype(np.uint64), 1
+        if op == "Lor":
+            return (self.truth(node.left) | self.truth(node.right)).astype(np.uint64), 1
+        left, left_width = self.eval(node.left)
+        right, right_width = self.eval(node.right)
+        width = max(left_width, right_width)
+        if op in COMPARE_OPS:
+            return COMPARE_OPS[op](left, right).astype(np.uint64), 1
+        if op in ARITH_OPS:
+            width = max(width, DEFAULT_WIDTH)
+        if op in BINARY_OPS:
+            return BINARY_OPS[op](left, right) & mask_of(width), width
+        if op in ("Sll", "Sla"):
+            width = max(width, DEFAULT_WIDTH) if op == "Sll" else left_width
+            return np.where(right > 63, np.uint64(0), left << np.minimum(right, np.uint64(63))) & mask_of(width), width
+        if op in ("Srl", "Sra"):
+            return np.where(right > 63, np.uint64(0), left >> np.minimum(right, np.uint64(63))), left_width
+        if op in ("Divide", "Mod"):
+            # division by zero gives x in Verilog; simulate it as 0
+            safe = np.where(right == 0, np.uint64(1), right)
+            result = left // safe if op == "Divide" else left % safe
+            return np.where(right == 0, np.uint64(0), result), width
+        raise Unsupported(op)
+
+    def const(self, node) -> int:
+        value = eval_width_bound(node, self.m, self.module.name)
+        if value is None:
+            raise Unsupported(str(node))
+        return value
+
+    def truth(self, node) -> np.ndarray:
+        value, _ = self.eval(node)
+        return value != 0
+
+    def write(self, lvalue, value, width, mask) -> None:
+        """Store value into the lanes of mask, handling bit and part selects and concatenations."""
+        target = lvalue.var if isinstance(lvalue, Lvalue) else lvalue
+        if isinstance(target, LConcat):
+            offset = 0
+            for part in reversed(target.list):
+                part_width = self.lvalue_width(part)
+                self.write(part, (value >> np.uint64(min(offset, 63))) & mask_of(part_width), part_width, mask)
+                offset += part_width
+            return
+        if isinstance(target, Identifier):
+            name = target.name
+            if name in self.env:
+                old = self.env[name]
+            else:
+                old = np.zeros(self.lanes, dtype=np.uint64) if mask.all() else self.fresh(name)
+            self.env[name] = np.where(mask, value & mask_of(self.width(name)), old)
+            return
+        if isinstance(target, (Pointer, Partselect)) and isinstance(target.var, Identifier):
+            name = target.var.name
+            old = self.env[name] if name in self.env else self.fresh(name)
+            if isinstance(target, Pointer):
+                lsb, _ = self.eval(target.ptr)
+                lsb = np.minimum(lsb, np.uint64(63))
+                field = np.uint64(1)
+            else:
+                lsb = np.full(self.lanes, self.const(target.lsb), dtype=np.uint64)
+                field = mask_of(self.const(target.msb) - self.const(target.lsb) + 1)
+            updated = (old & ~(field << lsb)) | ((value & field) << lsb)
+            self.env[name] = np.where(mask, updated & mask_of(self.width(name)), old)
+            return
+        raise Unsupported(type(target).__name__)
+
+    def lvalue_width(self, node) -> int:
+        if isinstance(node, Identifier):
+            return self.width(node.name)
+        if isinstance(node, Pointer):
+            return 1
+        if isinstance(node, Partselect):
+            return self.const(node.msb) - self.const(node.lsb) + 1
+        raise Unsupported(type(node).__name__)
+
+    def run_stmt(self, stmt, mask: np.ndarray, cycle: int) -> None:
+        """Execute a statement for the lanes in mask."""
+        if stmt is None or not mask.any():
+            return
+        if isinstance(stmt, Block):
+            for item in stmt.statements:
+                self.run_stmt(item, mask, cycle)
+        elif isinstance(stmt, SingleStatement):
+            self.run_stmt(stmt.statement, mask, cycle)
+        elif isinstance(stmt, IfStatement):
+            cond = self.truth(stmt.cond)
+            taken, not_taken = mask & cond, mask & ~cond
+            if taken.any():
+                self.covered.add((stmt.lineno, 1, cycle))
+            if not_taken.any():
+                self.covered.add((stmt.lineno, 0, cycle))
+            self.run_stmt(stmt.true_statement, taken, cycle)
+            self.run_stmt(stmt.false_statement, not_taken, cycle)
+        elif isinstance(stmt, CaseStatement):
+            if isinstance(stmt, (CasexStatement, CasezStatement)):
+                raise Unsupported("casex/casez")
+            comp, _ = self.eval(stmt.comp)
+            remaining = mask.copy()
+            for case in stmt.caselist:
+                if case.cond is None:
+                    hit = remaining
+                else:
+                    hit = as_lanes(False, self.lanes)
+                    for cond in case.cond:
+                        value, _ = self.eval(cond)
+                        hit = hit | (comp == value)
+                    hit = hit & remaining
+                if hit.any():
+                    self.covered.add((case.lineno, 1, cycle))
+                self.run_stmt(case.statement, hit, cycle)
+                remaining = remaining & ~hit
+        elif isinstance(stmt, BlockingSubstitution):
+            value, width = self.eval(stmt.right)
+            self.write(stmt.left, value, width, mask)
+        elif isinstance(stmt, NonblockingSubstitution):
+            value, width = self.eval(stmt.right)
+            self.pending.append((stmt.left, value, width, mask))
+        elif isinstance(stmt, SystemCall):
+            # reaching a system call is an assertion violation, as in DepthFirst
+            if not stmt.lineno in self.violations:
+                self.violations[stmt.lineno] = (stmt, int(np.argmax(mask)), cycle)
+        else:
+            raise Unsupported(type(stmt).__name__)
+
+    def update(self, lvalue, value, width) -> bool:
+        """Write value into every lane, returning whether any signal changed."""
+        before = dict(self.env)
+        self.write(lvalue, value, width, as_lanes(True, self.lanes))
+        return any(not name in before or not np.array_equal(before[name], self.env[name]) for name in self.env)
+
+    def settle(self) -> None:
+        """Evaluate continuous assignments and instance ports until the values stop changing."""
+        for _ in range(len(self.assigns) + len(self.children) + 1):
+            changed = False
+            for assign in self.assigns:
+                value, width = self.eval(assign.right)
+                changed |= self.update(assign.left, value, width)
+            for child, inputs, outputs in self.children:
+                for name, expr in inputs:
+                    value, _ = self.eval(expr)
+                    child.env[name] = value & mask_of(child.width(name))
+                child.settle()
+                for name, lvalue in outputs:
+                    value, width = child.eval(Identifier(name))
+                    changed |= self.update(lvalue, value, width)
+            if not changed:
+                return
+
+    def clock(self, cycle: int) -> None:
+        """Run the always blocks of this module and its instances, deferring nonblocking writes."""
+        self.pending = []
+        for block in self.always:
+            self.run_stmt(block.statement, as_lanes(True, self.lanes), cycle)
+        for child, _, _ in self.children:
+            child.clock(cycle)
+
+    def commit(self) -> None:
+        for lvalue, value, width, mask in self.pending:
+            self.write(lvalue, value, width, mask)
+        for child, _, _ in self.children:
+            child.commit()
+
+    def run(self, num_cycles: int) -> None:
+        """Simulate num_cycles clock cycles from a random initial state."""
+        for cycle in range(num_cycles):
+            stimulus = {}
+            for name in self.inputs:
+                self.env[name] = stimulus[name] = self.random_values(name)
+            self.stimulus.append(stimulus)
+            self.settle()
+            self.clock(cycle)
+            self.commit()
+            self.settle()
+
+    def witness(self, lane: int, cycle: int) -> dict:
+        """Initial state of this module and its instances, and inputs of one lane for every cycle up
+        to the violation."""
+        witness = {f"{sim.name}.{name}@init": int(sim.initial[name][lane]) for sim in self.simulators() for name in sim.initial}
+        for c in range(cycle + 1):
+            for name in self.stimulus[c]:
+                witness[f"{self.name}.{name}@{c}"] = int(self.stimulus[c][name][lane])
+        return witness
+
+
+def simulate(m: ExecutionManager, modules, num_cycles: int, lanes: int = LANES, seed: int = 0) -> dict:
+    """Random simulation pre-pass over every module not instantiated by another one. Returns the
+    violations found, keyed by property name, and leaves the covered branch directions in m.sim_covered."""
+    start = time.process_time()
+    violations = {}
+    m.sim_covered = set()
+    definitions = {module.name: module for module in modules}
+    instantiated = {item.module for module in modules for item in module.items if isinstance(item, InstanceList)}
+    for module in modules:
+        if module.name in instantiated:
+            continue
+        try:
+            top = ModuleSimulator(m, module, lanes, seed, definitions)
+            top.run(int(num_cycles))
+        except Unsupported as e:
+            print(f"Simulation pre-pass skipped {module.name}: unsupported {e}")
+            continue
+        for sim in top.simulators():
+            for lineno, direction, cycle in sim.covered:
+                m.sim_covered.add((sim.name, lineno, direction, cycle))
+            for lineno, (stmt, lane, cycle) in sim.violations.items():
+                violations[property_key(sim.name, stmt)] = (stmt, cycle, top.witness(lane, cycle))
+    print(f"Simulation pre-pass: {lanes} vectors x {num_cycles} cycles, {len(m.sim_covered)} branch directions covered, "
+          f"{len(violations)} assertions violated in {time.process_time() - start:.3f}s")
+    return violations
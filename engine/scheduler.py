@@ -0,0 +1,139 @@
+"""Scheduling of procedural blocks by their timing control. Clocked blocks run once per cycle (one
+clock edge) with non-blocking semantics: each sees the store from before the edge and their writes
+land together afterwards. Combinational blocks and latches join the levelized assign network and
+only rerun when something they read changed. Blocks nothing can trigger are left out of the path
+product altogether."""
+
+import re
+import pyslang as ps
+from pyverilog.vparser.ast import Always, Assign, InstanceList, ModuleDef, Ioport, Port
+from .signal_index import identifiers, reads_and_writes
+
+CLOCKED = "clocked"
+COMB = "comb"
+LATCH = "latch"
+NEVER = "never"
+
+EDGE = re.compile(r"\b(posedge|negedge|edge)\s+\(?\s*([A-Za-z_][\w$]*)")
+
+
+def slang_event_signals(timing, edges: list, levels: list) -> bool:
+    """Collect the signals of a pyslang timing control; False when it isn't an event control."""
+    kind = timing.kind
+    if kind == ps.TimingControlKind.ImplicitEvent:
+        return True
+    if kind == ps.TimingControlKind.EventList:
+        return all(slang_event_signals(event, edges, levels) for event in timing.events)
+    if kind != ps.TimingControlKind.SignalEvent:
+        return False
+    expr = timing.expr
+    name = expr.symbol.name if expr.kind == ps.ExpressionKind.NamedValue else str(expr.syntax).strip()
+    if timing.edge == getattr(ps.EdgeKind, "None"):
+        levels.append(name)
+    else:
+        edges.append(name)
+    return True
+
+
+def timing_of(block):
+    """(kind, edge signals, level signals) of a pyverilog Always, pyslang ProceduralBlockSymbol or
+    ProceduralBlockSyntax."""
+    edges, levels = [], []
+    if isinstance(block, Always):
+        if block.sens_list is None or len(block.sens_list.list) == 0:
+            return NEVER, edges, levels
+        for sens in block.sens_list.list:
+            if sens.type in ("posedge", "negedge"):
+                edges.append(str(sens.sig))
+            elif sens.type == "all":
+                return COMB, [], []
+            else:
+                levels.append(str(sens.sig))
+        return (CLOCKED if edges else COMB), edges, levels
+    if getattr(block, "kind", None) == ps.SymbolKind.ProceduralBlock:
+        procedure = block.procedureKind
+        if procedure in (ps.ProceduralBlockKind.Initial, ps.ProceduralBlockKind.Final):
+            return NEVER, edges, levels
+        if procedure == ps.ProceduralBlockKind.AlwaysComb:
+            return COMB, edges, levels
+        if procedure == ps.ProceduralBlockKind.AlwaysLatch:
+            return LATCH, edges, levels
+        body = block.body
+        if body.kind != ps.StatementKind.Timed or not slang_event_signals(body.timing, edges, levels):
+            # no event control: it never waits for the clock, so a cycle can't trigger it
+            return (CLOCKED if procedure == ps.ProceduralBlockKind.AlwaysFF else NEVER), edges, levels
+        if edges:
+            return CLOCKED, edges, levels
+        return (LATCH if procedure == ps.ProceduralBlockKind.AlwaysLatch else COMB), edges, levels
+    if block.__class__.__name__ == "ProceduralBlockSyntax":
+        keyword = str(block.keyword).strip()
+        if keyword in ("initial", "final"):
+            return NEVER, edges, levels
+        if keyword == "always_comb":
+            return COMB, edges, levels
+        if keyword == "always_latch":
+            return LATCH, edges, levels
+        text = str(block.statement)
+        edges = [name for _, name in EDGE.findall(text)]
+        if edges or keyword == "always_ff":
+            return CLOCKED, edges, levels
+        return (COMB if text.lstrip().startswith("@") else NEVER), edges, levels
+    # anything else keeps running every cycle, as without a schedule
+    return COMB, edges, levels
+
+
+def changing_signals(module: ModuleDef) -> set:
+    """Signals of a pyverilog module that can change during a run: its ports, whatever its always
+    blocks and assigns write, and everything connected to a submodule instance."""
+    signals = set()
+    if module.portlist is not None:
+        for port in module.portlist.ports:
+            if isinstance(port, Ioport):
+                signals.add(port.first.name)
+            elif isinstance(port, Port):
+                signals.add(port.name)
+    for item in module.items:
+        if isinstance(item, (Always, Assign)):
+            reads_and_writes(item, set(), signals)
+        elif isinstance(item, InstanceList):
+            signals |= identifiers(item)
+    return signals
+
+
+class Schedule:
+    """How the CFGs (always blocks) of a module run within a cycle."""
+    def __init__(self, blocks, changing=None):
+        self.kinds = []
+        for block in blocks:
+            kind, edges, _ = timing_of(block)
+            if kind == CLOCKED and changing is not None and edges and not any(edge in changing for edge in edges):
+                # every edge it waits for is on a signal nothing drives
+                kind = NEVER
+            self.kinds.append(kind)
+        self.clocked = [k for k, kind in enumerate(self.kinds) if kind == CLOCKED]
+        self.comb = [k for k, kind in enumerate(self.kinds) if kind in (COMB, LATCH)]
+        self.never = [k for k, kind in enumerate(self.kinds) if kind == NEVER]
+        # pyverilog blocks, for folding the combinational ones into the assign network
+        self.comb_blocks = {k: blocks[k] for k in self.comb if isinstance(blocks[k], Always)}
+
+    def prune(self, cfgs) -> None:
+        """A block that can't be triggered contributes a single empty path to the product."""
+        for k in self.never:
+            if k < len(cfgs):
+                cfgs[k].paths = [()]
+
+    def summary(self) -> str:
+        return f"{len(self.clocked)} clocked, {len(self.comb)} combinational, {len(self.never)} never triggered"
+
+
+def written(before, after) -> list:
+    """(module, signal, value) for every entry of store snapshot after that differs from before."""
+    changes = []
+    for module, signals in after.items():
+        old = before.get(module)
+        if old is signals:
+            continue
+        for signal, value in signals.items():
+            if old is None or old.get(signal) is not value:
+                changes.append((module, signal, value))
+    return changes
@@ -0,0 +1,104 @@
+"""Event-driven propagation of signal updates. Writes mark signals dirty in the UpdateTable, and the
+dependency maps index their entries by source signal, so the propagation at the end of an always
+block only visits the followers of the signals written since the previous propagation instead of
+every dependency of every module. Also the reads and writes of AST nodes, used by the static
+analyses."""
+
+from pyverilog.vparser.ast import Node, Identifier, Assign, Substitution, Lvalue
+from .execution_manager import ExecutionManager
+
+
+def identifiers(node) -> set:
+    names = set()
+    if isinstance(node, Identifier):
+        names.add(node.name)
+    elif isinstance(node, Node):
+        for child in node.children():
+            names |= identifiers(child)
+    return names
+
+
+def reads_and_writes(node, reads: set, writes: set) -> None:
+    """Signals read and written anywhere under node; the targets of assignments are writes."""
+    if isinstance(node, (Assign, Substitution)):
+        writes |= identifiers(node.left)
+        reads |= identifiers(node.right)
+        return
+    if isinstance(node, Lvalue):
+        writes |= identifiers(node)
+        return
+    if isinstance(node, Identifier):
+        reads.add(node.name)
+        return
+    if isinstance(node, Node):
+        for child in node.children():
+            reads_and_writes(child, reads, writes)
+
+
+class UpdateTable(dict):
+    """m.updates that keeps the set of signals marked updated, i.e. set to (1, previous symbol)."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.dirty = {}
+        for signal, update in self.items():
+            self.track(signal, update)
+
+    def track(self, signal, update) -> None:
+        if isinstance(update, tuple) and update[0] == 1:
+            self.dirty[signal] = True
+        else:
+            self.dirty.pop(signal, None)
+
+    def __setitem__(self, signal, update) -> None:
+        super().__setitem__(signal, update)
+        self.track(signal, update)
+
+
+class DependencyMap(dict):
+    """m.dependencies[module] (signal -> the signal it follows) indexed by the followed signal."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        # source -> {signal: None}, in insertion order
+        self.by_source = {}
+        self.order = {}
+        for signal, source in self.items():
+            self.link(signal, source)
+
+    def link(self, signal, source) -> None:
+        self.order.setdefault(signal, len(self.order))
+        self.by_source.setdefault(source, {})[signal] = None
+
+    def __setitem__(self, signal, source) -> None:
+        if signal in self:
+            self.by_source.get(self[signal], {}).pop(signal, None)
+        super().__setitem__(signal, source)
+        self.link(signal, source)
+
+    def followers(self, sources) -> list:
+        """The signals following any of sources, in the order they were first recorded."""
+        found = set()
+        for source in sources:
+            found.update(self.by_source.get(source, ()))
+        return sorted(found, key=self.order.__getitem__)
+
+
+def dirty_dependencies(m: ExecutionManager, module: str) -> list:
+    """Entries of m.dependencies[module] whose source was updated."""
+    if not isinstance(m.updates, UpdateTable):
+        m.updates = UpdateTable(m.updates)
+    deps = m.dependencies[module]
+    if not isinstance(deps, DependencyMap):
+        deps = m.dependencies[module] = DependencyMap(deps)
+    return deps.followers(m.updates.dirty)
+
+
+def dirty_cond_assigns(m: ExecutionManager, module: str) -> list:
+    """Conditionally assigned signals of module that were updated."""
+    cond_assigns = m.cond_assigns[module]
+    return [lhs for lhs in list(m.updates.dirty) if lhs in cond_assigns]
+
+
+def mark_propagated(m: ExecutionManager) -> None:
+    """The updates so far were carried over; the next propagation only visits newer ones."""
+    if isinstance(m.updates, UpdateTable):
+        m.updates.dirty.clear()
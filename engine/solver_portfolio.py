@@ -0,0 +1,155 @@
+"""Portfolio solving for hard queries. Every query first runs on the incremental path condition
+solver under a timeout adapted from the latency of earlier queries. Queries that hit it are raced
+in fresh solvers with different configurations in worker processes, and the first definite answer
+wins. Queries no configuration can decide come back as unknown for the caller to handle."""
+
+import z3
+from z3 import Solver, Tactic
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from collections import deque
+import time
+from helpers.model_cache import constraint_body
+
+# z3's default, i.e. no timeout
+NO_TIMEOUT = 4294967295
+
+# name, tactic (None for the default solver), solver parameters
+PORTFOLIO = [
+    ("default", None, {}),
+    ("qfbv", "qfbv", {}),
+    ("reseeded", None, {"random_seed": 17}),
+]
+
+
+def make_solver(tactic, params) -> Solver:
+    solver = Tactic(tactic).solver() if tactic else Solver()
+    for key, value in params.items():
+        solver.set(key, value)
+    return solver
+
+
+def portfolio_worker(tactic, params, conn) -> None:
+    """Solves (query id, SMT-LIB2, timeout) tasks until it receives None."""
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        query, smt2, timeout = task
+        solver = make_solver(tactic, params)
+        solver.set("timeout", timeout)
+        solver.from_string(smt2)
+        start = time.perf_counter()
+        result = str(solver.check())
+        conn.send((query, result, time.perf_counter() - start))
+
+
+class SolverPortfolio:
+    """Adaptive per-query timeouts, with a race of solver configurations for the queries that time out."""
+    # the portfolio feasibility queries go through, set by main
+    active = None
+
+    def __init__(self, configs=PORTFOLIO, first_timeout: int = 2000, hard_timeout: int = 60000,
+                 min_timeout: int = 100, factor: float = 10.0, history: int = 256):
+        self.configs = configs
+        # timeouts in ms: the incremental attempt starts at first_timeout and adapts to factor times
+        # the 95th percentile latency, never above first_timeout; the race gets hard_timeout
+        self.first_timeout = first_timeout
+        self.hard_timeout = hard_timeout
+        self.min_timeout = min_timeout
+        self.factor = factor
+        self.latencies = deque(maxlen=history)
+        # config name -> (process, connection)
+        self.workers = {}
+        self.query = 0
+        self.stats = {"incremental": 0, "raced": 0, "unknown": 0}
+        self.wins = {}
+        # source -> number of queries left unknown
+        self.unknowns = {}
+
+    def timeout(self) -> int:
+        """Timeout in ms for the next incremental attempt."""
+        if len(self.latencies) < 16:
+            return self.first_timeout
+        ordered = sorted(self.latencies)
+        p95 = ordered[int(0.95 * (len(ordered) - 1))]
+        return int(min(self.first_timeout, max(self.min_timeout, p95 * 1000 * self.factor)))
+
+    def check(self, s: Solver, source: str, constraints=None) -> str:
+        """sat/unsat/unknown for the assertions of s, or for constraints when s only holds part of them."""
+        s.set("timeout", self.timeout())
+        start = time.perf_counter()
+        try:
+            result = str(s.check())
+        finally:
+            s.set("timeout", NO_TIMEOUT)
+        if result != "unknown":
+            self.latencies.append(time.perf_counter() - start)
+            self.stats["incremental"] += 1
+            return result
+        if constraints is None:
+            constraints = [constraint_body(c) for c in s.assertions()]
+        self.stats["raced"] += 1
+        result, winner = self.race(constraints)
+        if result == "unknown":
+            self.stats["unknown"] += 1
+            self.unknowns[source] = self.unknowns.get(source, 0) + 1
+        else:
+            self.wins[winner] = self.wins.get(winner, 0) + 1
+        return result
+
+    def start(self, name: str, tactic, params) -> None:
+        methods = mp.get_all_start_methods()
+        context = mp.get_context("fork" if "fork" in methods else "spawn")
+        parent, child = context.Pipe()
+        process = context.Process(target=portfolio_worker, args=(tactic, params, child), daemon=True)
+        process.start()
+        self.workers[name] = (process, parent)
+
+    def race(self, constraints):
+        """(result, winning configuration) of solving constraints with every configuration at once."""
+        solver = Solver()
+        solver.add(constraints)
+        smt2 = solver.to_smt2()
+        self.query += 1
+        for name, tactic, params in self.configs:
+            if name not in self.workers or not self.workers[name][0].is_alive():
+                self.start(name, tactic, params)
+            self.workers[name][1].send((self.query, smt2, self.hard_timeout))
+        pending = {self.workers[name][1]: name for name, _, _ in self.configs}
+        result, winner = "unknown", None
+        deadline = time.time() + self.hard_timeout / 1000 + 5
+        while pending and result == "unknown":
+            ready = wait(list(pending), timeout=max(0, deadline - time.time()))
+            if not ready:
+                break
+            for conn in ready:
+                name = pending.pop(conn)
+                try:
+                    query, answer, _ = conn.recv()
+                except EOFError:
+                    continue
+                if query == self.query and answer != "unknown" and result == "unknown":
+                    result, winner = answer, name
+        # the losers are still solving; restart them rather than wait
+        for conn, name in pending.items():
+            process = self.workers.pop(name)[0]
+            process.terminate()
+            process.join()
+        return result, winner
+
+    def close(self) -> None:
+        for process, conn in self.workers.values():
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        self.workers = {}
+
+    def summary(self) -> str:
+        return (f"Solver portfolio: {self.stats['incremental']} queries solved incrementally, "
+                f"{self.stats['raced']} raced (wins {self.wins}), {self.stats['unknown']} unknown {self.unknowns}, "
+                f"current timeout {self.timeout()}ms")
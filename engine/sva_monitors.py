@@ -0,0 +1,318 @@
+"""SVA properties compiled once into Z3 monitor templates. At each cycle boundary a template is
+instantiated against the stores of the last few cycles, so checking a property only adds the
+constraint for the attempt ending in that cycle instead of re-encoding the whole trace.
+
+Properties are compiled once per module definition and checked in every instance of it. An
+immediate assertion is only checked under the if and case conditions of the procedural code it is
+nested in, evaluated like the assertion itself on the store at the end of the cycle."""
+
+import z3
+from z3 import And, Or, Not
+from z3.z3util import get_vars
+import pyslang as ps
+from helpers.rvalue_to_z3 import slang_expr_to_z3
+from helpers.bv_encoding import to_bool, to_bv, align, lower_store_value
+from helpers.utils import init_symbol
+from helpers.query_log import timed_check
+from .execution_manager import ExecutionManager
+from .symbolic_state import SymbolicState
+from .incremental import definition_of
+from sv_parser import SystemVerilogParser
+import time
+
+
+def placeholder(name: str, offset: int) -> str:
+    """Template variable standing for signal name, offset cycles before the check."""
+    return f"{name}@{offset}"
+
+
+def sequence_terms(aexpr, start: int):
+    """Flatten a sequence into (expression, time) terms. Returns (terms, end time), or None when the
+    sequence uses something other than fixed delays."""
+    kind = aexpr.kind
+    if kind == ps.AssertionExprKind.Simple:
+        if not aexpr.repetition is None:
+            return None
+        return [(aexpr.expr, start)], start
+    elif kind == ps.AssertionExprKind.SequenceConcat:
+        terms = []
+        time_ = start
+        for element in aexpr.elements:
+            if element.delay.max is None or element.delay.min != element.delay.max:
+                return None
+            time_ += element.delay.min
+            res = sequence_terms(element.sequence, time_)
+            if res is None:
+                return None
+            terms += res[0]
+            time_ = res[1]
+        return terms, time_
+    return None
+
+
+def location_key(stmt) -> tuple:
+    """Identifies a statement across visits of the elaborated design."""
+    start = stmt.sourceRange.start
+    return start.buffer.id, start.offset
+
+
+def unguarded(stmt, guards: dict) -> None:
+    """Immediate assertions under stmt that are nested in something the guards don't model."""
+    def mark(obj):
+        if isinstance(obj, ps.Statement) and obj.kind == ps.StatementKind.ImmediateAssertion:
+            guards[location_key(obj)] = None
+    stmt.visit(mark)
+
+
+def assertion_guards(stmt, guard: tuple, guards: dict) -> None:
+    """Location of every immediate assertion under stmt -> the if and case conditions it is nested
+    in, None when it is nested in something else, like a loop."""
+    if stmt is None:
+        return
+    kind = stmt.kind
+    if kind == ps.StatementKind.ImmediateAssertion:
+        guards[location_key(stmt)] = guard
+    elif kind == ps.StatementKind.List:
+        for item in stmt.list:
+            assertion_guards(item, guard, guards)
+    elif kind == ps.StatementKind.Block:
+        assertion_guards(stmt.body, guard, guards)
+    elif kind == ps.StatementKind.Timed:
+        assertion_guards(stmt.stmt, guard, guards)
+    elif kind == ps.StatementKind.Conditional and len(stmt.conditions) == 1 and stmt.conditions[0].pattern is None:
+        cond = stmt.conditions[0].expr
+        assertion_guards(stmt.ifTrue, guard + (("if", cond, True),), guards)
+        assertion_guards(stmt.ifFalse, guard + (("if", cond, False),), guards)
+    elif kind == ps.StatementKind.Case and stmt.condition == ps.CaseStatementCondition.Normal:
+        # the first matching item wins
+        earlier = []
+        for item in stmt.items:
+            assertion_guards(item.stmt, guard + (("case", stmt.expr, list(item.expressions), list(earlier)),), guards)
+            earlier += item.expressions
+        assertion_guards(stmt.defaultCase, guard + (("case", stmt.expr, [], earlier),), guards)
+    else:
+        unguarded(stmt, guards)
+
+
+def guard_condition(term, value):
+    """One procedural condition of assertion_guards, over value(expression)."""
+    if term[0] == "if":
+        _, cond, taken = term
+        return to_bool(value(cond)) if taken else Not(to_bool(value(cond)))
+    _, subject, items, earlier = term
+    def match(item):
+        a, b = align(to_bv(value(subject)), to_bv(value(item)))
+        return a == b
+    arm = Or([match(item) for item in items]) if items else z3.BoolVal(True)
+    return And(arm, Not(Or([match(item) for item in earlier]))) if earlier else arm
+
+
+class MonitorTemplate:
+    """One compiled property: a template over placeholders and how many cycles of history it reads."""
+    def __init__(self, name: str, label: str, kind: str, module: str, template, span: int):
+        self.name = name
+        self.label = label
+        self.kind = kind
+        self.module = module
+        self.template = template
+        self.span = span
+        self.placeholders = []
+        for const in get_vars(template):
+            signal, _, offset = str(const).rpartition("@")
+            if signal and offset.isdigit():
+                self.placeholders.append((const, signal, int(offset)))
+
+    def instantiate(self, m: ExecutionManager, history):
+        """The property instance for the attempt ending at the latest store in history."""
+        if len(history) <= self.span:
+            return None
+        pairs = []
+        for const, signal, offset in self.placeholders:
+            store = history[-1 - offset]
+            if not signal in store:
+                store[signal] = init_symbol()
+            pairs.append((const, lower_store_value(m, store[signal], const.size())))
+        if len(pairs) == 0:
+            return self.template
+        return z3.substitute(self.template, *pairs)
+
+    def instance_name(self, module_name: str) -> str:
+        """Name of the property in one instance of the definition it was compiled for."""
+        return f"{module_name}:{self.name.partition(':')[2]}"
+
+
+def compile_assertion(m: ExecutionManager, module_name: str, info: dict, index: int, guards: dict = None):
+    """Compile an entry from SystemVerilogParser._extract_assertions into a MonitorTemplate.
+    guards are the procedural conditions of the immediate assertions, see assertion_guards."""
+    stmt = info.get("statement")
+    if stmt is None:
+        return None
+    kind = stmt.assertionKind.name
+    kind = "cover" if kind.startswith("Cover") else ("assume" if kind in ("Assume", "Restrict") else "assert")
+    guard = ()
+    if stmt.kind == ps.StatementKind.ImmediateAssertion:
+        guard = (guards or {}).get(location_key(stmt))
+        if guard is None:
+            # not found in a procedural block, or nested in something the guard can't express
+            return None
+        disable = []
+        ante, cons = [], [(stmt.cond, 0)]
+        span = 0
+    else:
+        prop = stmt.propertySpec
+        disable = []
+        while prop.kind in (ps.AssertionExprKind.Clocking, ps.AssertionExprKind.DisableIff):
+            if prop.kind == ps.AssertionExprKind.DisableIff:
+                disable.append(prop.condition)
+            prop = prop.expr
+        if prop.kind == ps.AssertionExprKind.Binary and prop.op.name in ("OverlappedImplication", "NonOverlappedImplication"):
+            res = sequence_terms(prop.left, 0)
+            if res is None:
+                return None
+            ante, ante_end = res
+            cons_start = ante_end + (1 if prop.op.name == "NonOverlappedImplication" else 0)
+            res = sequence_terms(prop.right, cons_start)
+            if res is None:
+                return None
+            cons, span = res
+        else:
+            res = sequence_terms(prop, 0)
+            if res is None:
+                return None
+            ante = []
+            cons, span = res
+
+    def value(expr, t):
+        lookup = lambda name, k: placeholder(name, span - t + k)
+        return slang_expr_to_z3(expr, None, m, lookup)
+
+    lower = lambda expr, t: to_bool(value(expr, t))
+    conditions = [guard_condition(term, lambda expr: value(expr, 0)) for term in guard]
+    antecedent = And(conditions + [lower(e, t) for e, t in ante] + [Not(lower(e, t)) for e in disable for t in range(span + 1)])
+    consequent = And([lower(e, t) for e, t in cons])
+    if kind == "assert":
+        template = And(antecedent, Not(consequent))
+    elif kind == "assume":
+        template = z3.Implies(antecedent, consequent)
+    else:
+        template = And(antecedent, consequent)
+    name = f"{module_name}:sva{index}"
+    label = info.get("location") or str(stmt.kind)
+    return MonitorTemplate(name, f"{kind} {label}", kind, module_name, z3.simplify(template), span)
+
+
+class MonitorSet:
+    """All compiled monitors plus the per-cycle store history of the current path."""
+    def __init__(self):
+        self.monitors = []
+        self.history = {}
+        # instance names of the covered cover monitors
+        self.covered = set()
+        # definitions compiled so far
+        self.definitions = set()
+        # instance names of the assert monitors added to a PropertySet
+        self.registered = set()
+
+    def compile(self, m: ExecutionManager, module_name: str, assertion_infos, guards: dict = None) -> None:
+        """Compile the parser's assertion entries for a module definition once, up front."""
+        self.definitions.add(module_name)
+        for info in assertion_infos:
+            monitor = compile_assertion(m, module_name, info, len(self.monitors), guards)
+            if monitor is None:
+                print(f"Unsupported property skipped: {info.get('condition')} at {info.get('location')}")
+                continue
+            self.monitors.append(monitor)
+
+    def of_module(self, module_name: str) -> list:
+        """The monitors checked in a module instance, e.g. mod_0 of definition mod."""
+        definition = definition_of(module_name, self.definitions)
+        return [monitor for monitor in self.monitors if monitor.module == definition]
+
+    def register(self, properties, module_names) -> None:
+        """Add the assert monitors of every module instance to a PropertySet so they are reported
+        with the other properties."""
+        for module_name in module_names:
+            for monitor in self.of_module(module_name):
+                if monitor.kind == "assert":
+                    name = monitor.instance_name(module_name)
+                    properties.add(name, monitor.label)
+                    self.registered.add(name)
+
+    def asserted(self) -> set:
+        """Names of the registered assert monitors."""
+        return set(self.registered)
+
+    def reset(self) -> None:
+        """Start of a new path."""
+        self.history = {}
+
+    def step(self, m: ExecutionManager, s: SymbolicState) -> None:
+        """Cycle boundary: snapshot the store and check this cycle's instance of every monitor."""
+        module_name = m.curr_module
+        if not module_name in s.store:
+            return
+        history = self.history.setdefault(module_name, [])
+        history.append(dict(s.store[module_name]))
+        for monitor in self.of_module(module_name):
+            name = monitor.instance_name(module_name)
+            instance = monitor.instantiate(m, history)
+            if instance is None:
+                continue
+            if monitor.kind == "assume":
+                s.pc.add(instance)
+                continue
+            if monitor.kind == "cover" and name in self.covered:
+                continue
+            if not m.properties is None and monitor.kind == "assert" and not m.properties.undecided([name]):
+                continue
+            s.pc.push()
+            s.pc.add(instance)
+            solver_start = time.process_time()
+            result = timed_check(s.pc, "sva_monitor", model=True)
+            m.solver_time += time.process_time() - solver_start
+            if result != "sat":
+                s.pc.pop()
+            elif monitor.kind == "cover":
+                self.covered.add(name)
+                s.pc.pop()
+            elif not m.properties is None:
+                m.properties.record(m, s, name, monitor.label)
+                s.pc.pop()
+            else:
+                # keep the violating instance so the end of path model is a counterexample
+                print(f"Assertion violation: {monitor.label} in {module_name} at cycle {m.cycle}")
+                m.assertion_violation = True
+
+
+def child_instances(instance) -> list:
+    return [member for member in instance.body if member.kind == ps.SymbolKind.Instance]
+
+
+def own_assertions(parser: SystemVerilogParser, instance) -> list:
+    """Assertion entries of an instance's own body; visiting an instance also visits those below it."""
+    nested = set()
+    for child in child_instances(instance):
+        nested |= {location_key(info["statement"]) for info in parser._extract_assertions(child) if info.get("statement") is not None}
+    return [info for info in parser._extract_assertions(instance) if info.get("statement") is None or location_key(info["statement"]) not in nested]
+
+
+def build_monitors(compilation) -> MonitorSet:
+    """Compile the assertions of every module definition instantiated in an elaborated design."""
+    parser = SystemVerilogParser()
+    parser.source_manager = compilation.sourceManager
+    monitors = MonitorSet()
+    m = ExecutionManager()
+    pending = list(compilation.getRoot().topInstances)
+    while pending:
+        instance = pending.pop(0)
+        pending += child_instances(instance)
+        if instance.definition.name in monitors.definitions:
+            continue
+        guards = {}
+        def procedural(obj):
+            if isinstance(obj, ps.ProceduralBlockSymbol):
+                assertion_guards(obj.body, (), guards)
+        instance.visit(procedural)
+        monitors.compile(m, instance.definition.name, own_assertions(parser, instance), guards)
+    print(f"Compiled {len(monitors.monitors)} SVA monitors for {len(monitors.definitions)} definitions")
+    return monitors
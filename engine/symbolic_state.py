@@ -4,15 +4,20 @@ are some other methods here that may be helpful, too."""
 import z3
 from z3 import Solver, Int, BitVec, BitVecSort
 from pyverilog.vparser.ast import Pointer
+from helpers.abstract_domain import AbstractStore
+from helpers.persistent_map import SymbolicStore
 
 class SymbolicState:
     pc = Solver()
+    # known bits and ranges of the symbols constrained by pc, pushed and popped with it
+    domain = AbstractStore()
     assertion_counter = 0
     sort = BitVecSort(32)
     clock_cycle: int = 0
     #TODO need to change to be a nested mapping of module names to dictionaries
     # can be initalized at the beginning of the run 
-    store = {}
+    # module -> signal -> symbolic value, persistent so forks and snapshots are O(1)
+    store = SymbolicStore()
 
     # set to true when evaluating a conditoin so that
     # evaluating the expression knows to add the expr to the
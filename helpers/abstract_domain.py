@@ -0,0 +1,313 @@
+"""Known-bits and interval abstract domain over the symbols of the path condition.
+
+Every symbol that a taken branch constrained gets an AbstractValue (bits known to be 0 or 1 plus
+an unsigned range). The values over-approximate the models of the path condition, so a branch
+condition that evaluates to false under them is infeasible without asking the solver."""
+
+import z3
+from z3 import Z3_OP_UNINTERPRETED, Z3_OP_EXTRACT, Z3_OP_ZERO_EXT, Z3_OP_CONCAT, Z3_OP_BAND, Z3_OP_BOR
+from z3 import Z3_OP_BXOR, Z3_OP_BNOT, Z3_OP_BADD, Z3_OP_BSUB, Z3_OP_BSHL, Z3_OP_BLSHR, Z3_OP_ITE
+from z3 import Z3_OP_TRUE, Z3_OP_FALSE, Z3_OP_AND, Z3_OP_OR, Z3_OP_NOT, Z3_OP_EQ, Z3_OP_DISTINCT
+from z3 import Z3_OP_ULEQ, Z3_OP_ULT, Z3_OP_UGEQ, Z3_OP_UGT, Z3_OP_SLEQ, Z3_OP_SLT, Z3_OP_SGEQ, Z3_OP_SGT
+
+UNSIGNED_COMPARE = {
+    Z3_OP_ULEQ: lambda a, b: (a.hi <= b.lo, a.lo > b.hi),
+    Z3_OP_ULT: lambda a, b: (a.hi < b.lo, a.lo >= b.hi),
+    Z3_OP_UGEQ: lambda a, b: (a.lo >= b.hi, a.hi < b.lo),
+    Z3_OP_UGT: lambda a, b: (a.lo > b.hi, a.hi <= b.lo),
+}
+
+SIGNED_TO_UNSIGNED = {Z3_OP_SLEQ: Z3_OP_ULEQ, Z3_OP_SLT: Z3_OP_ULT, Z3_OP_SGEQ: Z3_OP_UGEQ, Z3_OP_SGT: Z3_OP_UGT}
+
+NEGATED_COMPARE = {Z3_OP_ULEQ: Z3_OP_UGT, Z3_OP_ULT: Z3_OP_UGEQ, Z3_OP_UGEQ: Z3_OP_ULT, Z3_OP_UGT: Z3_OP_ULEQ}
+
+
+class AbstractValue:
+    """Bits known to be zero or one and an unsigned interval of a bit-vector of width bits."""
+    def __init__(self, width: int, zeros: int = 0, ones: int = 0, lo: int = 0, hi: int = None):
+        self.width = width
+        self.mask = (1 << width) - 1
+        self.zeros = zeros & self.mask
+        self.ones = ones & self.mask
+        self.lo = lo
+        self.hi = self.mask if hi is None else hi
+        self.normalize()
+
+    @staticmethod
+    def const(value: int, width: int):
+        value &= (1 << width) - 1
+        return AbstractValue(width, ~value, value, value, value)
+
+    def normalize(self) -> None:
+        """Tighten the interval with the known bits and the other way round."""
+        self.lo = max(self.lo, self.ones)
+        self.hi = min(self.hi, ~self.zeros & self.mask)
+        if self.lo == self.hi:
+            self.ones |= self.lo
+            self.zeros |= ~self.lo & self.mask
+        else:
+            # bits above the highest differing bit of lo and hi are fixed
+            common = self.width - (self.lo ^ self.hi).bit_length()
+            high = (self.mask >> (self.width - common)) << (self.width - common) if common > 0 else 0
+            self.ones |= self.lo & high
+            self.zeros |= ~self.lo & high
+
+    def bottom(self) -> bool:
+        return (self.zeros & self.ones) != 0 or self.lo > self.hi
+
+    def singleton(self):
+        return self.lo if self.lo == self.hi else None
+
+    def meet(self, other):
+        return AbstractValue(self.width, self.zeros | other.zeros, self.ones | other.ones,
+                             max(self.lo, other.lo), min(self.hi, other.hi))
+
+    def join(self, other):
+        return AbstractValue(self.width, self.zeros & other.zeros, self.ones & other.ones,
+                             min(self.lo, other.lo), max(self.hi, other.hi))
+
+
+def bits_value(width: int, zeros: int, ones: int) -> AbstractValue:
+    return AbstractValue(width, zeros, ones)
+
+
+def abstract_eval(e, lookup) -> AbstractValue:
+    """Abstract value of a bit-vector expression; lookup(name, width) gives the value of a symbol."""
+    width = e.size()
+    if z3.is_bv_value(e):
+        return AbstractValue.const(e.as_long(), width)
+    kind = e.decl().kind()
+    if kind == Z3_OP_UNINTERPRETED and e.num_args() == 0:
+        return lookup(e.decl().name(), width)
+    if kind == Z3_OP_EXTRACT:
+        hi, lo = e.params()
+        x = abstract_eval(e.arg(0), lookup)
+        value = bits_value(width, x.zeros >> lo, x.ones >> lo)
+        if lo == 0 and x.hi <= value.mask:
+            value = value.meet(AbstractValue(width, lo=x.lo, hi=x.hi))
+        return value
+    if kind == Z3_OP_ZERO_EXT:
+        x = abstract_eval(e.arg(0), lookup)
+        high = ((1 << width) - 1) ^ x.mask
+        return AbstractValue(width, x.zeros | high, x.ones, x.lo, x.hi)
+    if kind == Z3_OP_CONCAT:
+        zeros, ones = 0, 0
+        for i in range(e.num_args()):
+            x = abstract_eval(e.arg(i), lookup)
+            zeros = (zeros << x.width) | x.zeros
+            ones = (ones << x.width) | x.ones
+        return bits_value(width, zeros, ones)
+    if kind in (Z3_OP_BAND, Z3_OP_BOR, Z3_OP_BXOR):
+        args = [abstract_eval(e.arg(i), lookup) for i in range(e.num_args())]
+        value = args[0]
+        for x in args[1:]:
+            if kind == Z3_OP_BAND:
+                value = bits_value(width, value.zeros | x.zeros, value.ones & x.ones)
+            elif kind == Z3_OP_BOR:
+                value = bits_value(width, value.zeros & x.zeros, value.ones | x.ones)
+            else:
+                known = (value.zeros | value.ones) & (x.zeros | x.ones)
+                ones = (value.ones ^ x.ones) & known
+                value = bits_value(width, known & ~ones, ones)
+        return value
+    if kind == Z3_OP_BNOT:
+        x = abstract_eval(e.arg(0), lookup)
+        return bits_value(width, x.ones, x.zeros)
+    if kind in (Z3_OP_BADD, Z3_OP_BSUB) and e.num_args() == 2:
+        a, b = abstract_eval(e.arg(0), lookup), abstract_eval(e.arg(1), lookup)
+        if kind == Z3_OP_BADD and a.hi + b.hi <= a.mask:
+            return AbstractValue(width, lo=a.lo + b.lo, hi=a.hi + b.hi)
+        if kind == Z3_OP_BSUB and a.lo >= b.hi:
+            return AbstractValue(width, lo=a.lo - b.hi, hi=a.hi - b.lo)
+        return AbstractValue(width)
+    if kind in (Z3_OP_BSHL, Z3_OP_BLSHR):
+        x, shift = abstract_eval(e.arg(0), lookup), abstract_eval(e.arg(1), lookup)
+        amount = shift.singleton()
+        if amount is None:
+            return AbstractValue(width)
+        if amount >= width:
+            return AbstractValue.const(0, width)
+        if kind == Z3_OP_BSHL:
+            return bits_value(width, (x.zeros << amount) | ((1 << amount) - 1), x.ones << amount)
+        high = ((1 << width) - 1) ^ ((1 << (width - amount)) - 1)
+        return bits_value(width, (x.zeros >> amount) | high, x.ones >> amount)
+    if kind == Z3_OP_ITE:
+        cond = abstract_truth(e.arg(0), lookup)
+        if cond is True:
+            return abstract_eval(e.arg(1), lookup)
+        if cond is False:
+            return abstract_eval(e.arg(2), lookup)
+        return abstract_eval(e.arg(1), lookup).join(abstract_eval(e.arg(2), lookup))
+    return AbstractValue(width)
+
+
+def abstract_truth(e, lookup):
+    """True or False when the domain decides a boolean expression, None when it does not."""
+    kind = e.decl().kind()
+    if kind == Z3_OP_TRUE:
+        return True
+    if kind == Z3_OP_FALSE:
+        return False
+    if kind == Z3_OP_NOT:
+        value = abstract_truth(e.arg(0), lookup)
+        return None if value is None else not value
+    if kind in (Z3_OP_AND, Z3_OP_OR):
+        values = [abstract_truth(e.arg(i), lookup) for i in range(e.num_args())]
+        decided = False if kind == Z3_OP_AND else True
+        if decided in values:
+            return decided
+        return (not decided) if all(v is not None for v in values) else None
+    if kind in (Z3_OP_EQ, Z3_OP_DISTINCT) and e.num_args() == 2:
+        if z3.is_bool(e.arg(0)):
+            a, b = abstract_truth(e.arg(0), lookup), abstract_truth(e.arg(1), lookup)
+            equal = None if a is None or b is None else a == b
+        else:
+            a, b = abstract_eval(e.arg(0), lookup), abstract_eval(e.arg(1), lookup)
+            if a.singleton() is not None and a.singleton() == b.singleton():
+                equal = True
+            elif a.meet(b).bottom():
+                equal = False
+            else:
+                equal = None
+        if equal is None:
+            return None
+        return equal if kind == Z3_OP_EQ else not equal
+    if kind in SIGNED_TO_UNSIGNED or kind in UNSIGNED_COMPARE:
+        a, b = abstract_eval(e.arg(0), lookup), abstract_eval(e.arg(1), lookup)
+        if kind in SIGNED_TO_UNSIGNED:
+            # signed and unsigned order agree when both sides are non-negative
+            sign = 1 << (a.width - 1)
+            if a.hi >= sign or b.hi >= sign:
+                return None
+            kind = SIGNED_TO_UNSIGNED[kind]
+        holds, fails = UNSIGNED_COMPARE[kind](a, b)
+        return True if holds else (False if fails else None)
+    return None
+
+
+class AbstractStore:
+    """Abstract values of symbols, in frames that follow the push/pop of the path condition."""
+    def __init__(self):
+        self.frames = [{}]
+
+    def push(self) -> None:
+        self.frames.append({})
+
+    def pop(self) -> None:
+        if len(self.frames) > 1:
+            self.frames.pop()
+
+    def reset(self) -> None:
+        self.frames = [{}]
+
+    def lookup(self, name: str, width: int) -> AbstractValue:
+        for frame in reversed(self.frames):
+            if name in frame:
+                return frame[name]
+        return AbstractValue(width)
+
+    def truth(self, constraint):
+        """Decide a branch constraint under the current abstract values, or None."""
+        verdict = abstract_truth(constraint, self.lookup)
+        if verdict is None and not self.refine(constraint, commit=False):
+            return False
+        return verdict
+
+    def refine(self, constraint, commit: bool = True) -> bool:
+        """Narrow the symbols constrained by a constraint added to the path condition. Returns False
+        when the constraint contradicts the current values."""
+        updates = {}
+        lookup = lambda name, width: updates[name] if name in updates else self.lookup(name, width)
+        if not narrow_bool(constraint, True, lookup, updates):
+            return False
+        if commit:
+            self.frames[-1].update(updates)
+        return True
+
+
+def narrow_bool(e, expected: bool, lookup, updates) -> bool:
+    """Record in updates what e == expected implies for the symbols in e. False on contradiction."""
+    kind = e.decl().kind()
+    if kind == Z3_OP_NOT:
+        return narrow_bool(e.arg(0), not expected, lookup, updates)
+    if (kind == Z3_OP_AND and expected) or (kind == Z3_OP_OR and not expected):
+        return all(narrow_bool(e.arg(i), expected, lookup, updates) for i in range(e.num_args()))
+    if kind in (Z3_OP_EQ, Z3_OP_DISTINCT) and e.num_args() == 2 and z3.is_bv(e.arg(0)):
+        equal = expected if kind == Z3_OP_EQ else not expected
+        for x, y in ((e.arg(0), e.arg(1)), (e.arg(1), e.arg(0))):
+            value = abstract_eval(y, lookup)
+            if equal:
+                if not narrow_bv(x, value, lookup, updates):
+                    return False
+            elif value.singleton() is not None:
+                current = abstract_eval(x, lookup)
+                if current.lo == value.lo:
+                    narrowed = AbstractValue(x.size(), lo=current.lo + 1)
+                elif current.hi == value.lo:
+                    narrowed = AbstractValue(x.size(), hi=current.hi - 1)
+                else:
+                    continue
+                if not narrow_bv(x, narrowed, lookup, updates):
+                    return False
+        return True
+    if kind in UNSIGNED_COMPARE:
+        kind = kind if expected else NEGATED_COMPARE[kind]
+        x, y = e.arg(0), e.arg(1)
+        a, b = abstract_eval(x, lookup), abstract_eval(y, lookup)
+        width = x.size()
+        if kind == Z3_OP_ULEQ:
+            return narrow_bv(x, AbstractValue(width, hi=b.hi), lookup, updates) and narrow_bv(y, AbstractValue(width, lo=a.lo), lookup, updates)
+        if kind == Z3_OP_ULT:
+            return b.hi > 0 and a.lo < a.mask and narrow_bv(x, AbstractValue(width, hi=b.hi - 1), lookup, updates) and narrow_bv(y, AbstractValue(width, lo=a.lo + 1), lookup, updates)
+        if kind == Z3_OP_UGEQ:
+            return narrow_bv(x, AbstractValue(width, lo=b.lo), lookup, updates) and narrow_bv(y, AbstractValue(width, hi=a.hi), lookup, updates)
+        if kind == Z3_OP_UGT:
+            return a.hi > 0 and b.lo < b.mask and narrow_bv(x, AbstractValue(width, lo=b.lo + 1), lookup, updates) and narrow_bv(y, AbstractValue(width, hi=a.hi - 1), lookup, updates)
+    verdict = abstract_truth(e, lookup)
+    return verdict is None or verdict == expected
+
+
+def narrow_bv(x, value: AbstractValue, lookup, updates) -> bool:
+    """Record that bit-vector expression x lies in value. False on contradiction."""
+    current = abstract_eval(x, lookup)
+    narrowed = current.meet(value)
+    if narrowed.bottom():
+        return False
+    if z3.is_bv_value(x):
+        return True
+    kind = x.decl().kind()
+    if kind == Z3_OP_UNINTERPRETED and x.num_args() == 0:
+        updates[x.decl().name()] = narrowed
+        return True
+    if kind == Z3_OP_ZERO_EXT:
+        inner = x.arg(0)
+        return narrow_bv(inner, AbstractValue(inner.size(), narrowed.zeros, narrowed.ones,
+                                              narrowed.lo, min(narrowed.hi, (1 << inner.size()) - 1)), lookup, updates)
+    if kind == Z3_OP_EXTRACT:
+        hi, lo = x.params()
+        inner = x.arg(0)
+        return narrow_bv(inner, AbstractValue(inner.size(), narrowed.zeros << lo, narrowed.ones << lo), lookup, updates)
+    if kind == Z3_OP_CONCAT:
+        offset = x.size()
+        for i in range(x.num_args()):
+            part = x.arg(i)
+            offset -= part.size()
+            if not narrow_bv(part, AbstractValue(part.size(), narrowed.zeros >> offset, narrowed.ones >> offset), lookup, updates):
+                return False
+        return True
+    if kind in (Z3_OP_BLSHR, Z3_OP_BSHL) and z3.is_bv_value(x.arg(1)):
+        # the bits of the shifted operand that stay in range are known
+        amount = x.arg(1).as_long()
+        inner = x.arg(0)
+        if amount >= inner.size():
+            return True
+        if kind == Z3_OP_BLSHR:
+            return narrow_bv(inner, AbstractValue(inner.size(), narrowed.zeros << amount, narrowed.ones << amount), lookup, updates)
+        return narrow_bv(inner, AbstractValue(inner.size(), narrowed.zeros >> amount, narrowed.ones >> amount), lookup, updates)
+    if kind == Z3_OP_BAND and x.num_args() == 2:
+        # (sym & MASK) == value fixes the bits of sym under MASK
+        for inner, other in ((x.arg(0), x.arg(1)), (x.arg(1), x.arg(0))):
+            if z3.is_bv_value(other):
+                select = other.as_long()
+                return narrow_bv(inner, AbstractValue(inner.size(), narrowed.zeros & select, narrowed.ones & select), lookup, updates)
+    return True
@@ -0,0 +1,128 @@
+"""Two-sided branch resolution. When a branch has to go to the solver, both the condition and its
+negation are solved under the current prefix of the path condition, and the pair of answers is
+kept in a table keyed by the prefix. The enumerated sibling path that takes the other direction
+after the same prefix then finds its answer there. Symbols are fresh on every path, so prefixes are
+compared after renaming their symbols in order of first appearance, which keeps satisfiability.
+A condition and its negation share an entry, with a != b keyed as the negation of a == b."""
+
+import z3
+from z3 import Solver, Context
+from z3.z3util import get_vars
+from concurrent.futures import ThreadPoolExecutor
+from helpers.model_cache import constraint_body
+from helpers.query_log import timed_check
+
+
+def solve_in_context(constraints) -> str:
+    """Runs in a worker thread; constraints live in their own z3 context, and check() releases the GIL."""
+    solver = Solver(ctx=constraints[0].ctx)
+    solver.add(constraints)
+    return timed_check(solver, "sibling", constraints)
+
+
+def polarity(body):
+    """(condition, whether body asserts it rather than its negation), with Not and two argument
+    Distinct stripped."""
+    positive = True
+    while True:
+        if z3.is_not(body):
+            body = body.arg(0)
+        elif z3.is_distinct(body) and body.num_args() == 2:
+            body = body.arg(0) == body.arg(1)
+        else:
+            return body, positive
+        positive = not positive
+
+
+def ordered_sides(condition):
+    """An equality with its sides in a fixed order, since Distinct reorders its arguments."""
+    if not z3.is_eq(condition):
+        return condition
+    left, right = sorted(condition.children(), key=lambda side: side.get_id())
+    return left == right
+
+
+class BranchTable:
+    """Answers for both directions of branches, keyed by the renamed prefix they were solved under."""
+    def __init__(self, threads: int = 0, capacity: int = 8192):
+        self.capacity = capacity
+        # solve the sibling direction in a thread while the taken direction is solved in this one
+        self.pool = ThreadPoolExecutor(max_workers=threads) if threads > 0 else None
+        # expression id -> (expression, its symbols in order of first appearance)
+        self.symbols = {}
+        # (renamed prefix ids, renamed condition id) -> (renamed expressions, [condition feasible, negation feasible])
+        self.table = {}
+        self.stats = {"queries": 0, "hits": 0, "siblings solved": 0}
+
+    def symbols_of(self, c):
+        entry = self.symbols.get(c.get_id())
+        if entry is None:
+            if len(self.symbols) > 16 * self.capacity:
+                self.symbols.clear()
+            entry = self.symbols[c.get_id()] = (c, get_vars(c))
+        return entry[1]
+
+    def rename(self, constraints):
+        """constraints with their symbols renamed v0, v1, ... in order of first appearance."""
+        renaming = {}
+        for c in constraints:
+            for v in self.symbols_of(c):
+                if v.get_id() not in renaming:
+                    renaming[v.get_id()] = (v, z3.Const(f"v{len(renaming)}", v.sort()))
+        return [z3.substitute(c, *renaming.values()) for c in constraints]
+
+    def key(self, prefix, condition):
+        renamed = self.rename(prefix + [condition])
+        renamed[-1] = ordered_sides(renamed[-1])
+        return tuple(c.get_id() for c in renamed[:-1]), renamed[-1].get_id(), renamed
+
+    def sibling_query(self, m, prefix, negation):
+        constraints = prefix + [negation]
+        if m.slicer is not None:
+            constraints = m.slicer.slice(constraints, negation)
+        return constraints
+
+    def feasible(self, m, s, constraint, solve) -> bool:
+        """Whether the path condition, which ends with constraint, is satisfiable. solve() answers that
+        for the path condition as it is; the opposite direction is solved too and both are kept."""
+        self.stats["queries"] += 1
+        condition, positive = polarity(constraint_body(constraint))
+        prefix = [constraint_body(c) for c in s.pc.assertions()][:-1]
+        prefix_key, condition_key, renamed = self.key(prefix, condition)
+        entry = self.table.get((prefix_key, condition_key))
+        if entry is not None and entry[1][0 if positive else 1] is not None:
+            self.stats["hits"] += 1
+            return entry[1][0 if positive else 1]
+
+        sibling = self.sibling_query(m, prefix, z3.Not(condition) if positive else condition)
+        pending = None
+        if self.pool is not None:
+            # translated up front: z3 contexts are not thread safe, so the worker gets its own
+            ctx = Context()
+            pending = self.pool.submit(solve_in_context, [c.translate(ctx) for c in sibling])
+        taken = solve(m, s, constraint)
+        if pending is not None:
+            result = pending.result()
+        else:
+            solver = Solver()
+            solver.add(sibling)
+            result = timed_check(solver, "sibling", sibling)
+            if m.model_cache is not None:
+                m.model_cache.record(solver, result)
+        self.stats["siblings solved"] += 1
+        # unknown is treated as feasible so no path is dropped
+        other = result != "unsat"
+
+        if len(self.table) >= self.capacity:
+            self.table.pop(next(iter(self.table)))
+        answers = [taken, other] if positive else [other, taken]
+        self.table[(prefix_key, condition_key)] = (renamed, answers)
+        return taken
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+
+    def summary(self) -> str:
+        return (f"Branch table: {self.stats['hits']} of {self.stats['queries']} solver branch queries answered by a sibling, "
+                f"{self.stats['siblings solved']} siblings solved, {len(self.table)} entries")
@@ -0,0 +1,232 @@
+"""Width-accurate encoding of symbolic values as Z3 bit-vectors.
+
+Signal widths are inferred once per module from the declarations (pyverilog) or the
+elaborated types (pyslang) and kept in the manager, so every symbol and constant is
+lowered at its real width instead of a blanket 32 bits."""
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import z3
+from z3 import BitVec, BitVecVal, BitVecRef, BoolRef, Concat, Extract, ZeroExt
+from pyverilog.vparser.ast import ModuleDef, Decl, Ioport, Input, Output, Inout, Reg, Wire, IntConst, Identifier
+from pyverilog.vparser.ast import Operator, UnaryOperator, Uminus
+import pyslang as ps
+if TYPE_CHECKING:
+    # annotations only: engine/execution_manager.py imports this module through engine/case_encoding.py
+    from engine.execution_manager import ExecutionManager
+
+DEFAULT_WIDTH = 32
+
+BASES = {"b": 2, "o": 8, "d": 10, "h": 16}
+
+CONST_OPS = {"Plus": lambda a, b: a + b, "Minus": lambda a, b: a - b, "Times": lambda a, b: a * b,
+"Divide": lambda a, b: a // b, "Mod": lambda a, b: a % b, "Power": lambda a, b: a ** b,
+"Sll": lambda a, b: a << b, "Srl": lambda a, b: a >> b}
+
+
+def parse_int_literal(literal):
+    """Parse a Verilog integer literal like 4'b1010 or 'hff into (value, width). Width is None when unsized."""
+    text = str(literal).replace("_", "").strip()
+    if "'" not in text:
+        return (int(text), None) if text.isdigit() else (None, None)
+    size, _, rest = text.partition("'")
+    rest = rest.lstrip("sS")
+    if rest == "" or rest[0].lower() not in BASES:
+        return None, None
+    digits = rest[1:]
+    if any(c in digits.lower() for c in "xz?"):
+        return None, None
+    try:
+        value = int(digits, BASES[rest[0].lower()])
+    except ValueError:
+        return None, None
+    width = int(size) if size.isdigit() else None
+    return value, width
+
+
+def literal_width(value: int) -> int:
+    """Minimum number of bits needed to hold an unsized literal."""
+    return max(value.bit_length(), 1)
+
+
+def width_from_range(width_node, m: ExecutionManager, module_name: str) -> int:
+    """Compute the width of a pyverilog Width node, resolving parameters recorded for the module."""
+    if width_node is None:
+        return 1
+    msb = eval_width_bound(width_node.msb, m, module_name)
+    lsb = eval_width_bound(width_node.lsb, m, module_name)
+    if msb is None or lsb is None:
+        return DEFAULT_WIDTH
+    return abs(msb - lsb) + 1
+
+
+def eval_width_bound(node, m: ExecutionManager, module_name: str):
+    """Evaluate a constant bound of a declared range, e.g. WIDTH-1."""
+    if isinstance(node, IntConst):
+        return parse_int_literal(node.value)[0]
+    if isinstance(node, Identifier):
+        return m.param_values.get(module_name, {}).get(node.name)
+    if isinstance(node, UnaryOperator):
+        right = eval_width_bound(node.right, m, module_name)
+        if right is None:
+            return None
+        return -right if isinstance(node, Uminus) else right
+    if isinstance(node, Operator) and type(node).__name__ in CONST_OPS:
+        left = eval_width_bound(node.left, m, module_name)
+        right = eval_width_bound(node.right, m, module_name)
+        if left is None or right is None:
+            return None
+        try:
+            return CONST_OPS[type(node).__name__](left, right)
+        except ZeroDivisionError:
+            return None
+    return None
+
+
+def infer_widths(m: ExecutionManager, module: ModuleDef, module_name: str = None) -> None:
+    """One pass over a pyverilog module's ports and declarations recording each signal's width."""
+    module_name = module_name if module_name is not None else module.name
+    if module_name in m.sig_widths:
+        return
+    widths = m.sig_widths[module_name] = {}
+    params = m.param_values.setdefault(module_name, {})
+    for param in module.paramlist.params:
+        for item in param.list:
+            value = eval_width_bound(item.value.var, m, module_name) if item.value is not None else None
+            if value is not None:
+                params[item.name] = value
+    for port in module.portlist.ports:
+        if isinstance(port, Ioport):
+            widths[str(port.first.name)] = width_from_range(port.first.width, m, module_name)
+    for item in module.items:
+        if isinstance(item, Decl):
+            for decl in item.list:
+                if isinstance(decl, (Input, Output, Inout, Reg, Wire)) and decl.name not in widths:
+                    widths[decl.name] = width_from_range(decl.width, m, module_name)
+                elif isinstance(decl, (Input, Output, Inout, Reg, Wire)) and decl.width is not None:
+                    # output reg [7:0] q; keeps the widest declaration
+                    widths[decl.name] = max(widths[decl.name], width_from_range(decl.width, m, module_name))
+
+
+def infer_widths_sv(m: ExecutionManager, body, module_name: str) -> None:
+    """Record widths of a pyslang instance body's ports, nets and variables from their elaborated types."""
+    if module_name in m.sig_widths:
+        return
+    widths = m.sig_widths[module_name] = {}
+    for member in body:
+        if member.kind in (ps.SymbolKind.Port, ps.SymbolKind.Net, ps.SymbolKind.Variable):
+            width = member.type.bitWidth if hasattr(member, "type") else 0
+            widths[member.name] = width if width > 0 else DEFAULT_WIDTH
+
+
+def signal_width(m: ExecutionManager, name, module_name: str = None) -> int:
+    """Look up the declared width of a signal, defaulting to 32 bits for undeclared names."""
+    module_name = module_name if module_name is not None else m.curr_module
+    return m.sig_widths.get(module_name, {}).get(str(name), DEFAULT_WIDTH)
+
+
+def bv_const(value: int, width: int) -> BitVecRef:
+    """A constant of the given width, truncated like a Verilog assignment would."""
+    return BitVecVal(value % (1 << width), width)
+
+
+def bv_symbol(m: ExecutionManager, symbol: str, width: int) -> BitVecRef:
+    """A symbol at the requested width. A symbol keeps the width it was first declared with so it is
+    always the same Z3 constant, and is resized when read at a different width."""
+    if symbol in m.memory_reads:
+        # stands for an expression over a memory, see helpers/memory_model.py
+        return resize(to_bv(m.memory_reads[symbol]), width)
+    declared = m.symbol_widths.setdefault(symbol, width)
+    return resize(BitVec(symbol, declared), width)
+
+
+def resize(x: BitVecRef, width: int) -> BitVecRef:
+    """Zero extend or truncate a bit-vector to width."""
+    if x.size() == width:
+        return x
+    if x.size() < width:
+        return ZeroExt(width - x.size(), x)
+    return Extract(width - 1, 0, x)
+
+
+def align(x, y):
+    """Zero extend the narrower operand so both operands have the same width."""
+    if isinstance(x, BoolRef) or isinstance(y, BoolRef):
+        return to_bool(x), to_bool(y)
+    width = max(x.size(), y.size())
+    return resize(x, width), resize(y, width)
+
+
+def to_bool(x):
+    """Verilog truthiness of a bit-vector: nonzero."""
+    if isinstance(x, BoolRef):
+        return x
+    return x != BitVecVal(0, x.size())
+
+
+def to_bv(x, width: int = 1):
+    """Turn a boolean back into a bit-vector (1/0) for use as an operand."""
+    if isinstance(x, BoolRef):
+        return z3.If(x, BitVecVal(1, width), BitVecVal(0, width))
+    return x
+
+
+def select_bound(m: ExecutionManager, text: str, module_name: str):
+    """A bound of a part select kept in a store string, e.g. the 7 or WIDTH-1 of sym[7:0]."""
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    return m.param_values.get(module_name, {}).get(text)
+
+
+def lower_concat_part(m: ExecutionManager, name, value, module_name: str = None):
+    """Lower one part of a concat dict at its own width: the declared width of the signal it names,
+    the select it holds, or the width its symbol was created with."""
+    module_name = module_name if module_name is not None else m.curr_module
+    text = str(value)
+    if "'" in text:
+        const, literal_w = parse_int_literal(text)
+        if const is not None:
+            return bv_const(const, literal_w if literal_w is not None else literal_width(const))
+    if text.isdigit():
+        return bv_const(int(text), literal_width(int(text)))
+    declared = m.sig_widths.get(module_name, {}).get(str(name))
+    base, bracket, select = text.partition("[")
+    if bracket and select.endswith("]") and ":" in select:
+        msb, _, lsb = select[:-1].partition(":")
+        msb, lsb = select_bound(m, msb, module_name), select_bound(m, lsb, module_name)
+        if msb is not None and lsb is not None and msb >= lsb:
+            symbol = bv_symbol(m, base, max(declared or 0, msb + 1))
+            return Extract(msb, lsb, symbol)
+    if declared is not None:
+        return bv_symbol(m, text, declared)
+    return bv_symbol(m, text, m.symbol_widths.get(text, 1))
+
+
+def lower_store_value(m: ExecutionManager, value, width: int, module_name: str = None):
+    """Lower a value from the symbolic store (symbol, decimal string, literal or concat dict) at width."""
+    if isinstance(value, dict):
+        parts = [lower_concat_part(m, name, part, module_name) for name, part in value.items()]
+        return resize(Concat(parts) if len(parts) > 1 else parts[0], width)
+    value = str(value)
+    if value.isdigit():
+        return bv_const(int(value), width)
+    if "'" in value:
+        const, _ = parse_int_literal(value)
+        if const is not None:
+            return bv_const(const, width)
+    return bv_symbol(m, value, width)
+
+
+def lower_signal(m: ExecutionManager, store, name, module_name: str = None):
+    """Lower the current symbolic value of a signal at its declared width."""
+    module_name = module_name if module_name is not None else m.curr_module
+    width = signal_width(m, name, module_name)
+    return lower_store_value(m, store[module_name][str(name)], width, module_name)
+
+
+def align_arith(x, y):
+    """Operands of +, -, * and << are evaluated at least at integer width, as Verilog does when an
+    unsized constant is involved, so results don't wrap early."""
+    x, y = to_bv(x), to_bv(y)
+    width = max(x.size(), y.size(), DEFAULT_WIDTH)
+    return resize(x, width), resize(y, width)
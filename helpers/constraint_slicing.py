@@ -0,0 +1,93 @@
+"""Constraint-independence slicing of the path condition. Constraints are grouped by the symbols
+they share (union-find), and a feasibility query only sends the group connected to the new branch
+condition to the solver. The rest of the path condition was satisfiable when it was added and does
+not share a symbol with that group, so it can't change the answer."""
+
+import z3
+from z3 import Solver
+from z3.z3util import get_vars
+from helpers.model_cache import constraint_body
+from helpers.query_log import timed_check
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, x, y) -> None:
+        x, y = self.find(x), self.find(y)
+        if x != y:
+            self.parent[x] = y
+
+
+class ConstraintSlicer:
+    """Slices path conditions and caches the result of every group it sent to the solver."""
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        # expression id -> (expression, its symbol names); the expression keeps the id from being reused
+        self.symbols = {}
+        # group key -> (constraints, satisfiable)
+        self.results = {}
+        self.stats = {"queries": 0, "cached": 0, "constraints": 0, "sliced": 0}
+
+    def symbols_of(self, c) -> frozenset:
+        entry = self.symbols.get(c.get_id())
+        if entry is None:
+            if len(self.symbols) > 16 * self.capacity:
+                self.symbols.clear()
+            entry = self.symbols[c.get_id()] = (c, frozenset(str(v) for v in get_vars(c)))
+        return entry[1]
+
+    def slice(self, constraints, target):
+        """The constraints connected to target through shared symbols, target included."""
+        groups = UnionFind()
+        for c in constraints:
+            names = list(self.symbols_of(c))
+            for name in names[1:]:
+                groups.union(names[0], name)
+        roots = set(groups.find(name) for name in self.symbols_of(target))
+        return [c for c in constraints if c.get_id() == target.get_id() or
+                any(groups.find(name) in roots for name in self.symbols_of(c))]
+
+    def feasible(self, s: Solver, target, cache=None) -> bool:
+        """Whether the path condition, which already contains target, is satisfiable; only the slice
+        connected to target is solved."""
+        constraints = [constraint_body(c) for c in s.assertions()]
+        target = constraint_body(target)
+        group = self.slice(constraints, target)
+        self.stats["queries"] += 1
+        self.stats["constraints"] += len(constraints)
+        self.stats["sliced"] += len(group)
+        key = frozenset(c.get_id() for c in group)
+        if key in self.results:
+            self.stats["cached"] += 1
+            return self.results[key][1]
+        known = cache.lookup_constraints(group) if cache is not None else None
+        if known is None:
+            solver = Solver()
+            solver.add(group)
+            result = timed_check(solver, "slice", group)
+            if cache is not None:
+                cache.record(solver, result)
+            # unknown is treated as feasible so no path is dropped
+            known = result != "unsat"
+        if len(self.results) >= self.capacity:
+            self.results.pop(next(iter(self.results)))
+        self.results[key] = (group, known)
+        if not known:
+            print("unsat")
+        return known
+
+    def summary(self) -> str:
+        queries = max(self.stats["queries"], 1)
+        return (f"Constraint slicing: {self.stats['queries']} queries, {self.stats['cached']} answered from group results, "
+                f"avg {self.stats['constraints'] / queries:.1f} -> {self.stats['sliced'] / queries:.1f} constraints per query")
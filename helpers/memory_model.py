@@ -0,0 +1,128 @@
+"""Unpacked arrays (register files, memories) as Z3 arrays. A memory is a single immutable value in
+the store. A write returns a new memory whose array is a Z3 Store over the old one, so store forks,
+snapshots and non-blocking updates keep working as they do for plain signals. A read is a Select on
+the current array. Neither adds a store entry per index or forks the path per index: two symbolic
+indices alias exactly when the solver lets them be equal."""
+
+import z3
+from z3 import Array, BitVecSort, Select, Store
+from pyverilog.vparser.ast import Node, Pointer, Identifier, Reg
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from engine.bmc import Encoder
+from helpers.bv_encoding import DEFAULT_WIDTH, eval_width_bound, lower_store_value, signal_width, resize, to_bv
+from helpers.utils import init_symbol
+
+
+class Memory:
+    """Contents of an unpacked array, and how many writes led to them."""
+    def __init__(self, name: str, array, writes: int = 0):
+        self.name = name
+        self.array = array
+        self.writes = writes
+
+    @staticmethod
+    def fresh(name: str, width: int, index_width: int):
+        """A memory whose every element is unconstrained."""
+        return Memory(name, Array(init_symbol(), BitVecSort(index_width), BitVecSort(width)))
+
+    @property
+    def width(self) -> int:
+        return self.array.range().size()
+
+    @property
+    def index_width(self) -> int:
+        return self.array.domain().size()
+
+    def address(self, index):
+        return z3.simplify(resize(to_bv(index), self.index_width))
+
+    def read(self, index):
+        index = self.address(index)
+        term = Select(self.array, index)
+        # with a constant index the store chain usually folds down to the value written last
+        return z3.simplify(term) if z3.is_bv_value(index) else term
+
+    def write(self, index, value):
+        index = self.address(index)
+        return Memory(self.name, Store(self.array, index, resize(to_bv(value), self.width)), self.writes + 1)
+
+    def __str__(self) -> str:
+        return f"{self.name}{{{self.writes} writes}}"
+
+    __repr__ = __str__
+
+
+def index_width(m: ExecutionManager, reg: Reg, module_name: str) -> int:
+    """Address bits of an unpacked reg from its first dimension, 32 when the bounds aren't constant."""
+    length = reg.dimensions.lengths[0]
+    msb = eval_width_bound(length.msb, m, module_name)
+    lsb = eval_width_bound(length.lsb, m, module_name)
+    if msb is None or lsb is None:
+        return DEFAULT_WIDTH
+    return max(1, max(msb, lsb).bit_length())
+
+
+def declare(m: ExecutionManager, s: SymbolicState, reg: Reg) -> bool:
+    """Put a fresh memory in the store for an unpacked reg; False for anything else."""
+    if not reg.dimensions:
+        return False
+    width = signal_width(m, reg.name)
+    s.store[m.curr_module][reg.name] = Memory.fresh(reg.name, width, index_width(m, reg, m.curr_module))
+    return True
+
+
+def memory_of(store, node):
+    """The memory an identifier names, None when it names a plain signal."""
+    if isinstance(node, Identifier):
+        value = store.get(node.name)
+        if isinstance(value, Memory):
+            return value
+    return None
+
+
+def mentions_memory(node, store) -> bool:
+    """Whether an expression reads an element of a memory."""
+    if isinstance(node, Pointer) and memory_of(store, node.var) is not None:
+        return True
+    if isinstance(node, Node):
+        return any(mentions_memory(child, store) for child in node.children())
+    return False
+
+
+class StoreFrame:
+    """The store of the current module seen as an Encoder frame: memories are their arrays and
+    other signals are lowered at their declared width."""
+    def __init__(self, m: ExecutionManager, s: SymbolicState):
+        self.m = m
+        self.store = s.store[m.curr_module]
+
+    def __contains__(self, name) -> bool:
+        return name in self.store
+
+    def __getitem__(self, name):
+        value = self.store[name]
+        if isinstance(value, Memory):
+            return value.array
+        return lower_store_value(self.m, value, signal_width(self.m, name))
+
+
+class StoreEncoder(Encoder):
+    """Encoder over the current store, for the expressions that touch a memory."""
+    def __init__(self, m: ExecutionManager):
+        self.m = m
+        self.module = m.curr_module
+        self.unsupported = set()
+        self.fresh = 0
+        self.hold = {}
+
+    def havoc(self, node, width: int = 1):
+        self.unsupported.add(type(node).__name__)
+        return z3.BitVec(init_symbol(), width)
+
+
+def read_symbol(m: ExecutionManager, term) -> str:
+    """A new store symbol standing for term; bv_symbol lowers it back to term."""
+    symbol = init_symbol()
+    m.memory_reads[symbol] = term
+    return symbol
@@ -0,0 +1,101 @@
+"""Counterexample cache in front of the solver, in the style of KLEE. Models of recent
+satisfiable path conditions are tried on new queries first: a model that satisfies every
+constraint proves the query SAT. Constraint sets known to be SAT or UNSAT answer their subsets
+and supersets respectively."""
+
+import z3
+from z3 import Solver, is_true
+from collections import deque
+import hashlib
+
+
+def constraint_body(c):
+    """The constraint behind an assert_and_track implication; its tracking literal is assumed true."""
+    if z3.is_implies(c) and z3.is_const(c.arg(0)) and c.arg(0).decl().kind() == z3.Z3_OP_UNINTERPRETED:
+        return c.arg(1)
+    return c
+
+
+class ModelCache:
+    """Recent models and constraint sets with known results, plus the persistent query cache if any."""
+    def __init__(self, capacity: int = 64, persistent=None):
+        self.capacity = capacity
+        self.persistent = persistent
+        self.models = deque(maxlen=capacity)
+        self.sat_sets = deque(maxlen=capacity)
+        self.unsat_sets = deque(maxlen=capacity)
+        self.stats = {"model": 0, "subset": 0, "superset": 0, "persistent": 0, "miss": 0}
+
+    def key(self, constraints) -> frozenset:
+        # z3 hash-conses expressions, so structurally equal constraints share an id
+        return frozenset(c.get_id() for c in constraints)
+
+    def digest(self, constraints) -> str:
+        """Text key of a constraint set for the persistent cache, stable across runs."""
+        text = "\n".join(sorted(c.sexpr() for c in constraints))
+        return "pc:" + hashlib.sha1(text.encode()).hexdigest()
+
+    def lookup(self, s: Solver):
+        """True/False when the cache knows whether the path condition is satisfiable, else None."""
+        return self.lookup_constraints([constraint_body(c) for c in s.assertions()])
+
+    def lookup_constraints(self, constraints):
+        """True/False when the cache knows whether the conjunction of constraints is satisfiable, else None."""
+        key = self.key(constraints)
+        if any(unsat <= key for unsat, _ in self.unsat_sets):
+            self.stats["superset"] += 1
+            return False
+        if any(key <= sat for sat, _ in self.sat_sets):
+            self.stats["subset"] += 1
+            return True
+        for model in self.models:
+            if all(is_true(model.eval(c, model_completion=True)) for c in constraints):
+                self.stats["model"] += 1
+                self.remember_sat(key, constraints, model)
+                return True
+        if self.persistent is not None:
+            cached = self.persistent.get(self.digest(constraints))
+            if cached is not None:
+                self.stats["persistent"] += 1
+                return cached.decode() == "sat"
+        self.stats["miss"] += 1
+        return None
+
+    def remember_sat(self, key, constraints, model) -> None:
+        if model is not None:
+            if model in self.models:
+                self.models.remove(model)
+            self.models.appendleft(model)
+        # the constraints are kept alive with their ids so z3 can't reuse the ids
+        self.sat_sets.appendleft((key, constraints))
+
+    def record(self, s: Solver, result: str) -> None:
+        """Keep the outcome of a solver call made after a miss."""
+        if result in ("sat", "unsat"):
+            # a sat answer from the solver portfolio leaves no model in s
+            model = None
+            if result == "sat":
+                try:
+                    model = s.model()
+                except z3.Z3Exception:
+                    pass
+            self.record_constraints([constraint_body(c) for c in s.assertions()], result, model)
+
+    def record_constraints(self, constraints, result: str, model=None) -> None:
+        """Keep the outcome of solving the conjunction of constraints."""
+        if result not in ("sat", "unsat"):
+            return
+        key = self.key(constraints)
+        if result == "sat":
+            self.remember_sat(key, constraints, model)
+        else:
+            self.unsat_sets.appendleft((key, constraints))
+        if self.persistent is not None:
+            try:
+                self.persistent.set(self.digest(constraints), result)
+            except Exception as e:
+                print(f"Query cache write failed: {e}")
+
+    def summary(self) -> str:
+        hits = sum(self.stats.values()) - self.stats["miss"]
+        return f"Model cache answered {hits} of {hits + self.stats['miss']} solver queries {self.stats}"
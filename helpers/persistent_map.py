@@ -0,0 +1,306 @@
+"""Persistent (immutable, structurally shared) maps for the symbolic store. PersistentMap is a hash
+array mapped trie: an update copies only the nodes on the path to the changed key, so every older
+version stays valid and shares everything else. SymbolicStore wraps one of module name ->
+PersistentMap of signal -> value behind the usual store[module][signal] interface; forking it is
+O(1), and snapshots can't be changed by the store they were taken from.
+Values are shared between forks as they are, so a dict value (a concatenation) must not be
+modified in place once the store holding it has been forked."""
+
+from collections.abc import Mapping, MutableMapping
+
+BITS = 5
+MASK = (1 << BITS) - 1
+HASH_MASK = (1 << 64) - 1
+
+
+def key_hash(key) -> int:
+    return hash(key) & HASH_MASK
+
+
+class Leaf:
+    __slots__ = ("hash", "key", "value")
+
+    def __init__(self, h: int, key, value):
+        self.hash = h
+        self.key = key
+        self.value = value
+
+
+class Collision:
+    """Keys with the same 64-bit hash."""
+    __slots__ = ("hash", "pairs")
+
+    def __init__(self, h: int, pairs: tuple):
+        self.hash = h
+        self.pairs = pairs
+
+
+class Node:
+    """Trie node; bit i of bitmap is set when the child for hash chunk i exists."""
+    __slots__ = ("bitmap", "children")
+
+    def __init__(self, bitmap: int, children: tuple):
+        self.bitmap = bitmap
+        self.children = children
+
+
+EMPTY_NODE = Node(0, ())
+
+
+def merge(a, b, shift: int) -> Node:
+    """A node holding two entries with different hashes."""
+    ia = (a.hash >> shift) & MASK
+    ib = (b.hash >> shift) & MASK
+    if ia == ib:
+        return Node(1 << ia, (merge(a, b, shift + BITS),))
+    if ia < ib:
+        return Node((1 << ia) | (1 << ib), (a, b))
+    return Node((1 << ia) | (1 << ib), (b, a))
+
+
+def assoc(node: Node, shift: int, h: int, key, value):
+    """(new node, whether a key was added)."""
+    bit = 1 << ((h >> shift) & MASK)
+    idx = bin(node.bitmap & (bit - 1)).count("1")
+    children = node.children
+    if not node.bitmap & bit:
+        return Node(node.bitmap | bit, children[:idx] + (Leaf(h, key, value),) + children[idx:]), True
+    child = children[idx]
+    added = False
+    if isinstance(child, Leaf):
+        if child.hash == h and child.key == key:
+            if child.value is value:
+                return node, False
+            new = Leaf(h, key, value)
+        elif child.hash == h:
+            new = Collision(h, ((child.key, child.value), (key, value)))
+            added = True
+        else:
+            new = merge(child, Leaf(h, key, value), shift + BITS)
+            added = True
+    elif isinstance(child, Collision):
+        if child.hash == h:
+            pairs = tuple(pair for pair in child.pairs if pair[0] != key)
+            added = len(pairs) == len(child.pairs)
+            new = Collision(h, pairs + ((key, value),))
+        else:
+            new = merge(child, Leaf(h, key, value), shift + BITS)
+            added = True
+    else:
+        new, added = assoc(child, shift + BITS, h, key, value)
+        if new is child:
+            return node, False
+    return Node(node.bitmap, children[:idx] + (new,) + children[idx + 1:]), added
+
+
+def dissoc(node: Node, shift: int, h: int, key):
+    """New node without key, node itself when key isn't there, None when the node becomes empty."""
+    bit = 1 << ((h >> shift) & MASK)
+    if not node.bitmap & bit:
+        return node
+    idx = bin(node.bitmap & (bit - 1)).count("1")
+    child = node.children[idx]
+    if isinstance(child, Leaf):
+        if child.hash != h or child.key != key:
+            return node
+        new = None
+    elif isinstance(child, Collision):
+        if child.hash != h:
+            return node
+        pairs = tuple(pair for pair in child.pairs if pair[0] != key)
+        if len(pairs) == len(child.pairs):
+            return node
+        new = Leaf(h, *pairs[0]) if len(pairs) == 1 else Collision(h, pairs)
+    else:
+        new = dissoc(child, shift + BITS, h, key)
+        if new is child:
+            return node
+    if new is None:
+        if node.bitmap == bit:
+            return None
+        return Node(node.bitmap & ~bit, node.children[:idx] + node.children[idx + 1:])
+    return Node(node.bitmap, node.children[:idx] + (new,) + node.children[idx + 1:])
+
+
+def entries(node: Node):
+    for child in node.children:
+        if isinstance(child, Leaf):
+            yield child.key, child.value
+        elif isinstance(child, Collision):
+            yield from child.pairs
+        else:
+            yield from entries(child)
+
+
+MISSING = object()
+
+
+class PersistentMap(Mapping):
+    """Immutable map; set and delete return a new map sharing structure with this one."""
+    __slots__ = ("root", "count")
+
+    def __init__(self, root: Node = EMPTY_NODE, count: int = 0):
+        self.root = root
+        self.count = count
+
+    @classmethod
+    def from_mapping(cls, mapping) -> "PersistentMap":
+        if isinstance(mapping, PersistentMap):
+            return mapping
+        result = cls()
+        for key, value in mapping.items():
+            result = result.set(key, value)
+        return result
+
+    def get(self, key, default=None):
+        h = key_hash(key)
+        node = self.root
+        shift = 0
+        while True:
+            bit = 1 << ((h >> shift) & MASK)
+            if not node.bitmap & bit:
+                return default
+            child = node.children[bin(node.bitmap & (bit - 1)).count("1")]
+            if isinstance(child, Leaf):
+                return child.value if child.hash == h and child.key == key else default
+            if isinstance(child, Collision):
+                for k, v in child.pairs:
+                    if k == key:
+                        return v
+                return default
+            node = child
+            shift += BITS
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+    def set(self, key, value) -> "PersistentMap":
+        root, added = assoc(self.root, 0, key_hash(key), key, value)
+        if root is self.root:
+            return self
+        return PersistentMap(root, self.count + added)
+
+    def delete(self, key) -> "PersistentMap":
+        root = dissoc(self.root, 0, key_hash(key), key)
+        if root is self.root:
+            return self
+        return PersistentMap(root if root is not None else EMPTY_NODE, self.count - 1)
+
+    def __iter__(self):
+        for key, _ in entries(self.root):
+            yield key
+
+    def items(self):
+        return list(entries(self.root))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return repr(dict(entries(self.root)))
+
+
+class ModuleStore(MutableMapping):
+    """The signals of one module in a SymbolicStore; writes update the store that handed it out."""
+    __slots__ = ("store", "module")
+
+    def __init__(self, store: "SymbolicStore", module):
+        self.store = store
+        self.module = module
+
+    def signals(self) -> PersistentMap:
+        return self.store.root.get(self.module, EMPTY_MAP)
+
+    def get(self, key, default=None):
+        return self.signals().get(key, default)
+
+    def __getitem__(self, key):
+        return self.signals()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.signals()
+
+    def __setitem__(self, key, value) -> None:
+        store = self.store
+        store.root = store.root.set(self.module, self.signals().set(key, value))
+
+    def __delitem__(self, key) -> None:
+        signals = self.signals()
+        if key not in signals:
+            raise KeyError(key)
+        self.store.root = self.store.root.set(self.module, signals.delete(key))
+
+    def __iter__(self):
+        # iterates the version current when iteration started, so writes during it are safe
+        return iter(self.signals())
+
+    def __len__(self) -> int:
+        return len(self.signals())
+
+    def __repr__(self) -> str:
+        return repr(self.signals())
+
+
+class SymbolicStore(MutableMapping):
+    """module -> signal -> symbolic value, with O(1) fork and snapshot."""
+
+    def __init__(self, root: PersistentMap = None):
+        self.root = root if root is not None else EMPTY_MAP
+
+    def __getitem__(self, module) -> ModuleStore:
+        if module not in self.root:
+            raise KeyError(module)
+        return ModuleStore(self, module)
+
+    def __contains__(self, module) -> bool:
+        return module in self.root
+
+    def __setitem__(self, module, signals) -> None:
+        if isinstance(signals, ModuleStore):
+            signals = signals.signals()
+        self.root = self.root.set(module, PersistentMap.from_mapping(signals))
+
+    def __delitem__(self, module) -> None:
+        if module not in self.root:
+            raise KeyError(module)
+        self.root = self.root.delete(module)
+
+    def __iter__(self):
+        return iter(self.root)
+
+    def __len__(self) -> int:
+        return len(self.root)
+
+    def setdefault(self, module, default=None) -> ModuleStore:
+        if module not in self.root:
+            self[module] = default if default is not None else {}
+        return ModuleStore(self, module)
+
+    def fork(self) -> "SymbolicStore":
+        """An independent store starting from the current contents."""
+        return SymbolicStore(self.root)
+
+    def snapshot(self) -> PersistentMap:
+        """The current contents, immutable."""
+        return self.root
+
+    def restore(self, snapshot: PersistentMap) -> None:
+        self.root = snapshot
+
+    def __copy__(self) -> "SymbolicStore":
+        return self.fork()
+
+    def __deepcopy__(self, memo) -> "SymbolicStore":
+        return self.fork()
+
+    def __repr__(self) -> str:
+        return repr({module: dict(signals.items()) for module, signals in self.root.items()})
+
+
+EMPTY_MAP = PersistentMap()
@@ -0,0 +1,71 @@
+"""Recording of the solver queries issued during exploration. Each query is written as one JSON
+line holding its SMT-LIB2 text and where it came from, so query_replay.py can re-run the corpus
+under other solver settings without repeating the exploration."""
+
+import z3
+from z3 import Solver
+import gzip
+import json
+import threading
+import time
+from helpers.model_cache import constraint_body
+from engine.solver_portfolio import SolverPortfolio
+
+
+class QueryLog:
+    """JSON lines log of solver queries, gzip compressed when the path ends in .gz."""
+    # the log queries are written to, set by main when recording
+    active = None
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = gzip.open(path, "wt") if path.endswith(".gz") else open(path, "w")
+        self.count = 0
+        # module, cycle and branch of the query being issued
+        self.context = {}
+        # --branch_threads solves sibling queries in worker threads
+        self.lock = threading.Lock()
+
+    def note_branch(self, m, label: str) -> None:
+        """Remember which branch the next queries belong to."""
+        self.context = {"module": m.curr_module, "cycle": m.cycle, "branch": label}
+
+    def record(self, source: str, constraints, result: str, elapsed: float) -> None:
+        # constraints solved in a worker thread live in that thread's own context
+        solver = Solver(ctx=constraints[0].ctx) if len(constraints) > 0 else Solver()
+        solver.add(constraints)
+        smt2 = solver.to_smt2()
+        with self.lock:
+            entry = {"id": self.count, "source": source, "result": result, "time": round(elapsed, 6),
+                     "size": len(constraints), "smt2": smt2}
+            entry.update(self.context)
+            self.file.write(json.dumps(entry) + "\n")
+            self.count += 1
+
+    def close(self) -> None:
+        self.file.close()
+        print(f"Recorded {self.count} solver queries to {self.path}")
+
+
+def check(s: Solver, source: str, constraints=None, model: bool = False) -> str:
+    # the portfolio may answer from another process, so it's only used when no model is needed, and
+    # only from the main thread, which owns the connections to its workers
+    if SolverPortfolio.active is not None and not model and threading.current_thread() is threading.main_thread():
+        return SolverPortfolio.active.check(s, source, constraints)
+    return str(s.check())
+
+
+def timed_check(s: Solver, source: str, constraints=None, model: bool = False) -> str:
+    """s.check(), recorded in the active query log if there is one. constraints overrides what is
+    logged, e.g. when s only holds a slice of the path condition. Callers that read s.model()
+    afterwards pass model=True."""
+    if QueryLog.active is None:
+        return check(s, source, constraints, model)
+    start = time.perf_counter()
+    result = check(s, source, constraints, model)
+    elapsed = time.perf_counter() - start
+    if constraints is None:
+        # tracking literals are assumed true by check(), so log the tracked constraints themselves
+        constraints = [constraint_body(c) for c in s.assertions()]
+    QueryLog.active.record(source, constraints, result, elapsed)
+    return result
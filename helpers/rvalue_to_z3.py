@@ -8,6 +8,10 @@ from pyverilog.vparser.ast import WhileStatement, ForStatement, CaseStatement, B
 from pyverilog.vparser.ast import Value, Reg, Initial, Eq, Identifier, Initial,  NonblockingSubstitution, Decl, Always, Assign, NotEql, Case
 from pyverilog.vparser.ast import Concat, BlockingSubstitution, Parameter, StringConst, Wire, PortArg
 from helpers.rvalue_parser import parse_tokens, tokenize
+from helpers.bv_encoding import DEFAULT_WIDTH, parse_int_literal, literal_width, bv_const, bv_symbol, resize, align, align_arith
+from helpers.bv_encoding import to_bool, to_bv, lower_signal, lower_store_value, signal_width
+from helpers.utils import init_symbol
+from helpers.query_log import QueryLog, timed_check
 from engine.execution_manager import ExecutionManager
 from engine.symbolic_state import SymbolicState
 import pyslang as ps
@@ -25,16 +29,14 @@ op_map = {"Plus": "+", "Minus": "-", "Power": "**", "Times": "*", "Divide": "/",
 "And": "&", "Xor": "^", "Xnor": "<->", "Land": "&&", "Lor": "||"}
 
 class Z3Visitor():
-    def __init__(self, prefix):
-        """Constructor that sets the prefix for variable names."""
+    def __init__(self, prefix, widths=None):
+        """Constructor that sets the prefix for variable names and the declared signal widths."""
         self.prefix = prefix
-        print("prefix", prefix)
+        self.widths = widths if widths is not None else {}
         #self.visited_nodes = set() 
 
     def visit(self, node):
         """A visitor that processes the node to generate Z3 expressions."""
-        print(f"Visiting node: {node}") 
-        print(f"Visiting node Type: {type(node)}")  
         if isinstance(node, ps.Token):
             result = self.handle_token(node)
         elif isinstance(node, ps.IdentifierNameSyntax):
@@ -47,7 +49,6 @@ class Z3Visitor():
             result = self.handle_binary_expression(node)
         elif isinstance(node, ps.ParenthesizedExpressionSyntax):
             result = self.handle_parenthesized_expression(node)
-            print("result", type(result))
         elif isinstance(node, ps.LiteralExpressionSyntax):
             result = self.handle_literal_expression(node)
         elif isinstance(node, ps.BitSelectSyntax):
@@ -61,104 +62,82 @@ class Z3Visitor():
         else:
             print(f"Unhandled syntax: {type(node)}")
             return None
-        print(result)
         if isinstance(result, ps.VisitAction):
-            print(f"Encountered VisitAction: {result}")
             return None  
         return result
 
     def handle_integer_vector_expression(self, node):
         """Handle integer vector expressions."""
-        print(f"Handling IntegerVectorExpression: {node}")
-        
-        print("Attributes of the node:", dir(node))
-
-        if hasattr(node, 'value'):
-            value = node.value  
-            print(f"Value of the IntegerVectorExpression: {value}")
-            return BitVecVal(int(str(value)), 32)  #
-
-        elif hasattr(node, 'size'):
-            size = node.size 
-            print(f"Size of the IntegerVectorExpression: {size}")
-            return BitVecVal(int(str(size)), 32)  
+        value, width = parse_int_literal(str(node))
+        if value is not None:
+            return bv_const(value, width if width is not None else literal_width(value))
         return None   
 
     def handle_identifier(self, node):
         """Handle identifiers."""
-        print(f"Handling identifier: {str(node.identifier)}")
-        variable = str(node.identifier)
-        return BitVec(variable, 32)
+        variable = str(node.identifier).strip()
+        return BitVec(variable, self.widths.get(variable, DEFAULT_WIDTH))
     
     def handle_identifier_select_name(self, node):
         """Handle indexed or array accesses like 'match[i]'."""
-        print(f"Handling identifier select: {str(node.identifier)}[{node.selectors}]")
         
         # Extract the identifier ('match' or 'conf_i')
         identifier = str(node.identifier)
         
         # Get the index, assuming it's the first selector for example  'match[i]', i will be the selector)
         index_expr = self.visit(node.selectors[0])  
-        print("index_expr",type(index_expr))
         index_val = int(str(index_expr))  
         variable = f"{identifier}[{index_val}]" 
-        print("Fully Verified Variable:", variable)
-        return BitVec(variable, 32)
+        return BitVec(variable, self.widths.get(variable, 1))
  
     def handle_scoped_name(self, node):
             """Handle scoped names, including indexed names like conf_i[i].locked."""
-            print(f"Handling scoped name: {node}")
             
             if str(node.separator) == "::":
                 # Scoped names like riscv::PRIV_LVL_M
                 scoped_name = str(node)
-                return BitVec(scoped_name, 32)
+                return BitVec(scoped_name, self.widths.get(scoped_name, DEFAULT_WIDTH))
             
             elif str(node.separator) == ".":
                 # Field access like conf_i[i].locked
                 # First, handle the base (conf_i[i])
                 base = self.visit(node.left)  # Conf_i[i]
-                print("base",base)
                 # Then handle the field (locked)
                 field = str(node.right)  # Field access (locked)
                 variable= str(f"{base}[{field}]")
-                return BitVec(variable, 32)
+                return BitVec(variable, self.widths.get(variable, DEFAULT_WIDTH))
 
     def handle_element_select(self, node):
         """Handle element selection like structs and arrays."""
-        print(f"Handling element select: {node}")
         element = self.visit(node.selector)  
         return element
     
 
     def handle_bit_select(self, node):
         """Handle bit select expressions like 'match[i]'."""
-        print(f"Handling bit select expression: {node}")
-
-       
-        return BitVec(f"{node}", 32)
+        return BitVec(f"{node}", 1)
 
     def handle_literal_expression(self, node):
         """Handle literal expressions."""
-        print(f"Handling literal expression: {node}")
-        literal_value = node  
-        if literal_value == 0:
-            return BitVecVal(0, 32)  
-        return BitVecVal(int(str(literal_value)), 32)  
+        value, width = parse_int_literal(str(node))
+        if value is None:
+            return BitVecVal(0, 1)
+        return bv_const(value, width if width is not None else literal_width(value))
 
     def convert_bitvec_to_bool(self, bitvec_expr):
         """Converts a BitVec expression to a Boolean (True if non-zero, False if zero)."""
-        return UGT(bitvec_expr, BitVecVal(0, 32))
+        return to_bool(bitvec_expr)
 
     def handle_prefix_unary_expression(self, node):
         """Handle prefix unary expressions (like NOT)."""
-        print(f"Handling prefix unary expression: {node}")
         operator = str(node.operatorToken).strip()
         operand = self.visit(node.operand)
         if operator == "!":
-            return Not(operand)
+            return Not(to_bool(operand))
+        elif operator == "~":
+            return ~to_bv(operand)
         elif operator == "-":
-            return -operand
+            return -to_bv(operand)
         else:
             print(f"Unsupported unary operator: {operator}")
             raise ValueError(f"Unsupported unary operator: {operator}")
@@ -166,25 +145,18 @@ class Z3Visitor():
 
     def handle_binary_expression(self, node):
         """Handle binary expressions (AND, OR, equality, etc.)."""
-        print(f"Handling binary expression: {node.operatorToken}")
         left_expr = self.visit(node.left)
-        print("done")
         right_expr = self.visit(node.right)
-        print("done2")
         operator = str(node.operatorToken).strip()
 
         # issue
-        print((left_expr))
-        print(node.left)
-        if str(left_expr.sort()) == "Bool" and str(right_expr.sort()) != "Bool":
-            right_expr = UGT(right_expr, BitVecVal(0, 32)) 
-            print(f"Converted Right Expression to Bool: {right_expr}")
-
-        print(operator)
-        print(node.left)
-        print(node.right)
-        print(left_expr.sort())
-        print(right_expr.sort())
+        if operator in ("&&", "||"):
+            left_expr, right_expr = to_bool(left_expr), to_bool(right_expr)
+        elif operator in ("+", "-", "*", "<<"):
+            left_expr, right_expr = align_arith(left_expr, right_expr)
+        else:
+            left_expr, right_expr = align(left_expr, right_expr)
+
         if operator == "==":
             return left_expr == right_expr
         elif operator == "!=":
@@ -197,8 +169,26 @@ class Z3Visitor():
             return UGT(left_expr, right_expr) 
         elif operator == "<":
             return ULT(left_expr, right_expr) 
-        elif isinstance(left_expr, BitVecRef) and isinstance(right_expr, BitVecRef):
-            return UGT(left_expr, BitVecVal(0, 32)) == right_expr
+        elif operator == ">=":
+            return z3.UGE(left_expr, right_expr)
+        elif operator == "<=":
+            return z3.ULE(left_expr, right_expr)
+        elif operator == "&":
+            return left_expr & right_expr
+        elif operator == "|":
+            return left_expr | right_expr
+        elif operator == "^":
+            return left_expr ^ right_expr
+        elif operator == "+":
+            return left_expr + right_expr
+        elif operator == "-":
+            return left_expr - right_expr
+        elif operator == "*":
+            return left_expr * right_expr
+        elif operator == "<<":
+            return left_expr << right_expr
+        elif operator == ">>":
+            return z3.LShR(left_expr, right_expr)
         
         else:
             print(f"Unsupported binary operator: {operator}")
@@ -207,23 +197,133 @@ class Z3Visitor():
 
     def handle_parenthesized_expression(self, node):
         """Handle parenthesized expressions."""
-        print("Handling parenthesized expression.")
         return (self.visit(node.expression))
     
     def get_full_variable_name(self,variable):
         """Generate the full variable name by appending the variable to the prefix."""
         return f"{self.prefix}.{variable}"
     
-def pyslang_to_z3(expr, prefix=""):
+def pyslang_to_z3(expr, prefix="", widths=None):
     """Parse the expression and convert it into a Z3 expression."""
-    print(f"Parsing expression: {expr}")
     syntax_tree = ps.SyntaxTree.fromText(expr)
     root = syntax_tree.root
-    visitor = Z3Visitor(prefix)
-    z3_expression = visitor.visit(root)    
+    visitor = Z3Visitor(prefix, widths)
+    z3_expression = visitor.visit(root)
     return z3_expression
 
 
+SLANG_BINARY_OPS = {
+    "Add": lambda a, b: a + b, "Subtract": lambda a, b: a - b, "Multiply": lambda a, b: a * b,
+    "Divide": z3.UDiv, "Mod": z3.URem, "BinaryAnd": lambda a, b: a & b, "BinaryOr": lambda a, b: a | b,
+    "BinaryXor": lambda a, b: a ^ b, "BinaryXnor": lambda a, b: ~(a ^ b),
+    "LogicalShiftLeft": lambda a, b: a << b, "ArithmeticShiftLeft": lambda a, b: a << b,
+    "LogicalShiftRight": z3.LShR, "ArithmeticShiftRight": lambda a, b: a >> b}
+
+SLANG_COMPARE_OPS = {
+    "Equality": lambda a, b: a == b, "Inequality": lambda a, b: a != b,
+    "CaseEquality": lambda a, b: a == b, "CaseInequality": lambda a, b: a != b,
+    "WildcardEquality": lambda a, b: a == b, "WildcardInequality": lambda a, b: a != b,
+    "GreaterThan": UGT, "GreaterThanEqual": z3.UGE, "LessThan": ULT, "LessThanEqual": z3.ULE}
+
+def slang_expr_to_z3(expr, s: SymbolicState, m: ExecutionManager, lookup=None, offset: int = 0):
+    """Lower a bound pyslang expression to Z3, sized by the expression's elaborated type.
+    lookup(name, offset) overrides where signal values come from, offset counting cycles back for $past."""
+    kind = expr.kind
+    width = expr.type.bitWidth if expr.type.bitWidth > 0 else DEFAULT_WIDTH
+    lower = lambda e: slang_expr_to_z3(e, s, m, lookup, offset)
+    if kind == ps.ExpressionKind.NamedValue:
+        name = expr.symbol.name
+        if not lookup is None:
+            return lower_store_value(m, lookup(name, offset), width)
+        if offset > 0:
+            # no history available here, the past value is unconstrained
+            return bv_symbol(m, init_symbol(), width)
+        if not name in s.store[m.curr_module]:
+            s.store[m.curr_module][name] = init_symbol()
+        return lower_store_value(m, s.store[m.curr_module][name], width)
+    elif kind == ps.ExpressionKind.Call and expr.subroutineName == "$past" and len(expr.arguments) > 0:
+        ticks = 1
+        if len(expr.arguments) > 1 and not expr.arguments[1].constant is None:
+            ticks = int(expr.arguments[1].constant.value)
+        return resize(to_bv(slang_expr_to_z3(expr.arguments[0], s, m, lookup, offset + ticks)), width)
+    elif kind == ps.ExpressionKind.IntegerLiteral:
+        value = expr.value
+        if value.hasUnknown:
+            return bv_symbol(m, init_symbol(), width)
+        return bv_const(int(value), width)
+    elif kind == ps.ExpressionKind.UnbasedUnsizedIntegerLiteral:
+        value, _ = parse_int_literal(str(expr.syntax).strip().replace("'", "1'b"))
+        return bv_const(-1 if value == 1 else 0, width) if value is not None else bv_symbol(m, init_symbol(), width)
+    elif kind == ps.ExpressionKind.Conversion:
+        return resize(to_bv(lower(expr.operand)), width)
+    elif kind == ps.ExpressionKind.BinaryOp:
+        op = expr.op.name
+        lhs = lower(expr.left)
+        rhs = lower(expr.right)
+        if op == "LogicalAnd":
+            return And(to_bool(lhs), to_bool(rhs))
+        elif op == "LogicalOr":
+            return Or(to_bool(lhs), to_bool(rhs))
+        elif op == "LogicalImplication":
+            return z3.Implies(to_bool(lhs), to_bool(rhs))
+        elif op == "LogicalEquivalence":
+            return to_bool(lhs) == to_bool(rhs)
+        elif op in SLANG_COMPARE_OPS:
+            lhs, rhs = align(lhs, rhs)
+            return SLANG_COMPARE_OPS[op](lhs, rhs)
+        elif op in SLANG_BINARY_OPS:
+            return SLANG_BINARY_OPS[op](resize(to_bv(lhs), width), resize(to_bv(rhs), width))
+    elif kind == ps.ExpressionKind.UnaryOp:
+        op = expr.op.name
+        operand = lower(expr.operand)
+        if op == "LogicalNot":
+            return Not(to_bool(operand))
+        operand = to_bv(operand)
+        if op == "BitwiseNot":
+            return ~resize(operand, width)
+        elif op == "Minus":
+            return -resize(operand, width)
+        elif op == "Plus":
+            return resize(operand, width)
+        elif op in ("BitwiseOr", "BitwiseNor"):
+            reduced = to_bv(operand != 0)
+            return reduced if op == "BitwiseOr" else ~reduced
+        elif op in ("BitwiseAnd", "BitwiseNand"):
+            reduced = to_bv(operand == BitVecVal(-1, operand.size()))
+            return reduced if op == "BitwiseAnd" else ~reduced
+        elif op in ("BitwiseXor", "BitwiseXnor"):
+            bits = [z3.Extract(i, i, operand) for i in range(operand.size())]
+            reduced = bits[0]
+            for bit in bits[1:]:
+                reduced = reduced ^ bit
+            return reduced if op == "BitwiseXor" else ~reduced
+    elif kind == ps.ExpressionKind.ConditionalOp:
+        cond = to_bool(lower(expr.conditions[0].expr))
+        lhs = resize(to_bv(lower(expr.left)), width)
+        rhs = resize(to_bv(lower(expr.right)), width)
+        return If(cond, lhs, rhs)
+    elif kind == ps.ExpressionKind.ElementSelect:
+        value = to_bv(lower(expr.value))
+        if expr.selector.constant is not None:
+            index = int(expr.selector.constant.value)
+            if width == 1 and index < value.size():
+                return z3.Extract(index, index, value)
+        selector = resize(to_bv(lower(expr.selector)), value.size())
+        return resize(z3.LShR(value, selector), width)
+    elif kind == ps.ExpressionKind.RangeSelect:
+        value = to_bv(lower(expr.value))
+        if expr.left.constant is not None and expr.right.constant is not None:
+            msb, lsb = int(expr.left.constant.value), int(expr.right.constant.value)
+            hi, lo = max(msb, lsb), min(msb, lsb)
+            if hi < value.size():
+                return z3.Extract(hi, lo, value)
+    elif kind == ps.ExpressionKind.Concatenation:
+        parts = [to_bv(lower(op)) for op in expr.operands]
+        return z3.Concat(parts) if len(parts) > 1 else parts[0]
+    # anything we can't model precisely becomes a fresh symbol of the right width
+    return bv_symbol(m, init_symbol(), width)
+
+
 def get_constants_list(new_constraint, s: SymbolicState, m: ExecutionManager):
     """Get list of constants that need to be added to z3 context from pyverilog tokens."""
     res = []
@@ -277,36 +377,27 @@ def parse_expr_to_Z3(e: Value, s: SymbolicState, m: ExecutionManager):
         rhs = parse_expr_to_Z3(e.right, s, m)
         return s.pc.add(lhs.assertions() and rhs.assertions())
     elif isinstance(e, Partselect):
-        part_sel_expr = f"{e.var.name}[{e.msb}:{e.lsb}]"
         module_name = m.curr_module
-        is_reg = e.var.name in m.reg_decls
         if not e.var.scope is None:
-            module_name = e.scope.labellist[0].name
-        if s.store[module_name][e.var.name].isdigit():
-            int_val = IntVal(int(s.store[module_name][e.name]))
-            return Int2BV(int_val, 32)
-        else:
-            if not part_sel_expr in s.store[m.curr_module] and "[" in part_sel_expr:
-                parts = part_sel_expr.partition("[")
-                first_part = parts[0]
-                s.store[m.curr_module][part_sel_expr] = s.store[m.curr_module][first_part]
-            return BitVec(s.store[module_name][part_sel_expr], 32)
+            module_name = e.var.scope.labellist[0].name
+        base = lower_signal(m, s.store, e.var.name, module_name)
+        msb, _ = parse_int_literal(e.msb.value) if isinstance(e.msb, IntConst) else (None, None)
+        lsb, _ = parse_int_literal(e.lsb.value) if isinstance(e.lsb, IntConst) else (None, None)
+        if msb is None or lsb is None or max(msb, lsb) >= base.size():
+            return base
+        return z3.Extract(max(msb, lsb), min(msb, lsb), base)
     elif isinstance(e, Identifier):
         module_name = m.curr_module
-        is_reg = e.name in m.reg_decls
         if not e.scope is None:
             module_name = e.scope.labellist[0].name
-        if s.store[module_name][e.name].isdigit():
-            int_val = IntVal(int(s.store[module_name][e.name]))
-            return Int2BV(int_val, 32)
-        else:
-            return BitVec(s.store[module_name][e.name], 32)
+        return lower_signal(m, s.store, e.name, module_name)
     elif isinstance(e, Constant):
-        int_val = IntVal(e.value)
-        return Int2BV(int_val, 32)
+        value, width = parse_int_literal(e.value)
+        if value is None:
+            value = 0
+        return bv_const(value, width if width is not None else literal_width(value))
     elif isinstance(e, Eq):
-        lhs = parse_expr_to_Z3(e.left, s, m)
-        rhs = parse_expr_to_Z3(e.right, s, m)
+        lhs, rhs = align(parse_expr_to_Z3(e.left, s, m), parse_expr_to_Z3(e.right, s, m))
         if m.branch:
             s.pc.add(lhs == rhs)
         else:
@@ -315,17 +406,19 @@ def parse_expr_to_Z3(e: Value, s: SymbolicState, m: ExecutionManager):
     elif isinstance(e, NotEql):
         lhs = parse_expr_to_Z3(e.left, s, m)
         rhs = parse_expr_to_Z3(e.right, s, m)
+        if isinstance(lhs, z3.z3.BitVecRef) and isinstance(rhs, z3.z3.BitVecRef):
+            lhs, rhs = align(lhs, rhs)
         if m.branch:          
             # only RHS is BitVec (Lhs is a more complex expr)
             if isinstance(rhs, z3.z3.BitVecRef) and not isinstance(lhs, z3.z3.BitVecRef):
-                c = If(lhs, BitVecVal(1, 32), BitVecVal(0, 32))
+                c = to_bv(lhs, rhs.size())
                 s.pc.add(c != rhs)
             else:
                 s.pc.add(lhs != rhs)
         else:
             # only RHS is bitVEC 
             if isinstance(rhs, z3.z3.BitVecRef) and not isinstance(lhs, z3.z3.BitVecRef):
-                c = If(lhs, BitVecVal(1, 32), BitVecVal(0, 32))
+                c = to_bv(lhs, rhs.size())
                 #print("a")
                 s.pc.add(c == rhs)
             else:
@@ -360,11 +453,20 @@ def parse_expr_to_Z3(e: Value, s: SymbolicState, m: ExecutionManager):
             #return s.pc.add(lhs.pc.assertions() and rhs.pc.assertions())
     return s
 
-def solve_pc(s: Solver) -> bool:
-    """Solve path condition."""
-    result = str(s.check())
+def solve_pc(s: Solver, cache=None) -> bool:
+    """Solve path condition. A ModelCache, when given, answers first."""
+    if cache is not None:
+        known = cache.lookup(s)
+        if known is not None:
+            return known
+    result = timed_check(s, "solve_pc")
+    if cache is not None:
+        cache.record(s, result)
     if str(result) == "sat":
-        model = s.model()
+        return True
+    elif str(result) == "unknown":
+        # undecided within the solver timeouts; keep the path rather than drop a feasible one
+        print("unknown")
         return True
     else:
         print("unsat")
@@ -372,6 +474,64 @@ def solve_pc(s: Solver) -> bool:
         print(s.unsat_core())
         return False
 
+def branch_feasible(m: ExecutionManager, s: SymbolicState, constraint, label: str, track: bool = True) -> bool:
+    """Push a branch constraint onto the path condition if the branch can be taken.
+    The abstract domain answers first, then the directions the simulation pre-pass took, and the
+    solver is only asked when neither can decide. A constraint the domain proves true adds nothing,
+    so the pc stays as satisfiable as before; a direction taken by simulation was reachable on some
+    path but maybe not this one, so any violation is still confirmed by a solver call before it is
+    reported."""
+    stats = m.domain_stats.setdefault(label, [0, 0, 0, 0])
+    if QueryLog.active is not None:
+        QueryLog.active.note_branch(m, label)
+    verdict = s.domain.truth(constraint)
+    s.pc.push()
+    s.domain.push()
+    if track:
+        s.assertion_counter += 1
+        s.pc.assert_and_track(constraint, f"p{s.assertion_counter}")
+    else:
+        s.pc.add(constraint)
+    if verdict is True:
+        stats[0] += 1
+        feasible = True
+    elif verdict is False:
+        stats[1] += 1
+        feasible = False
+    elif simulated(m):
+        stats[3] += 1
+        feasible = True
+    else:
+        stats[2] += 1
+        if m.branch_table is not None:
+            feasible = m.branch_table.feasible(m, s, constraint, solve_branch)
+        else:
+            feasible = solve_branch(m, s, constraint)
+    if not feasible:
+        pop_branch(s)
+        return False
+    s.domain.refine(constraint)
+    return True
+
+
+def simulated(m: ExecutionManager) -> bool:
+    """Whether the simulation pre-pass took the branch direction being decided in this cycle."""
+    return m.curr_branch is not None and (m.curr_module, *m.curr_branch, m.cycle) in m.sim_covered
+
+
+def solve_branch(m: ExecutionManager, s: SymbolicState, constraint) -> bool:
+    """Ask the solver whether the path condition, which ends with constraint, is satisfiable."""
+    if m.slicer is not None:
+        return m.slicer.feasible(s.pc, constraint, m.model_cache)
+    return solve_pc(s.pc, m.model_cache)
+
+
+def pop_branch(s: SymbolicState) -> None:
+    """Undo branch_feasible: drop the constraint and what the domain learned from it."""
+    s.pc.pop()
+    s.domain.pop()
+
+
 def evaluate_expr(parsedList, s: SymbolicState, m: ExecutionManager):
     for i in parsedList:
 	    res = eval_expr(i, s, m)
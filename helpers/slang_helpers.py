@@ -1,8 +1,14 @@
 """A library of helper functions for working with the PySlang AST."""
 import pyslang as ps
+from collections.abc import Mapping
 from helpers.utils import init_symbol
 from engine.execution_manager import ExecutionManager
 from engine.symbolic_state import SymbolicState
+from helpers.rvalue_to_z3 import slang_expr_to_z3, solve_pc, branch_feasible, pop_branch
+from helpers.bv_encoding import to_bool
+from engine.case_encoding import Arm, arms_of, arm_guards
+from engine.scheduler import written
+import z3
 
 def init_state(s: SymbolicState, prev_store, ast, symbol_visitor):
     """give fresh symbols and merge register values in."""
@@ -40,7 +46,7 @@ def merge_states(state: SymbolicState, store):
     """Merges two states."""
     print("merging states..")
     for key, val in state.store.items():
-        if type(val) != dict:
+        if not isinstance(val, Mapping):
             continue
         else:
             for key2, var in val.items():
@@ -579,6 +585,10 @@ class SymbolicDFS:
             for s in stmt.body:
                 self.dfs_stmt(s)
 
+    def expr_to_z3(self, m: ExecutionManager, s: SymbolicState, expr):
+        """Lower a branch condition to a Z3 boolean at the widths of its elaborated type."""
+        return to_bool(slang_expr_to_z3(expr, s, m))
+
     def visit_expr(self, m: ExecutionManager, s: SymbolicState, expr):
         if expr is None:
             return
@@ -658,6 +668,16 @@ class SymbolicDFS:
             pass
 
 
+    def take_branch(self, m: ExecutionManager, s: SymbolicState, cond_z3, direction, cond_expr) -> bool:
+        """Constrain the path to one direction of a branch; abandons the path when it is infeasible."""
+        constraint = cond_z3 if direction else z3.Not(cond_z3)
+        label = f"{m.curr_module}:{str(cond_expr.syntax).strip()[:40]}" if cond_expr.syntax is not None else m.curr_module
+        feasible = branch_feasible(m, s, constraint, label)
+        if not feasible:
+            m.abandon = True
+            m.ignore = True
+        return feasible
+
     def visit_stmt(self, m: ExecutionManager, s: SymbolicState, stmt, modules=None, direction=None):
         if stmt is None or m.ignore:
             return
@@ -676,32 +696,9 @@ class SymbolicDFS:
             if cond_expr:
                 m.branch_points += 1
                 self.visit_expr(m, s, cond_expr)
-                s.pc.push()
-                s.assertion_counter += 1
                 cond_z3 = self.expr_to_z3(m, s, cond_expr)
-                if direction:
-                    key = str(cond_z3)
-                    self.branch = True
-                    if m.cache.exists(key):
-                        result = m.cache.get(key).decode()
-                    else:
-                        result = str(solve_pc(s.pc))
-                        m.cache.set(str(cond_z3), str(solve_pc(s.pc)))
-                    s.pc.assert_and_track(cond_z3, f"p{s.assertion_counter}")
-                else:
-                    self.branch = False
-                    key = f"~{cond_z3}"
-                    if m.cache.exists(key):
-                        result = m.cache.get(key).decode()
-                    else:
-                        result = str(solve_pc(s.pc))
-                        m.cache.set(f"~{cond_z3}", str(solve_pc(s.pc)))
-                    s.pc.assert_and_track(cond_z3, f"p{s.assertion_counter}")
-                if not solve_pc(s.pc):
-                    m.cache.set(f"~{str(cond_z3)}", False)
-                    s.pc.pop()
-                    m.abandon = True
-                    m.ignore = True
+                self.branch = bool(direction)
+                if not self.take_branch(m, s, cond_z3, direction, cond_expr):
                     return
 
             if stmt.ifTrue:
@@ -710,7 +707,45 @@ class SymbolicDFS:
                 self.visit_stmt(m, s, stmt.ifFalse, modules, direction)
 
             if cond_expr:
-                s.pc.pop()
+                pop_branch(s)
+
+        elif kind == ps.StatementKind.Case:
+            m.branch_points += 1
+            self.visit_expr(m, s, stmt.expr)
+            subject = slang_expr_to_z3(stmt.expr, s, m)
+            lower = lambda e: slang_expr_to_z3(e, s, m)
+            guards = arm_guards(subject, stmt, lower)
+            if isinstance(direction, Arm):
+                # an n-way case of the CFG: its arms are blocks of their own, take this arm's guard only
+                self.branch = True
+                self.take_branch(m, s, guards[direction], True, stmt.expr)
+                return
+            # visited whole, e.g. nested in a branch the CFG doesn't split, so the rest of the path
+            # runs on one state: every feasible arm is explored from the same store, and a signal
+            # any of them wrote holds a fresh symbol after the case
+            before = s.store.snapshot()
+            ignore, abandon = m.ignore, m.abandon
+            taken, fresh = 0, set()
+            for arm, guard in zip(arms_of(stmt), guards):
+                s.store.restore(before)
+                if not branch_feasible(m, s, guard, f"{m.curr_module}:case"):
+                    continue
+                for e in arm.cond or ():
+                    self.visit_expr(m, s, e)
+                self.visit_stmt(m, s, arm.statement, modules, direction)
+                pop_branch(s)
+                if m.ignore:
+                    # a branch nested in the arm ruled it out
+                    m.ignore, m.abandon = ignore, abandon
+                    continue
+                taken += 1
+                fresh |= {(module, signal) for module, signal, _ in written(before, s.store.snapshot())}
+            s.store.restore(before)
+            if not taken:
+                m.abandon = True
+                m.ignore = True
+            for module, signal in fresh:
+                s.store[module][signal] = init_symbol()
 
         elif kind == ps.StatementKind.List:
             for s_sub in stmt.body:
@@ -730,37 +765,14 @@ class SymbolicDFS:
             m.branch_points += 1
             if hasattr(stmt, "cond"):
                 self.visit_expr(m, s, stmt.cond)
-                s.pc.push()
-                s.assertion_counter += 1
                 cond_z3 = self.expr_to_z3(m, s, stmt.cond)
-                if direction:
-                    key = str(cond_z3)
-                    self.branch = True
-                    if m.cache.exists(key):
-                        result = m.cache.get(key).decode()
-                    else:
-                        result = str(solve_pc(s.pc))
-                        m.cache.set(str(cond_z3), str(solve_pc(s.pc)))
-                    s.pc.assert_and_track(cond_z3, f"p{s.assertion_counter}")
-                else:
-                    key = str(f"~{cond_z3}")
-                    self.branch = False
-                    if m.cache.exists(key):
-                        result = m.cache.get(key).decode()
-                    else:
-                        result = str(solve_pc(s.pc))
-                        m.cache.set(f"~{str(cond_z3)}", str(solve_pc(s.pc)))
-                    s.pc.assert_and_track(~cond_z3, f"p{s.assertion_counter}")
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    m.cache.set(str(cond_z3), False)
-                    m.abandon = True
-                    m.ignore = True
+                self.branch = bool(direction)
+                if not self.take_branch(m, s, cond_z3, direction, stmt.cond):
                     return
             if hasattr(stmt, "body"):
                 self.visit_stmt(m, s, stmt.body, modules, direction)
             if hasattr(stmt, "cond"):
-                s.pc.pop()
+                pop_branch(s)
 
         elif kind == ps.StatementKind.DoWhile:
             m.branch_points += 1
@@ -769,42 +781,6 @@ class SymbolicDFS:
             if hasattr(stmt, "cond"):
                 self.visit_expr(m, s, stmt.cond)
 
-        elif kind == ps.StatementKind.Case:
-            m.branch_points += 1
-            self.visit_expr(m, s, stmt.expr)
-            for case in stmt.cases:
-                for e in case.exprs:
-                    self.visit_expr(m, s, e)
-                    s.pc.push()
-                    s.assertion_counter += 1
-                    case_z3 = self.expr_to_z3(m, s, e)
-                    if direction:
-                        key = str(cond_z3)
-                        self.branch = True
-                        if m.cache.exists(key):
-                            result = m.cache.get(key).decode()
-                        else:
-                            result = str(solve_pc(s.pc))
-                            m.cache.set(str(cond_z3), str(solve_pc(s.pc)))
-                        s.pc.assert_and_track(cond_z3, f"p{s.assertion_counter}")
-                    else:
-                        key = str(f"~{cond_z3}")
-                        self.branch = False
-                        if m.cache.exists(key):
-                            result = m.cache.get(key).decode()
-                        else:
-                            result = str(solve_pc(s.pc))
-                            m.cache.set(f"~{str(cond_z3)}", str(solve_pc(s.pc)))
-                        s.pc.assert_and_track(~cond_z3, f"p{s.assertion_counter}")
-                    if not solve_pc(s.pc):
-                        s.pc.pop()
-                        m.engine.cache.set(str(cond_z3), False)
-                        m.abandon = True
-                        m.ignore = True
-                        return
-                    self.visit_stmt(m, s, case.stmt, modules, direction)
-                    s.pc.pop()
-
         elif kind in [ps.StatementKind.Assign, ps.StatementKind.NonBlockingAssign]:
             self.visit_expr(m, s, stmt.left)
             self.visit_expr(m, s, stmt.right)
@@ -23,7 +23,17 @@ from engine.execution_manager import ExecutionManager
 from engine.symbolic_state import SymbolicState
 from helpers.rvalue_parser import tokenize, parse_tokens, evaluate
 from strategies.dfs import DepthFirst
+from strategies.coverage import CoverageGuided
 from engine.execution_engine import ExecutionEngine
+from engine.sva_monitors import build_monitors
+from engine.elaboration import elaborate
+from engine.checkpoint import Deadline, Checkpoint
+from engine.incremental import ResultCache
+from helpers.model_cache import ModelCache
+from helpers.constraint_slicing import ConstraintSlicer
+from helpers.query_log import QueryLog
+from helpers.branch_table import BranchTable
+from engine.solver_portfolio import SolverPortfolio
 from pyverilog.dataflow.dataflow_analyzer import VerilogDataflowAnalyzer
 from pyverilog.dataflow.optimizer import VerilogDataflowOptimizer
 from pyverilog.dataflow.graphgen import VerilogGraphGenerator
@@ -31,7 +41,7 @@ import pygraphviz as pgv
 import pyslang as ps
 from helpers.slang_helpers import SlangSymbolVisitor, SlangNodeVisitor, SymbolicDFS
 import redis
-import threading
+import atexit
 import time
 
 gc.collect()
@@ -46,10 +56,14 @@ INFO = "Verilog Symbolic Execution Engine"
 VERSION = pyverilog.__version__
 USAGE = "Usage: python3 -m main <num_cycles> <verilog_file>.v > out.txt"
     
-def timeout_exit():
-    """This only happens when the timer runs out."""
-    print("Execution time limit exceeded. Exiting.")
-    sys.exit(1)
+def save_cache(engine: ExecutionEngine) -> None:
+    """Persist the Redis query cache, whether the run finished or was stopped."""
+    if hasattr(engine, "cache"):
+        try:
+            engine.cache.save()
+            print("Redis cache saved to RDB.")
+        except Exception as e:
+            print(f"Failed to save Redis cache: {e}")
 
 def showVersion():
     print(INFO)
@@ -118,6 +132,54 @@ def main():
     optparser.add_option("--use_cache", action="store_true", dest="use_cache",
                          default=False, help="Use the query caching, Default=False")
     optparser.add_option("--explore_time", help="Time to explore in seconds", dest="explore_time")
+    optparser.add_option("--checkpoint", dest="checkpoint", default=None,
+                         help="File to save exploration progress to, Default=None")
+    optparser.add_option("--checkpoint_every", dest="checkpoint_every", type='int', default=100,
+                         help="Paths between checkpoints (one is also written every 5 minutes), Default=100")
+    optparser.add_option("--resume", action="store_true", dest="resume",
+                         default=False, help="Resume from the --checkpoint file (branch table and model cache contents start empty again), Default=False")
+    optparser.add_option("--multi_property", action="store_true", dest="multi_property",
+                         default=False, help="Check all assertions in one pass instead of stopping at the first violation (with --sv, only together with --check_sva), Default=False")
+    optparser.add_option("--sim_prepass", action="store_true", dest="sim_prepass",
+                         default=False, help="Run a random bit-parallel simulation before symbolic execution to find cheap witnesses, Default=False")
+    optparser.add_option("--model_cache", action="store_true", dest="model_cache",
+                         default=False, help="Answer solver queries from recent models and known SAT/UNSAT constraint sets, Default=False")
+    optparser.add_option("--slice_constraints", action="store_true", dest="slice_constraints",
+                         default=False, help="Solve only the constraints sharing symbols with a new branch condition, Default=False")
+    optparser.add_option("--record_queries", dest="record_queries", default=None,
+                         help="Write every solver query to this JSON lines file (.gz to compress) for query_replay.py, Default=None")
+    optparser.add_option("--portfolio", action="store_true", dest="portfolio",
+                         default=False, help="Time out slow feasibility queries and race them across solver configurations in worker processes, Default=False")
+    optparser.add_option("--solver_timeout", dest="solver_timeout", type="int", default=2000,
+                         help="Upper bound in ms on the adaptive timeout before a query is raced (with --portfolio), Default=2000")
+    optparser.add_option("--branch_table", action="store_true", dest="branch_table",
+                         default=False, help="Solve both directions of a branch and share the answer with the sibling path, Default=False")
+    optparser.add_option("--branch_threads", dest="branch_threads", type="int", default=0,
+                         help="Threads solving the sibling direction concurrently (with --branch_table), Default=0")
+    optparser.add_option("--correlate_branches", action="store_true", dest="correlate_branches",
+                         default=False, help="Drop path combinations that take a predicate shared by always blocks both ways in one cycle, Default=False")
+    optparser.add_option("--elaborate", action="store_true", dest="elaborate",
+                         default=False, help="Build per-module port/parameter/variable tables once and reset the store from them on every path (with --sv), Default=False")
+    optparser.add_option("--event_driven", action="store_true", dest="event_driven",
+                         default=False, help="Propagate only the signals written since the previous always block instead of every dependency, Default=False")
+    optparser.add_option("--levelize", action="store_true", dest="levelize",
+                         default=False, help="Evaluate continuous assigns once per cycle in topological order, skipping those with unchanged inputs, Default=False")
+    optparser.add_option("--schedule", action="store_true", dest="schedule",
+                         default=False, help="Run clocked always blocks once per edge with non-blocking updates and combinational ones only when their inputs change, Default=False")
+    optparser.add_option("--memory_model", action="store_true", dest="memory_model",
+                         default=False, help="Model unpacked arrays as Z3 arrays instead of one store entry per index, Default=False")
+    optparser.add_option("--bmc", dest="bmc", type="int", default=0,
+                         help="Bounded model checking: unroll the always blocks of the top module as one transition relation this many cycles instead of enumerating paths. Only pyverilog modules are encoded (not --sv designs), and submodule outputs are free inputs, Default=0")
+    optparser.add_option("--kinduction", dest="kinduction", type="int", default=0,
+                         help="Try to prove each assertion by k-induction up to this k before exploring paths, Default=0")
+    optparser.add_option("--plan", action="store_true", dest="plan",
+                         default=False, help="Build the CFGs and report exact path counts and estimated solver queries per module, CFG and cycle instead of exploring, Default=False")
+    optparser.add_option("--incremental", dest="incremental", default=None,
+                         help="JSON file of property results; results of module definitions whose source and instantiating modules are unchanged since they were saved are reused and their paths skipped (implies --multi_property), Default=None")
+    optparser.add_option("--strategy", dest="strategy", type="choice", choices=["dfs", "coverage"], default="dfs",
+                         help="Search strategy: dfs explores paths in lexical order, coverage explores first the paths covering the most new branch directions (not with --sv), Default=dfs")
+    optparser.add_option("--check_sva", action="store_true", dest="check_sva",
+                         default=False, help="Compile SVA assert/assume/cover properties into per-cycle monitors (with --sv), Default=False")
     (options, args) = optparser.parse_args()
 
 
@@ -130,10 +192,75 @@ def main():
     if options.use_cache:
         engine.cache = redis.Redis(host='localhost', port=6379, db=0)
 
-    timer = None
-    if options.explore_time:
-        timer = threading.Timer(int(options.explore_time), timeout_exit)
-        timer.start()
+    # the exploration loop checks the deadline between paths; while it runs, signals stop it the same way
+    engine.deadline = Deadline(int(options.explore_time) if options.explore_time else None)
+    if options.sv and options.strategy != "dfs":
+        # execute_sv runs its paths through the slang visitor in lexical order, not the search strategy
+        optparser.error("--strategy coverage is not supported with --sv: SystemVerilog paths are explored in lexical order")
+
+    if options.checkpoint and options.strategy == "coverage":
+        # a checkpoint resumes at a path index, which only means something in lexical order
+        print("Ignoring --checkpoint: it needs the lexical path order of --strategy dfs")
+    elif options.checkpoint:
+        key = f"{' '.join(os.path.abspath(f) for f in filelist)}:{num_cycles}:{'sv' if options.sv else 'v'}"
+        engine.checkpoint = Checkpoint(options.checkpoint, key, options.checkpoint_every)
+        engine.resume = options.resume
+
+    if options.strategy == "coverage":
+        engine.search_strategy = CoverageGuided()
+
+    if options.multi_property:
+        engine.multi_property = True
+
+    if options.incremental:
+        engine.multi_property = True
+        engine.results = ResultCache(options.incremental)
+
+    if options.sv and engine.multi_property and not options.check_sva:
+        # system calls are only found in pyverilog always blocks; every path would be skipped
+        optparser.error("--multi_property and --incremental need --check_sva with --sv: SystemVerilog assertions are checked as compiled SVA properties only")
+
+    if options.sim_prepass:
+        engine.sim_prepass = True
+
+    if options.correlate_branches:
+        engine.correlate_branches = True
+
+    if options.levelize:
+        engine.levelize = True
+
+    if options.schedule:
+        engine.schedule = True
+
+    if options.memory_model:
+        engine.memory_model = True
+
+    if options.bmc:
+        engine.bmc_depth = options.bmc
+
+    if options.kinduction:
+        engine.kinduction_depth = options.kinduction
+
+    if options.plan:
+        engine.plan = True
+
+    if options.model_cache:
+        engine.model_cache = ModelCache(persistent=engine.cache if options.use_cache else None)
+
+    if options.slice_constraints:
+        engine.slicer = ConstraintSlicer()
+
+    if options.branch_table:
+        engine.branch_table = BranchTable(options.branch_threads)
+        atexit.register(engine.branch_table.close)
+
+    if options.record_queries:
+        QueryLog.active = QueryLog(options.record_queries)
+        atexit.register(QueryLog.active.close)
+
+    if options.portfolio:
+        SolverPortfolio.active = SolverPortfolio(first_timeout=options.solver_timeout)
+        atexit.register(SolverPortfolio.active.close)
 
     if options.showdebug:
         engine.debug = True
@@ -219,6 +346,10 @@ def main():
             my_visitor_for_symbol = SymbolicDFS(num_cycles)
             print(f"[main]my_visitor_for_symbol: {my_visitor_for_symbol}")
             symbol_visitor = SlangSymbolVisitor(num_cycles)
+            if options.check_sva:
+                engine.sva_monitors = build_monitors(compilation)
+            if options.elaborate:
+                engine.elaboration = elaborate(compilation)
             engine.execute_sv(my_visitor_for_symbol, modules, None, num_cycles)
 
             #module: DefinitionSymbol
@@ -228,9 +359,9 @@ def main():
             print(f"symbol_visitor paths:{symbol_visitor.paths}")
             
         end = time.process_time()
+        if options.use_cache:
+            save_cache(engine)
         print(f"Elapsed time {end - start}")
-        if timer:
-            timer.cancel()
         exit()
 
         # for item in tree.root.members:
@@ -289,15 +420,13 @@ def main():
     description: Description = ast.children()[0]
     top_level_module: ModuleDef = description.children()[0]
     modules = description.definitions
+    if options.event_driven:
+        engine.event_driven = True
     start = time.process_time()
     engine.execute(top_level_module, modules, None, directives, num_cycles)
     end = time.process_time()
-    if options.use_cache and hasattr(engine, "cache"):
-        try:
-            engine.cache.save()
-            print("Redis cache saved to RDB.")
-        except Exception as e:
-            print(f"Failed to save Redis cache: {e}")
+    if options.use_cache:
+        save_cache(engine)
     print(f"Elapsed time {end - start}")
 
 if __name__ == '__main__':
@@ -0,0 +1,132 @@
+"""Replays a solver query log written by main.py --record_queries, so solver settings, tactics,
+timeouts and the model cache can be compared on the same queries without re-running exploration."""
+import z3
+from z3 import Solver, Tactic
+import sys
+import gzip
+import json
+import time
+from optparse import OptionParser
+from helpers.model_cache import ModelCache
+
+
+def load_queries(path: str, source=None):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if source is None or entry["source"] == source:
+                yield entry
+
+
+def make_solver(options) -> Solver:
+    solver = Tactic(options.tactic).solver() if options.tactic else Solver()
+    if options.timeout:
+        solver.set("timeout", options.timeout)
+    for setting in options.settings:
+        key, value = setting.split("=", 1)
+        if value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        elif value.isdigit():
+            value = int(value)
+        solver.set(key, value)
+    return solver
+
+
+def replay(entry, options, cache=None):
+    """(result, seconds, answered_by_cache) for one logged query, the fastest of options.repeat runs."""
+    constraints = z3.parse_smt2_string(entry["smt2"])
+    if cache is not None:
+        start = time.perf_counter()
+        known = cache.lookup_constraints(list(constraints))
+        if known is not None:
+            return ("sat" if known else "unsat"), time.perf_counter() - start, True
+    best = None
+    for _ in range(options.repeat):
+        solver = make_solver(options)
+        solver.add(constraints)
+        start = time.perf_counter()
+        result = str(solver.check())
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    if cache is not None:
+        cache.record_constraints(list(constraints), result, solver.model() if result == "sat" else None)
+    return result, best, False
+
+
+def percentile(times, fraction: float) -> float:
+    if not times:
+        return 0.0
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    optparser = OptionParser(usage="python3 query_replay.py [options] queries.jsonl[.gz]")
+    optparser.add_option("--timeout", dest="timeout", type="int", default=0,
+                         help="Solver timeout per query in milliseconds, Default=0 (none)")
+    optparser.add_option("--tactic", dest="tactic", default=None,
+                         help="Build the solver from this z3 tactic instead of the default solver, Default=None")
+    optparser.add_option("--set", dest="settings", action="append", default=[],
+                         help="Solver parameter key=value, may be repeated, Default=None")
+    optparser.add_option("--model_cache", action="store_true", dest="model_cache", default=False,
+                         help="Answer queries from the model cache before calling the solver, Default=False")
+    optparser.add_option("--repeat", dest="repeat", type="int", default=1,
+                         help="Solve each query this many times and keep the fastest, Default=1")
+    optparser.add_option("--source", dest="source", default=None,
+                         help="Only replay queries issued from this call site, Default=None (all)")
+    optparser.add_option("--csv", dest="csv", default=None,
+                         help="Write per-query results to this CSV file, Default=None")
+    optparser.add_option("-v", "--verbose", action="store_true", dest="verbose", default=False,
+                         help="Print every query, Default=False")
+    (options, args) = optparser.parse_args()
+    if len(args) != 1:
+        optparser.print_help()
+        sys.exit(1)
+
+    cache = ModelCache() if options.model_cache else None
+    rows = []
+    mismatches = 0
+    for entry in load_queries(args[0], options.source):
+        result, elapsed, cached = replay(entry, options, cache)
+        # unknown is what a timeout gives, not a disagreement about the answer
+        mismatch = result != entry["result"] and "unknown" not in (result, entry["result"])
+        mismatches += mismatch
+        rows.append((entry["id"], entry["source"], entry.get("module", ""), entry.get("cycle", ""),
+                     entry.get("branch", ""), entry["size"], entry["result"], result, entry["time"], elapsed, cached))
+        if options.verbose or mismatch:
+            print(f"query {entry['id']} [{entry['source']}] {entry.get('branch', '')}: {result} in {elapsed * 1000:.2f}ms"
+                  f" (recorded {entry['result']} in {entry['time'] * 1000:.2f}ms){' cached' if cached else ''}"
+                  f"{' MISMATCH' if mismatch else ''}")
+
+    if options.csv:
+        with open(options.csv, "w") as f:
+            f.write("id,source,module,cycle,branch,size,recorded_result,result,recorded_time,time,cached\n")
+            for row in rows:
+                f.write(",".join(str(v) for v in row) + "\n")
+
+    times = [row[9] for row in rows]
+    recorded = [row[8] for row in rows]
+    print(f"Replayed {len(rows)} queries: total {sum(times):.3f}s (recorded {sum(recorded):.3f}s)")
+    if rows:
+        print(f"  mean {sum(times) / len(times) * 1000:.2f}ms, median {percentile(times, 0.5) * 1000:.2f}ms, "
+              f"p90 {percentile(times, 0.9) * 1000:.2f}ms, max {max(times) * 1000:.2f}ms")
+    results = {}
+    sources = {}
+    for row in rows:
+        results[row[7]] = results.get(row[7], 0) + 1
+        total, count = sources.get(row[1], (0.0, 0))
+        sources[row[1]] = (total + row[9], count + 1)
+    print(f"  results: {results}")
+    for source, (total, count) in sorted(sources.items()):
+        print(f"  {source}: {count} queries, {total:.3f}s")
+    if cache is not None:
+        print(f"  model cache answered {sum(row[10] for row in rows)} queries")
+    print(f"  {mismatches} results differ from the recording")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Coverage guided search. Statements are visited as in DepthFirst, but the multi cycle paths are
+explored in order of how many branch directions they would add to a global coverage bitmap of
+(module, branch line, direction, cycle). The bitmap fills in from the branch decisions paths
+actually take, starting from those the simulation pre-pass took, and a direction found infeasible
+stops attracting paths."""
+
+import heapq
+import time
+from pyverilog.vparser.ast import IfStatement, CaseStatement
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from .dfs import DepthFirst
+
+
+def branch_node(block):
+    """The If or Case that ends a basic block, None when it doesn't end in one."""
+    for node in reversed(block):
+        if isinstance(node, (IfStatement, CaseStatement)):
+            return node
+    return None
+
+
+def path_branches(cfg, cfg_path) -> list:
+    """(branch line, direction) of every branch decision along a path of a CFG."""
+    successors = {}
+    for start, end in cfg.cfg_edges:
+        successors.setdefault(start, set()).add(end)
+    branching = {block for block, ends in successors.items() if len(ends) > 1}
+    blocks = [block for block in cfg_path if block >= 0]
+    branches = []
+    for block, direction in zip(blocks, cfg.compute_direction(cfg_path)):
+        node = branch_node(cfg.basic_block_list[block]) if block in branching else None
+        if node is not None:
+            branches.append((node.lineno, int(direction)))
+    return branches
+
+
+class CoverageGuided(DepthFirst):
+    """DepthFirst visits, with paths ordered greedily by the branch directions they would newly cover."""
+    def __init__(self):
+        # bit index of every (module, branch line, direction, cycle)
+        self.bits = {}
+        # bitmaps of the directions taken on a feasible path, and of those found infeasible
+        self.covered = 0
+        self.infeasible = 0
+        # (seconds, paths explored, directions covered) whenever coverage grew
+        self.curve = []
+        self.explored = 0
+        self.start = time.monotonic()
+
+    def bit(self, key: tuple) -> int:
+        if key not in self.bits:
+            self.bits[key] = len(self.bits)
+        return 1 << self.bits[key]
+
+    def path_mask(self, path: dict, cfgs_by_module: dict, masks: dict) -> int:
+        """Bitmap of the directions a multi cycle path takes, memoized per CFG path and cycle."""
+        mask = 0
+        for module_name, cycles in path.items():
+            for cycle, single_cycle_path in enumerate(cycles):
+                for k, cfg_path in enumerate(single_cycle_path):
+                    key = (module_name, k, tuple(cfg_path), cycle)
+                    if key not in masks:
+                        cfg = cfgs_by_module[module_name][k]
+                        masks[key] = 0
+                        for line, direction in path_branches(cfg, cfg_path):
+                            masks[key] |= self.bit((module_name, line, direction, cycle))
+                    mask |= masks[key]
+        return mask
+
+    def seed(self, covered) -> None:
+        """Count the directions the simulation pre-pass already took as covered, so the paths
+        picked first are those reaching what simulation did not."""
+        for key in covered:
+            if key in self.bits:
+                self.covered |= self.bit(key)
+
+    def gain(self, mask: int) -> int:
+        return (mask & ~(self.covered | self.infeasible)).bit_count()
+
+    def order(self, m: ExecutionManager, first_path: int, total_paths: list, cfgs_by_module: dict):
+        """Lazy greedy: a path's gain only shrinks as coverage grows, so a popped path whose
+        recomputed gain still beats the next best is the best path."""
+        self.start = time.monotonic()
+        masks = {}
+        path_masks = {i: self.path_mask(total_paths[i], cfgs_by_module, masks) for i in range(first_path, len(total_paths))}
+        self.seed(m.sim_covered)
+        print(f"Coverage guided search over {len(path_masks)} paths, {len(self.bits)} branch directions")
+        heap = [(-mask.bit_count(), i) for i, mask in path_masks.items()]
+        heapq.heapify(heap)
+        while heap:
+            _, i = heapq.heappop(heap)
+            gain = self.gain(path_masks[i])
+            if heap and gain < -heap[0][0]:
+                heapq.heappush(heap, (-gain, i))
+                continue
+            yield i
+
+    def visit_stmt(self, m: ExecutionManager, s: SymbolicState, stmt, modules, direction):
+        abandoned = m.abandon
+        super().visit_stmt(m, s, stmt, modules, direction)
+        if abandoned or direction is None or not isinstance(stmt, (IfStatement, CaseStatement)):
+            return
+        bit = self.bit((m.curr_module, stmt.lineno, int(direction), m.cycle))
+        if m.abandon:
+            self.infeasible |= bit
+        else:
+            self.covered |= bit
+
+    def finish_path(self, m: ExecutionManager, path_index: int) -> None:
+        self.explored += 1
+        covered = self.covered.bit_count()
+        if not self.curve or self.curve[-1][2] != covered:
+            self.curve.append((time.monotonic() - self.start, self.explored, covered))
+
+    def report(self) -> None:
+        print(f"Branch coverage: {self.covered.bit_count()} of {len(self.bits)} directions after {self.explored} paths, "
+              f"{(self.infeasible & ~self.covered).bit_count()} found infeasible")
+        for seconds, paths, covered in self.curve:
+            print(f"  {seconds:.2f}s {paths} paths: {covered} directions")
@@ -1,5 +1,6 @@
 """Depth First Traversal of the AST."""
 from .template import Search
+import z3
 from z3 import Solver, Int, BitVec, Int2BV, IntVal, Concat
 from engine.execution_manager import ExecutionManager
 from engine.symbolic_state import SymbolicState
@@ -11,19 +12,30 @@ from pyverilog.vparser.ast import Repeat
 from helpers.utils import init_symbol
 from typing import Optional
 from helpers.rvalue_parser import tokenize, parse_tokens, evaluate, resolve_dependency, count_nested_cond, cond_options, str_to_int, str_to_bool, simpl_str_exp, conjunction_with_pointers
-from helpers.rvalue_to_z3 import parse_expr_to_Z3, solve_pc, parse_concat_to_Z3
+from helpers.rvalue_to_z3 import parse_expr_to_Z3, solve_pc, parse_concat_to_Z3, branch_feasible
+from helpers.bv_encoding import infer_widths, parse_int_literal, literal_width, bv_const, bv_symbol, signal_width
+from helpers.bv_encoding import lower_signal, lower_store_value, align, to_bool, to_bv, resize
+from helpers.memory_model import declare, memory_of, mentions_memory, read_symbol, StoreEncoder, StoreFrame
 from helpers.utils import to_binary
+from engine.signal_index import dirty_dependencies, dirty_cond_assigns, mark_propagated
+from engine.case_encoding import Arm, arms_of, arm_guards, item_match
 from itertools import product, permutations
 import os
 import copy
 import time
 
 
+def branch_label(m: ExecutionManager, node) -> str:
+    """Names a branch condition in the per-branch solver statistics."""
+    return f"{m.curr_module}:{getattr(node, 'lineno', node)}"
+
+
 class DepthFirst(Search):
 
     def visit_module(self, m: ExecutionManager, s: SymbolicState, module: ModuleDef, modules: Optional):
         """Traverse the module of a hardware design, depth first."""
         m.currLevel = 0
+        infer_widths(m, module, m.curr_module)
         params = module.paramlist.params
         ports = module.portlist.ports
 
@@ -49,7 +61,7 @@ class DepthFirst(Search):
 
         
         if not m.is_child and not m.init_run_flag and not m.ignore:
-            m.initial_store = copy.deepcopy(s.store) 
+            m.initial_store = s.store.snapshot()
 
         for item in module.items:
             if isinstance(item, Value):
@@ -89,6 +101,112 @@ class DepthFirst(Search):
         
     
 
+    def propagate_updates(self, m: ExecutionManager, s: SymbolicState):
+        """Carry the signals written in an always block over to the signals that follow them."""
+        for module in m.dependencies:
+            if m.event_driven:
+                # only the followers of signals written since the last propagation
+                signals = dirty_dependencies(m, module)
+                cond_lhss = dirty_cond_assigns(m, module)
+            else:
+                signals = m.dependencies[module]
+                cond_lhss = m.cond_assigns[module]
+            for signal in signals:
+                if m.dependencies[module][signal] in m.updates:
+                    if m.updates[m.dependencies[module][signal]][0] == 1:
+                        prev_symbol = m.updates[m.dependencies[module][signal]][1]
+
+                        if m.dependencies[module][signal] in m.cond_assigns[module]:
+                            m.cond_assigns[m.curr_module][signal] = m.cond_assigns[module][m.dependencies[module][signal]]
+
+                        if signal in s.store[m.curr_module] and '[' in str(s.store[m.curr_module][signal]):
+
+                            parts = s.store[m.curr_module][signal].partition("[")
+
+                            new_symbol = s.store[m.curr_module][m.dependencies[module][signal]]
+                            if isinstance(new_symbol, dict):
+                                # the concat dict may be shared with other paths through a store snapshot
+                                new_symbol = dict(new_symbol)
+                                first_parts = {}
+                                for sig_name in new_symbol:
+                                    first_parts[sig_name] = parts[0].replace(parts[0], new_symbol[sig_name])
+                                    for i in range(1, len(parts)):
+                                        new_symbol[sig_name] += parts[i]
+                                    s.store[m.curr_module][sig_name] = new_symbol[sig_name]
+                                s.store[m.curr_module][m.dependencies[module][signal]] = new_symbol
+                            else:
+                                first_part = parts[0].replace(parts[0], new_symbol)
+                                for i in range(1, len(parts)):
+                                    new_symbol += parts[i]
+
+                                s.store[m.curr_module][signal] = new_symbol
+
+                        else:
+                            if signal in m.dependencies[module] and signal in s.store[m.curr_module] and m.dependencies[module][signal] in s.store[m.curr_module]:
+                                new_symbol = s.store[m.curr_module][m.dependencies[module][signal]]
+                                s.store[m.curr_module][signal] = str(s.store[m.curr_module][signal]).replace(prev_symbol, new_symbol)
+                            else:
+                                # the signal was updated, but something trivial happened like it was just written with a constant
+                                pass
+                self.propagate_cond_assigns(m, s, module, cond_lhss)
+            if m.event_driven and len(signals) == 0 and len(m.dependencies[module]) > 0:
+                # the full walk visits the conditional assigns under any dependency
+                self.propagate_cond_assigns(m, s, module, cond_lhss)
+        if m.event_driven:
+            mark_propagated(m)
+
+    def propagate_cond_assigns(self, m: ExecutionManager, s: SymbolicState, module, lhss):
+        """Rewrite the updated conditionally assigned signals of module from the signals they follow."""
+        for lhs in lhss:
+            if lhs in m.dependencies[module] and isinstance(m.updates[lhs], tuple) and m.updates[lhs][0] == 1:
+                prev_symbol = str(m.updates[lhs][1])
+                if not prev_symbol.isdigit() and prev_symbol in s.store[m.curr_module]: 
+                    prev_symbol = s.store[m.curr_module][prev_symbol]
+                if lhs in s.store[module] and '[' in str(s.store[module][lhs]):
+
+                    parts = s.store[module][lhs].partition("[")
+
+                    new_symbol = s.store[module][str(m.dependencies[module][lhs])]
+                    first_part = parts[0].replace(parts[0], new_symbol)
+                    for i in range(1, len(parts)):
+                        new_symbol += parts[i]
+
+                    s.store[module][lhs] = new_symbol
+                else:
+                    # do a simpl pass?
+                    if lhs in s.store[module]:
+                        s.store[module][lhs] = s.store[module][lhs]
+                m.updates[lhs] = 0 
+
+    def touches_memory(self, m: ExecutionManager, s: SymbolicState, stmt) -> bool:
+        """Whether an assignment writes an element of a memory, or reads one into a signal."""
+        if not m.memory_model:
+            return False
+        store = s.store[m.curr_module]
+        left = stmt.left.var
+        if isinstance(left, Pointer) and memory_of(store, left.var) is not None:
+            return True
+        return isinstance(left, Identifier) and mentions_memory(stmt.right.var, store)
+
+    def memory_assign(self, m: ExecutionManager, s: SymbolicState, stmt) -> None:
+        """Write a memory element, or store a symbol standing for the memory read on the right."""
+        store = s.store[m.curr_module]
+        encoder = StoreEncoder(m)
+        frame = StoreFrame(m, s)
+        value = encoder.expr(stmt.right.var, frame)
+        left = stmt.left.var
+        if isinstance(left, Pointer):
+            name = left.var.name
+            store[name] = memory_of(store, left.var).write(encoder.expr(left.ptr, frame), value)
+            # nothing follows a memory by name, so there is no symbol to propagate
+            m.updates[name] = 0
+        else:
+            name = left.name
+            prev_symbol = store[name]
+            store[name] = read_symbol(m, resize(to_bv(value), signal_width(m, name)))
+            if not isinstance(stmt, NonblockingSubstitution):
+                m.updates[name] = (1, prev_symbol)
+
     def visit_stmt(self, m: ExecutionManager, s: SymbolicState, stmt: Node, modules: Optional[dict], direction: Optional[int]):
         "Traverse the statements in a hardware design"
         if m.ignore:
@@ -120,123 +238,17 @@ class DepthFirst(Search):
                     sub_stmt = stmt.statement
                     m.in_always = True
                     self.visit_stmt(m, s, sub_stmt, modules, direction)
-                    for module in m.dependencies:
-                        for signal in m.dependencies[module]:
-                            if m.dependencies[module][signal] in m.updates:
-                                if m.updates[m.dependencies[module][signal]][0] == 1:
-                                    prev_symbol = m.updates[m.dependencies[module][signal]][1]
-
-                                    if m.dependencies[module][signal] in m.cond_assigns[module]:
-                                        m.cond_assigns[m.curr_module][signal] = m.cond_assigns[module][m.dependencies[module][signal]]
-
-                                    if signal in s.store[m.curr_module] and '[' in str(s.store[m.curr_module][signal]):
-                                        
-                                        parts = s.store[m.curr_module][signal].partition("[")
-
-                                        new_symbol = s.store[m.curr_module][m.dependencies[module][signal]]
-                                        if isinstance(new_symbol, dict):
-                                            first_parts = {}
-                                            for sig_name in new_symbol:
-                                                first_parts[sig_name] = parts[0].replace(parts[0], new_symbol[sig_name])
-                                                for i in range(1, len(parts)):
-                                                    new_symbol[sig_name] += parts[i]
-                                                s.store[m.curr_module][sig_name] = new_symbol[sig_name]
-                                        else:
-                                            first_part = parts[0].replace(parts[0], new_symbol)
-                                            for i in range(1, len(parts)):
-                                                new_symbol += parts[i]
-
-                                            s.store[m.curr_module][signal] = new_symbol
-
-                                    else:
-                                        if signal in m.dependencies[module] and signal in s.store[m.curr_module] and m.dependencies[module][signal] in s.store[m.curr_module]:
-                                            new_symbol = s.store[m.curr_module][m.dependencies[module][signal]]
-                                            s.store[m.curr_module][signal] = str(s.store[m.curr_module][signal]).replace(prev_symbol, new_symbol)
-                                        else:
-                                            # the signal was updated, but something trivial happened like it was just written with a constant
-                                            pass
-                            for lhs in m.cond_assigns[module]:
-                                if lhs in m.dependencies[module] and isinstance(m.updates[lhs], tuple) and m.updates[lhs][0] == 1:
-                                    prev_symbol = str(m.updates[lhs][1])
-                                    if not prev_symbol.isdigit() and prev_symbol in s.store[m.curr_module]: 
-                                        prev_symbol = s.store[m.curr_module][prev_symbol]
-                                    if lhs in s.store[module] and '[' in str(s.store[module][lhs]):
-                                        
-                                        parts = s.store[module][lhs].partition("[")
-
-                                        new_symbol = s.store[module][str(m.dependencies[module][lhs])]
-                                        first_part = parts[0].replace(parts[0], new_symbol)
-                                        for i in range(1, len(parts)):
-                                            new_symbol += parts[i]
-
-                                        s.store[module][lhs] = new_symbol
-                                    else:
-                                        # do a simpl pass?
-                                        if lhs in s.store[module]:
-                                            s.store[module][lhs] = s.store[module][lhs]
-                                    m.updates[lhs] = 0 
+                    self.propagate_updates(m, s)
 
             else: 
                 sub_stmt = stmt.statement
                 m.in_always = True
                 #self.visit_stmt(m, s, sub_stmt, modules, direction)
-                for module in m.dependencies:
-                    for signal in m.dependencies[module]:
-                        if m.dependencies[module][signal] in m.updates:
-                            if m.updates[m.dependencies[module][signal]][0] == 1:
-                                prev_symbol = m.updates[m.dependencies[module][signal]][1]
-
-                                if m.dependencies[module][signal] in m.cond_assigns[module]:
-                                    m.cond_assigns[m.curr_module][signal] = m.cond_assigns[module][m.dependencies[module][signal]]
-
-                                if signal in s.store[m.curr_module] and '[' in str(s.store[m.curr_module][signal]):
-                                    
-                                    parts = s.store[m.curr_module][signal].partition("[")
-
-                                    new_symbol = s.store[m.curr_module][m.dependencies[module][signal]]
-                                    if isinstance(new_symbol, dict):
-                                        first_parts = {}
-                                        for sig_name in new_symbol:
-                                            first_parts[sig_name] = parts[0].replace(parts[0], new_symbol[sig_name])
-                                            for i in range(1, len(parts)):
-                                                new_symbol[sig_name] += parts[i]
-                                            s.store[m.curr_module][sig_name] = new_symbol[sig_name]
-                                    else:
-                                        first_part = parts[0].replace(parts[0], new_symbol)
-                                        for i in range(1, len(parts)):
-                                            new_symbol += parts[i]
-
-                                        s.store[m.curr_module][signal] = new_symbol
-
-                                else:
-                                    if signal in m.dependencies[module] and signal in s.store[m.curr_module] and m.dependencies[module][signal] in s.store[m.curr_module]:
-                                        new_symbol = s.store[m.curr_module][m.dependencies[module][signal]]
-                                        s.store[m.curr_module][signal] = str(s.store[m.curr_module][signal]).replace(prev_symbol, new_symbol)
-                                    else:
-                                        # the signal was updated, but something trivial happened like it was just written with a constant
-                                        pass
-                        for lhs in m.cond_assigns[module]:
-                            if lhs in m.dependencies[module] and isinstance(m.updates[lhs], tuple) and m.updates[lhs][0] == 1:
-                                prev_symbol = str(m.updates[lhs][1])
-                                if not prev_symbol.isdigit() and prev_symbol in s.store[m.curr_module]: 
-                                    prev_symbol = s.store[m.curr_module][prev_symbol]
-                                if lhs in s.store[module] and '[' in str(s.store[module][lhs]):
-                                    
-                                    parts = s.store[module][lhs].partition("[")
-
-                                    new_symbol = s.store[module][str(m.dependencies[module][lhs])]
-                                    first_part = parts[0].replace(parts[0], new_symbol)
-                                    for i in range(1, len(parts)):
-                                        new_symbol += parts[i]
-
-                                    s.store[module][lhs] = new_symbol
-                                else:
-                                    # do a simpl pass?
-                                    if lhs in s.store[module]:
-                                        s.store[module][lhs] = s.store[module][lhs]
-                                m.updates[lhs] = 0 
+                self.propagate_updates(m, s)
                         # simplificiation / collapsing step
             m.in_always = False               
+        elif isinstance(stmt, (Assign, NonblockingSubstitution, BlockingSubstitution)) and self.touches_memory(m, s, stmt):
+            self.memory_assign(m, s, stmt)
         elif isinstance(stmt, Assign):
             if isinstance(stmt.left.var, Identifier) and stmt.left.var.name in m.reg_decls and m.cycle > 0:
                 ...
@@ -519,6 +531,7 @@ class DepthFirst(Search):
             m.curr_level += 1
             self.cond = True
             bit_index = m.curr_level
+            m.curr_branch = (stmt.lineno, 1 if direction else 0)
             if (direction):
                 self.branch = True
 
@@ -610,6 +623,8 @@ class DepthFirst(Search):
                 self.visit_stmt(m, s, stmt.statement,  modules, direction)
         elif isinstance(stmt, SystemCall):
             m.assertion_violation = True
+            if m.properties is not None:
+                m.properties.fire(m, s, stmt)
         elif isinstance(stmt, SingleStatement):
             self.visit_stmt(m, s, stmt.statement,  modules, direction)
         elif isinstance(stmt, InstanceList):
@@ -654,10 +669,14 @@ class DepthFirst(Search):
                             m.intermodule_dependencies[containing_module][str(port.argname)] = (f"{stmt.module}_{instance_index}", str(port.portname))
 
                     self.execute_child(modules[stmt.module], s, m, f"{stmt.module}_{instance_index}")
+        elif isinstance(stmt, Case) and getattr(stmt, "n_way", False):
+            # the label starting an arm of an n-way case; the guard was taken at the case statement
+            return
         elif isinstance(stmt, Case):
             m.curr_level += 1
             self.cond = True
             bit_index = len(m.path_code) - m.curr_level
+            m.curr_branch = (stmt.lineno, 1 if direction else 0)
 
             if (direction):
                 self.branch = True
@@ -667,10 +686,7 @@ class DepthFirst(Search):
                 
 
                 solver_start = time.process_time()
-                if stmt.cond is None:
-                    self.visit_expr(m, s, stmt.cond)
-                else:
-                    self.visit_expr(m, s, stmt.cond[0])
+                self.visit_expr(m, s, stmt.cond)
                 solver_end = time.process_time()
                 m.solver_time += solver_end - solver_start
                 if (m.abandon and m.debug):
@@ -687,10 +703,7 @@ class DepthFirst(Search):
 
 
                 solver_start = time.process_time()
-                if stmt.cond is None:
-                    self.visit_expr(m, s, stmt.cond)
-                else:
-                    self.visit_expr(m, s, stmt.cond[0])
+                self.visit_expr(m, s, stmt.cond)
                 solver_end = time.process_time()
                 m.solver_time += solver_end - solver_start
                 if (m.abandon and m.debug):
@@ -699,17 +712,40 @@ class DepthFirst(Search):
                     return
 
         elif isinstance(stmt, CaseStatement):
-            m.curr_case = stmt.comp
-            for case in stmt.caselist:
-                self.visit_stmt(m, s, case, modules, direction)
+            m.curr_case = stmt
+            if getattr(stmt, "n_way", False) and isinstance(direction, Arm):
+                self.visit_case(m, s, stmt, direction)
+            else:
+                for case in stmt.caselist:
+                    self.visit_stmt(m, s, case, modules, direction)
+
+    def visit_case(self, m: ExecutionManager, s: SymbolicState, stmt, arm: Arm) -> None:
+        """Take one arm of an n-way case with a single guard that excludes the other arms."""
+        encoder = StoreEncoder(m)
+        frame = StoreFrame(m, s)
+        lower = lambda node: encoder.expr(node, frame)
+        solver_start = time.process_time()
+        guard = arm_guards(lower(stmt.comp), stmt, lower)[arm]
+        m.curr_branch = (arms_of(stmt)[arm].lineno, 1)
+        if not branch_feasible(m, s, guard, branch_label(m, stmt)):
+            m.abandon = True
+            m.ignore = True
+        m.solver_time += time.process_time() - solver_start
 
     def visit_expr(self, m: ExecutionManager, s: SymbolicState, expr: Value) -> None:
         """Traverse the expressions in a hardware design."""
-        if isinstance(expr, Reg):
+        if m.memory_model and isinstance(expr, (Operator, Pointer)) and mentions_memory(expr, s.store[m.curr_module]):
+            # a condition reading an unpacked array, like mem[i] == x or a bare mem[i], see helpers/memory_model.py
+            x = to_bool(StoreEncoder(m).expr(expr, StoreFrame(m, s)))
+            if not branch_feasible(m, s, x if self.branch else z3.Not(x), branch_label(m, expr)):
+                m.abandon = True
+                m.ignore = True
+        elif isinstance(expr, Reg):
             if not expr.name in m.reg_writes:
                 if m.cycle == 0:
                     #print(expr.name)
-                    s.store[m.curr_module][expr.name] = init_symbol()
+                    if not (m.memory_model and declare(m, s, expr)):
+                        s.store[m.curr_module][expr.name] = init_symbol()
                 m.reg_writes.add(expr.name)
                 m.reg_decls.add(expr.name)
                 if not expr.width is None: 
@@ -733,85 +769,43 @@ class DepthFirst(Search):
             # assume left is identifier
             #parse_expr_to_Z3(expr, s, m)
             if isinstance(expr.left, Partselect):                      
-                x = BitVec(s.store[m.curr_module][expr.left.var.name], 32)
-            elif (s.store[m.curr_module][expr.left.name]).isdigit():
-                int_val = IntVal(int(s.store[m.curr_module][expr.left.name]))
-                x = Int2BV(int_val, 32)
-            elif (s.store[m.curr_module][expr.left.name]).split(" ")[0].isdigit():
-                x = Int2BV(IntVal(str_to_int(s.store[m.curr_module][expr.left.name], s, m)), 32)
+                x = parse_expr_to_Z3(expr.left, s, m)
             else: 
-                x = BitVec(s.store[m.curr_module][expr.left.name], 32)
+                stored = str(s.store[m.curr_module][expr.left.name])
+                value = None
+                if stored.split(" ")[0].isdigit() and not stored.isdigit():
+                    value = str_to_int(stored, s, m)
+                if not value is None:
+                    x = bv_const(value, signal_width(m, expr.left.name))
+                else:
+                    x = lower_signal(m, s.store, expr.left.name)
             
             if isinstance(expr.right, IntConst):
-                if "'h" in str(expr.right.value) or "'b" in str(expr.right.value) or "'d" in str(expr.right.value):
-                    int_val = IntVal(int(str(expr.right.value.split("'")[1][1:])))
-                else:
-                    int_val = IntVal(expr.right.value)
-                y = Int2BV(int_val, 32)
+                value, width = parse_int_literal(expr.right.value)
+                y = bv_const(value, width if width is not None else literal_width(value))
             else:
-                y = BitVec(expr.right.name, 32)
-            if self.branch:
-                s.pc.push()
-                s.assertion_counter += 1
-                s.pc.assert_and_track(x==y, f"p{s.assertion_counter}")
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    m.abandon = True
-                    m.ignore  = True
-                    return
-            else: 
-                s.pc.push()
-                s.assertion_counter += 1
-                s.pc.assert_and_track(x!=y, f"p{s.assertion_counter}")
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    m.abandon = True
-                    m.ignore = True
-                    return
+                y = lower_signal(m, s.store, expr.right.name)
+            x, y = align(x, y)
+            if not branch_feasible(m, s, x == y if self.branch else x != y, branch_label(m, expr)):
+                m.abandon = True
+                m.ignore = True
+                return
                
         elif isinstance(expr, Identifier):
             # change this to one since inst is supposed to just be 1 bit width
             # and the identifier class actually doesn't have a width param
             symbol = s.store[m.curr_module][expr.name]
-            if "'h" in s.store[m.curr_module][expr.name] or "'b" in s.store[m.curr_module][expr.name] or "'d" in s.store[m.curr_module][expr.name]:
-                symbol = s.store[m.curr_module][expr.name].split("'")[1][1:]
-                s.store[m.curr_module][expr.name] = symbol
-                if not symbol.isdigit():
-                    x = BitVec(s.store[m.curr_module][expr.name], 1)
-                else:
-                    x = Int2BV(IntVal(int(symbol)), 1)
-            elif isinstance(symbol, dict):
-                bit_vec_list = parse_concat_to_Z3(symbol, s, m)
-                #TODO: get the right widths
-                x = BitVec(Concat(bit_vec_list), 1)
-            else:
-                x = BitVec(s.store[m.curr_module][expr.name], 1)
-            y = BitVec(1, 1)
-            one = IntVal(1)
-            zero = IntVal(0)
-            one_bv = Int2BV(one, 1)
-            zero_bv = Int2BV(zero, 1)
-            if self.branch:
-                s.pc.push()
-                s.assertion_counter += 1
-                s.pc.assert_and_track(x==one_bv, f"p{s.assertion_counter}")
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    #print("Abandoning infeasible path")
-                    m.abandon = True
-                    m.ignore = True
-                    return
-            else: 
-                s.pc.push()
-                s.assertion_counter += 1
-                s.pc.assert_and_track(x!=one_bv, f"p{s.assertion_counter}")
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    #print("Abandoning infeasible path")
-                    m.abandon = True
-                    m.ignore = True
-                    time.process_time()
-                    return
+            if not isinstance(symbol, dict) and "'" in str(symbol):
+                value, _ = parse_int_literal(symbol)
+                if not value is None:
+                    s.store[m.curr_module][expr.name] = str(value)
+            # if (sig) is true when sig is nonzero at its declared width
+            x = to_bool(lower_signal(m, s.store, expr.name))
+            if not branch_feasible(m, s, x if self.branch else z3.Not(x), branch_label(m, expr)):
+                #print("Abandoning infeasible path")
+                m.abandon = True
+                m.ignore = True
+                return
 
         # Handling Assertions
         elif isinstance(expr, NotEql):
@@ -826,79 +820,27 @@ class DepthFirst(Search):
         elif isinstance(expr, Land):
             parse_expr_to_Z3(expr, s, m)
         elif isinstance(expr, tuple):
-            cond = expr[0]
-            base = (str(cond.value)[0:1])
-            if base == "b'":
-                value = (int(cond.value.split("'")[1], 2))
-            elif base == "h'":
-                value = (int(cond.value.split("'")[1], 16))
-            elif isinstance(cond, IntConst):
-                if "'b" in str(cond.value):
-                    width = int(cond.value.split("'")[0])
-                    value = (int(cond.value.split("'")[1][1:], 2))
-                elif base == "'h"  in str(cond.value):
-                    width = int(cond.value.split("'")[0])
-                    value = (int(cond.value.split("'")[1][1:], 16))
-                else:   
-                    value = int(cond.value)
-                y = Int2BV(IntVal(value), width)
-            else:
-                value = s.store[m.curr_module][cond]
-
-            symbol = s.store[m.curr_module][str(m.curr_case)]
-            if isinstance(symbol, dict):
-                bit_vec_list = parse_concat_to_Z3(symbol, s, m)
-                #TODO: get the right widths
-                if len(bit_vec_list) == 2:
-                    x = Concat(BitVec(str(bit_vec_list[0]), width // 2), BitVec(str(bit_vec_list[1]), width //2))
-                else:
-                    raise Exception
-            else:
-                x = BitVec(s.store[m.curr_module][str(m.curr_case)], width)
-
-            if self.branch:
-                s.pc.push()
-                s.pc.add(x==y)
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    #print("Abandoning infeasible path")
-                    m.abandon = True
-                    m.ignore = True
-                    return
-            else: 
-                s.pc.push()
-                s.pc.add(x != y)
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    #print("Abandoning infeasible path")
-                    m.abandon = True
-                    m.ignore = True
-                    return
+            # the items of a case label; the case expression is lowered at its own width and each
+            # item compared at the wider of the two
+            encoder, frame = StoreEncoder(m), StoreFrame(m, s)
+            lower = lambda node: encoder.expr(node, frame)
+            subject = lower(m.curr_case.comp)
+            match = z3.Or([item_match(subject, item, lower, m.curr_case) for item in expr])
+            if not branch_feasible(m, s, match if self.branch else z3.Not(match), branch_label(m, expr[0]), track=False):
+                #print("Abandoning infeasible path")
+                m.abandon = True
+                m.ignore = True
+                return
         elif isinstance(expr, Operator):
             #TODO Fix?
             new_val = simpl_str_exp(evaluate(parse_tokens(tokenize(expr, s, m)),s,m), s, m)
-            x = BitVec(new_val, 1)
-            one = IntVal(1)
-            one_bv = Int2BV(one, 1)
-            if self.branch:
-                s.pc.push()
-                s.pc.add(x==one_bv)
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    #print("Abandoning infeasible path")
-                    m.abandon = True
-                    m.ignore = True
-                    return
-            else: 
-                s.pc.push()
-                s.pc.add(x != one_bv)
-                if not solve_pc(s.pc):
-                    s.pc.pop()
-                    #print("Abandoning infeasible path")
-                    m.abandon = True
-                    m.ignore = True
-                    time.process_time()
-                    return
+            x = bv_symbol(m, str(new_val), 1)
+            one_bv = bv_const(1, 1)
+            if not branch_feasible(m, s, x == one_bv if self.branch else x != one_bv, branch_label(m, expr), track=False):
+                #print("Abandoning infeasible path")
+                m.abandon = True
+                m.ignore = True
+                return
         elif isinstance(expr, Decl):
             #print("here")
             ...
@@ -919,7 +861,7 @@ class DepthFirst(Search):
 
         # mark this exploration of the submodule as seen and store the state so we don't have to explore it again.
         if parent_manager.seen_mod[instance][manager_sub.path_code] == {}:
-            parent_manager.seen_mod[instance][manager_sub.path_code] = state.store
+            parent_manager.seen_mod[instance][manager_sub.path_code] = state.store.fork()
         else:
             ...
             #print("already seen this")
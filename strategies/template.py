@@ -17,6 +17,18 @@ class Search:
     """The base methods needed to implement a search strategy
     Can add as many more as you need, of course."""
 
+    def order(self, m: ExecutionManager, first_path: int, total_paths: list, cfgs_by_module: dict):
+        """Indices of the paths to explore, in the order to explore them; lexical by default."""
+        return range(first_path, len(total_paths))
+
+    def finish_path(self, m: ExecutionManager, path_index: int) -> None:
+        """Called after every explored path."""
+        pass
+
+    def report(self) -> None:
+        """Print the strategy's own results at the end of an exploration."""
+        pass
+
     @abstractmethod
     def visit_module(self, m: ExecutionManager, s: SymbolicState, module: ModuleDef, modules: Optional):
         """Traverse the modules of a hardware design."""
@@ -481,7 +481,8 @@ class SystemVerilogParser:
                             'type': assert_type,
                             'condition': condition_str,
                             'signals': signals,
-                            'location': self._get_location(obj)
+                            'location': self._get_location(obj),
+                            'statement': obj
                         }
                         self.assertions.append(assert_info)
         
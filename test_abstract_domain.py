@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Known-bits and interval domain checked against z3 on random small expressions, see helpers/abstract_domain.py
+"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from helpers.abstract_domain import AbstractStore
+
+WIDTH = 4
+SYMBOLS = [z3.BitVec(name, WIDTH) for name in ("x", "y", "z")]
+
+
+def random_bv(rng: random.Random, depth: int):
+    """A WIDTH bit expression over SYMBOLS: add, sub, shifts, bitwise ops, concat and extract."""
+    if depth == 0 or rng.random() < 0.3:
+        if rng.random() < 0.7:
+            return rng.choice(SYMBOLS)
+        return z3.BitVecVal(rng.randrange(1 << WIDTH), WIDTH)
+    a, b = random_bv(rng, depth - 1), random_bv(rng, depth - 1)
+    op = rng.choice(["add", "sub", "shl", "lshr", "shl_sym", "and", "or", "xor", "not", "concat", "zext"])
+    if op == "add":
+        return a + b
+    if op == "sub":
+        return a - b
+    if op == "shl":
+        return a << rng.randrange(WIDTH + 1)
+    if op == "lshr":
+        return z3.LShR(a, rng.randrange(WIDTH + 1))
+    if op == "shl_sym":
+        return a << b
+    if op == "and":
+        return a & b
+    if op == "or":
+        return a | b
+    if op == "xor":
+        return a ^ b
+    if op == "not":
+        return ~a
+    if op == "concat":
+        # the high half of one operand above the low half of the other
+        half = WIDTH // 2
+        return z3.Concat(z3.Extract(WIDTH - 1, half, a), z3.Extract(half - 1, 0, b))
+    return z3.ZeroExt(WIDTH // 2, z3.Extract(WIDTH // 2 - 1, 0, a))
+
+
+def random_bool(rng: random.Random, depth: int = 2):
+    """A compare of two random expressions, sometimes negated or combined."""
+    if rng.random() < 0.2:
+        left, right = random_bool(rng, 1), random_bool(rng, 1)
+        return rng.choice([z3.And, z3.Or])(left, right)
+    a, b = random_bv(rng, depth), random_bv(rng, depth)
+    compare = rng.choice([lambda: a == b, lambda: a != b, lambda: z3.ULT(a, b), lambda: z3.ULE(a, b),
+                          lambda: z3.UGT(a, b), lambda: z3.UGE(a, b), lambda: a < b, lambda: a >= b])()
+    return z3.Not(compare) if rng.random() < 0.2 else compare
+
+
+def satisfiable(*constraints) -> bool:
+    return z3.Solver().check(*constraints) == z3.sat
+
+
+def outside(store: AbstractStore, symbol):
+    """A constraint that holds when the symbol lies outside its abstract value."""
+    value = store.lookup(str(symbol), WIDTH)
+    return z3.Or(z3.ULT(symbol, value.lo), z3.UGT(symbol, value.hi),
+                 symbol & value.zeros != 0, symbol & value.ones != value.ones)
+
+
+def test_verdicts_and_refinements_agree_with_z3():
+    rng = random.Random(0)
+    decided = 0
+    for _trial in range(300):
+        store = AbstractStore()
+        pc = []
+        for _step in range(4):
+            constraint = random_bool(rng)
+            verdict = store.truth(constraint)
+            if verdict is True:
+                assert not satisfiable(*pc, z3.Not(constraint)), (pc, constraint)
+                decided += 1
+            elif verdict is False:
+                assert not satisfiable(*pc, constraint), (pc, constraint)
+                decided += 1
+                continue
+            if not satisfiable(*pc, constraint):
+                continue
+            # the constraint is taken: every model of the path condition stays inside the values
+            store.push()
+            assert store.refine(constraint), (pc, constraint)
+            pc.append(constraint)
+            for symbol in SYMBOLS:
+                assert not satisfiable(*pc, outside(store, symbol)), (pc, symbol)
+    # the domain has to decide some of them for the check to mean anything
+    assert decided > 50
+
+
+def test_refine_reports_contradictions_soundly():
+    rng = random.Random(1)
+    for _trial in range(500):
+        store = AbstractStore()
+        first, second = random_bool(rng), random_bool(rng)
+        if not satisfiable(first):
+            continue
+        store.push()
+        assert store.refine(first)
+        if not store.refine(second, commit=False):
+            assert not satisfiable(first, second), (first, second)
+
+
+def test_pop_forgets_what_the_branch_taught():
+    x = SYMBOLS[0]
+    store = AbstractStore()
+    store.push()
+    store.refine(z3.ULT(x, 3))
+    assert store.truth(x == 7) is False
+    store.pop()
+    assert store.truth(x == 7) is None
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Bounded model checking of the top module, see engine/bmc.py
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pyverilog.vparser.parser import VerilogParser
+from engine.execution_manager import ExecutionManager
+from engine.bmc import BoundedModelChecker
+from engine.kinduction import KInduction
+from engine.properties import VIOLATED, HOLDS, PROVED
+
+
+def manager() -> ExecutionManager:
+    """A manager with its own width tables; the class level ones are shared between runs."""
+    m = ExecutionManager()
+    m.sig_widths, m.param_values = {}, {}
+    return m
+
+
+def parse_module(source: str, name: str = "top"):
+    ast = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(source)
+    return next(item for item in ast.description.definitions if item.name == name)
+
+
+def test_free_instance_output_is_unconfirmed():
+    """The child drives q to 0, but only the top module is encoded, so q is free."""
+    module = parse_module("""
+module child(input clk, output q); assign q = 1'b0; endmodule
+module top(input clk); wire q; child c(.clk(clk), .q(q));
+  always @(posedge clk) begin if (q) $display("bad"); end
+endmodule""")
+    checker = BoundedModelChecker(module, manager())
+    checker.check(2)
+    (monitor,) = checker.monitors.values()
+    assert monitor.status == VIOLATED
+    assert monitor.name in checker.unconfirmed
+
+
+def test_input_violation_is_confirmed_next_to_instances():
+    module = parse_module("""
+module child(input clk, output q); assign q = 1'b0; endmodule
+module top(input clk, input a); wire q; child c(.clk(clk), .q(q));
+  always @(posedge clk) begin if (a) $display("bad"); end
+endmodule""")
+    checker = BoundedModelChecker(module, manager())
+    checker.check(2)
+    (monitor,) = checker.monitors.values()
+    assert monitor.status == VIOLATED
+    assert not checker.unconfirmed
+
+
+def test_unreachable_call_holds():
+    module = parse_module("""
+module top(input clk, input a); reg r; initial r = 0;
+  always @(posedge clk) begin r <= 0; if (r) $display("bad"); end
+endmodule""")
+    checker = BoundedModelChecker(module, manager())
+    checker.check(3)
+    (monitor,) = checker.monitors.values()
+    assert monitor.status == HOLDS
+
+
+LATCH = """
+module top(input clk, input en, input d); reg q;
+  always @(*) begin if (en) q = d; end
+  always @(posedge clk) begin if (!en && q != d) $display("bad"); end
+endmodule"""
+
+
+def test_latch_holds_its_value_when_not_written():
+    """q keeps its old value while en is low, so it can differ from d."""
+    checker = BoundedModelChecker(parse_module(LATCH), manager())
+    assert "q" in checker.latches
+    checker.check(2)
+    (monitor,) = checker.monitors.values()
+    assert monitor.status == VIOLATED
+
+
+def test_latch_is_not_proved():
+    prover = KInduction(parse_module(LATCH), manager())
+    prover.prove(3)
+    (monitor,) = prover.monitors.values()
+    assert monitor.status == VIOLATED
+
+
+def test_invariant_is_proved():
+    module = parse_module("""
+module top(input clk, input a); reg r; initial r = 0;
+  always @(posedge clk) begin r <= 0; if (r) $display("bad"); end
+endmodule""")
+    prover = KInduction(module, manager())
+    prover.prove(3)
+    (monitor,) = prover.monitors.values()
+    assert monitor.status == PROVED
+    assert prover.decided()
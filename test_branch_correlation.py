@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Branch correlation across the always blocks of a module, see engine/branch_correlation.py
+"""
+
+import sys
+import os
+import tempfile
+from copy import deepcopy
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pyverilog.vparser.parser import VerilogParser
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from engine.cfg import CFG
+from engine.branch_correlation import consistent_paths
+
+
+def module_cfgs(source: str) -> list:
+    """One CFG per always block, built as ExecutionEngine.definition_cfgs builds them."""
+    module = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(source).description.definitions[0]
+    m, s = ExecutionManager(), SymbolicState()
+    cfg = CFG()
+    cfg.reset()
+    cfg.comb, cfg.decls = [], []
+    cfg.get_always(m, s, module.items)
+    cfgs = []
+    for block in list(cfg.always_blocks):
+        cfg.basic_blocks(m, s, block)
+        cfg.partition()
+        cfg.build_cfg(m, s)
+        cfgs.append(deepcopy(cfg))
+        cfg.reset()
+    return cfgs
+
+
+def test_shared_predicate_is_correlated():
+    kept, full = consistent_paths(module_cfgs("""
+module top(input clk, input a, input b); reg x, y;
+  always @(posedge clk) begin if (a) x <= 1; else x <= 0; end
+  always @(posedge clk) begin if (a) y <= 1; else y <= 0; end
+endmodule"""))
+    assert (len(kept), full) == (2, 4)
+
+
+def test_predicate_read_through_a_wire_is_not_correlated_across_a_write():
+    """w follows r, which the middle block assigns, so w can differ between the outer blocks."""
+    kept, full = consistent_paths(module_cfgs("""
+module top(input clk, input a, input b); reg r, x, y; wire w; assign w = r;
+  always @(*) begin if (w) x = 1; else x = 0; end
+  always @(*) begin r = b; end
+  always @(*) begin if (w) y = 1; else y = 0; end
+endmodule"""))
+    assert (len(kept), full) == (4, 4)
+
+
+def test_wire_declaration_assignments_are_followed():
+    kept, full = consistent_paths(module_cfgs("""
+module top(input clk, input a, input b); reg r, x, y; wire w = ~r;
+  always @(*) begin if (w) x = 1; else x = 0; end
+  always @(*) begin r = b; end
+  always @(*) begin if (w) y = 1; else y = 0; end
+endmodule"""))
+    assert (len(kept), full) == (4, 4)
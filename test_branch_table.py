@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Sibling branch answers shared through the branch table, see helpers/branch_table.py
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from helpers.abstract_domain import AbstractStore
+from helpers.branch_table import BranchTable
+from helpers.query_log import QueryLog
+from helpers.rvalue_to_z3 import branch_feasible, pop_branch
+
+
+def take(table: BranchTable, prefix_symbol: str, constraint) -> bool:
+    """Take one direction of a branch on a fresh path whose prefix is x == 3 over its own symbols."""
+    m = ExecutionManager()
+    m.branch_table, m.slicer, m.model_cache, m.domain_stats = table, None, None, {}
+    s = SymbolicState()
+    s.pc = z3.Solver()
+    s.domain = AbstractStore()
+    s.pc.add(z3.BitVec(prefix_symbol, 4) == 3)
+    feasible = branch_feasible(m, s, constraint(z3.BitVec(prefix_symbol, 4)), "branch")
+    if feasible:
+        pop_branch(s)
+    return feasible
+
+
+def test_not_equal_sibling_reuses_the_equal_direction():
+    table = BranchTable()
+    assert take(table, "x0", lambda x: x == 3)
+    assert table.stats["siblings solved"] == 1
+    assert not take(table, "x1", lambda x: x != 3)
+    assert table.stats["hits"] == 1
+    assert table.stats["siblings solved"] == 1
+
+
+def test_equal_sibling_reuses_the_not_equal_direction():
+    table = BranchTable()
+    assert take(table, "x0", lambda x: x != 5)
+    assert not take(table, "x1", lambda x: x == 5)
+    assert not take(table, "x2", lambda x: z3.Not(x != 5))
+    assert table.stats["hits"] == 2
+
+
+def test_threaded_sibling_queries_are_logged():
+    path = os.path.join(tempfile.mkdtemp(), "queries.jsonl")
+    QueryLog.active = QueryLog(path)
+    try:
+        table = BranchTable(threads=1)
+        assert take(table, "x0", lambda x: x == 3)
+        table.close()
+    finally:
+        QueryLog.active.close()
+        QueryLog.active = None
+    with open(path) as f:
+        sources = [json.loads(line)["source"] for line in f]
+    assert "sibling" in sources
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Concatenations from the symbolic store lowered at their parts' widths, see helpers/bv_encoding.py
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from pyverilog.vparser.parser import VerilogParser
+from engine.execution_manager import ExecutionManager
+from helpers.bv_encoding import infer_widths, lower_store_value
+
+
+def manager() -> ExecutionManager:
+    ast = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse("""
+module top(input [3:0] a, input b, input [7:0] c); wire [12:0] y; endmodule""")
+    m = ExecutionManager()
+    m.sig_widths, m.param_values, m.symbol_widths = {}, {}, {}
+    m.curr_module = "top"
+    infer_widths(m, ast.description.definitions[0])
+    return m
+
+
+def test_concat_parts_keep_their_declared_widths():
+    m = manager()
+    y = lower_store_value(m, {"a": "a_sym", "b": "b_sym", "c": "c_sym[7:4]"}, 13)
+    assert y.size() == 13
+    a, b, c = z3.BitVec("a_sym", 4), z3.BitVec("b_sym", 1), z3.BitVec("c_sym", 8)
+    solver = z3.Solver()
+    solver.add(a == 0b1010, b == 1, c == 0xC3)
+    assert solver.check() == z3.sat
+    # {a, b, c[7:4]} = 1010_1_1100, zero extended to 13 bits
+    assert solver.model().eval(y).as_long() == 0b101011100
+
+
+def test_concat_literal_parts_use_the_literal_width():
+    m = manager()
+    y = lower_store_value(m, {"a": "a_sym", "2'b01": "2'b01"}, 6)
+    solver = z3.Solver()
+    solver.add(z3.BitVec("a_sym", 4) == 0b1111)
+    assert solver.check() == z3.sat
+    assert solver.model().eval(y).as_long() == 0b111101
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+SystemVerilog case statements as n-way branches, see engine/case_encoding.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+import pyslang as ps
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from engine.cfg import CFG
+from engine.case_encoding import Arm, arm_count, arm_guards
+from helpers.abstract_domain import AbstractStore
+from helpers.rvalue_to_z3 import slang_expr_to_z3
+from helpers.slang_helpers import SymbolicDFS
+
+SOURCE = """
+module top(input clk, input [1:0] s, input [1:0] a, input [1:0] b, output reg [1:0] r);
+  always @(posedge clk) begin
+    r <= 0;
+    %s case (s) a: r <= 1; b: r <= 2; 2'd3: r <= 3; endcase
+  end
+endmodule"""
+
+
+def case_block(check: str = ""):
+    """The always block of SOURCE with the case declared unique, priority or plain, and the
+    compilation owning it, which has to outlive the block."""
+    compilation = ps.Compilation()
+    compilation.addSyntaxTree(ps.SyntaxTree.fromText(SOURCE % check))
+    body = compilation.getRoot().topInstances[0].body
+    block = next(member for member in body if member.kind == ps.SymbolKind.ProceduralBlock)
+    return compilation, block.body
+
+
+def case_of(block):
+    return block.stmt.body.list[1]
+
+
+def start_path():
+    m = ExecutionManager()
+    m.sig_widths, m.param_values, m.symbol_widths = {}, {}, {}
+    m.curr_module = "top"
+    m.branch_points = 0
+    m.branch_table, m.slicer, m.model_cache, m.domain_stats = None, None, None, {}
+    s = SymbolicState()
+    s.pc = z3.Solver()
+    s.domain = AbstractStore()
+    s.store["top"] = {"s": "s_sym", "a": "a_sym", "b": "b_sym", "r": "r_sym"}
+    return m, s
+
+
+def overlaps(check: str) -> bool:
+    """Whether the second arm can be taken with s matching the first item too."""
+    _compilation, block = case_block(check)
+    case = case_of(block)
+    m, s = start_path()
+    lower = lambda e: slang_expr_to_z3(e, s, m)
+    guards = arm_guards(lower(case.expr), case, lower)
+    return z3.Solver().check(guards[1], z3.BitVec("s_sym", 2) == z3.BitVec("a_sym", 2)) == z3.sat
+
+
+def test_unique_case_arms_are_parallel():
+    assert overlaps("unique")
+    assert overlaps("unique0")
+
+
+def test_priority_case_arms_exclude_earlier_items():
+    assert not overlaps("priority")
+    assert not overlaps("")
+
+
+def test_case_is_one_n_way_branch_in_the_cfg():
+    _compilation, block = case_block()
+    assert arm_count(case_of(block)) == 4
+    cfg = CFG()
+    cfg.reset()
+    m, s = start_path()
+    cfg.basic_blocks(m, s, block)
+    cfg.partition()
+    cfg.build_cfg(m, s)
+    assert len(cfg.paths) == 4
+    assert sorted(cfg.compute_direction(path)[0] for path in cfg.paths) == [0, 1, 2, 3]
+    assert all(isinstance(cfg.compute_direction(path)[0], Arm) for path in cfg.paths)
+
+
+def test_visitor_takes_one_arm_guard():
+    _compilation, block = case_block()
+    case = case_of(block)
+    for arm, feasible in [(Arm(0), False), (Arm(1), True), (Arm(2), False), (Arm(3), False)]:
+        m, s = start_path()
+        s.pc.add(z3.BitVec("s_sym", 2) == 2, z3.BitVec("a_sym", 2) == 1, z3.BitVec("b_sym", 2) == 2)
+        SymbolicDFS(1).visit_stmt(m, s, case, None, arm)
+        assert m.abandon != feasible
+
+
+class Recorder(SymbolicDFS):
+    """Records the assignments the visitor reaches, and runs them by writing their text to r."""
+    def __init__(self):
+        super().__init__(1)
+        self.assigned = []
+
+    def visit_stmt(self, m, s, stmt, modules=None, direction=None):
+        if stmt is not None and stmt.kind == ps.StatementKind.ExpressionStatement:
+            self.assigned.append(str(stmt.syntax).strip())
+            s.store[m.curr_module]["r"] = self.assigned[-1]
+            return
+        super().visit_stmt(m, s, stmt, modules, direction)
+
+    def visit_expr(self, m, s, expr):
+        pass
+
+
+def test_case_visited_whole_explores_every_feasible_arm():
+    _compilation, block = case_block()
+    case = case_of(block)
+    m, s = start_path()
+    s_sym = z3.BitVec("s_sym", 2)
+    s.pc.add(z3.Or(s_sym == 2, s_sym == 3), z3.BitVec("a_sym", 2) == 1, z3.BitVec("b_sym", 2) == 2)
+    visitor = Recorder()
+    visitor.visit_stmt(m, s, case, None, None)
+    assert not m.abandon
+    assert visitor.assigned == ["r <= 2;", "r <= 3;"]
+    # r holds a fresh symbol after the case, standing for whichever arm wrote it
+    assert s.store["top"]["r"] not in ("r_sym", "r <= 2;", "r <= 3;")
+    assert s.store["top"]["s"] == "s_sym"
+    # the arm guards are scoped to the arms
+    assert len(s.pc.assertions()) == 3
+
+
+def test_case_visited_whole_with_no_feasible_arm_abandons():
+    _compilation, block = case_block()
+    case = case_of(block)
+    m, s = start_path()
+    s.pc.add(z3.BitVec("a_sym", 2) == 1, z3.BitVec("a_sym", 2) == 2)
+    visitor = Recorder()
+    visitor.visit_stmt(m, s, case, None, None)
+    assert m.abandon and visitor.assigned == []
+
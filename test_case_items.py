@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Case items against the case expression at its declared width
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from pyverilog.vparser.parser import VerilogParser
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from helpers.bv_encoding import infer_widths
+from helpers.abstract_domain import AbstractStore
+from strategies.dfs import DepthFirst
+
+SOURCE = """
+module top(input [3:0] op); reg r;
+  always @(*) case (op) 2'd1: r = 1; 4'bxx01: r = 0; default: r = 0; endcase
+endmodule"""
+
+
+def take_item(item_index: int, direction: int, op_value: int) -> bool:
+    """Whether the path with op == op_value can take (direction 1) or skip one case item."""
+    ast = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(SOURCE)
+    module = ast.description.definitions[0]
+    case = module.items[-1].statement
+    m = ExecutionManager()
+    m.sig_widths, m.param_values, m.symbol_widths = {}, {}, {}
+    m.curr_module = "top"
+    m.cond_assigns = {"top": {}}
+    m.path_code = "0" * 4
+    m.curr_case = case
+    infer_widths(m, module)
+    s = SymbolicState()
+    s.pc = z3.Solver()
+    s.domain = AbstractStore()
+    s.store["top"] = {"op": "op_sym", "r": "r_sym"}
+    s.pc.add(z3.BitVec("op_sym", 4) == op_value)
+    DepthFirst().visit_stmt(m, s, case.caselist[item_index], None, direction)
+    return not m.abandon
+
+
+def test_narrow_literal_does_not_truncate_the_subject():
+    """op == 5 is 4'b0101; its low two bits are 2'd1, but the item doesn't match."""
+    assert not take_item(0, 1, 5)
+    assert take_item(0, 0, 5)
+    assert take_item(0, 1, 1)
+
+
+def test_item_with_x_digits_never_matches():
+    assert not take_item(1, 1, 1)
+    assert take_item(1, 0, 1)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+CFGs and path tables shared by instances with the same parameters, see engine/cfg_pool.py
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pyverilog.vparser.parser import VerilogParser
+from pyverilog.vparser.ast import InstanceList
+from engine.cfg_pool import CFGPool, parameter_overrides, definition_key
+from test_branch_correlation import module_cfgs
+
+TOP = """
+module top(input clk, input a);
+  sub #(.W(4)) u0(.clk(clk), .a(a));
+  sub #(.W(2 + 2)) u1(.clk(clk), .a(a));
+  sub #(.W(4)) u2(.clk(clk), .a(a));
+  sub #(.W(8)) u3(.clk(clk), .a(a));
+  sub u4(.clk(clk), .a(a));
+endmodule"""
+
+SUB = """
+module sub #(parameter W = 1) (input clk, input a); reg [W-1:0] x;
+  always @(posedge clk) begin if (a) x <= 1; else x <= 0; end
+endmodule"""
+
+
+def overrides() -> list:
+    """The parameter overrides of the sub instances of TOP, in instance order."""
+    top = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(TOP).description.definitions[0]
+    return [parameter_overrides(instance) for item in top.items if isinstance(item, InstanceList)
+            for instance in item.instances]
+
+
+def test_instances_with_the_same_overrides_share_cfgs_and_paths():
+    found = overrides()
+    assert found[0] == found[2] == (("W", "4"),)
+    assert found[1] == (("W", "(2 + 2)"),) and found[4] == ()
+    pool = CFGPool()
+    built, computed = [], []
+
+    def build():
+        built.append(1)
+        return module_cfgs(SUB), None
+
+    def compute(cfgs):
+        computed.append(1)
+        return [cfg.paths for cfg in cfgs]
+
+    entries, tables = [], []
+    for i in range(len(found)):
+        cfgs, _schedule = pool.get(definition_key("sub", found, i), build)
+        entries.append(cfgs)
+        tables.append(pool.table(cfgs, lambda: compute(cfgs)))
+    # u0 and u2 share; overrides are compared as written, so 2 + 2 is a definition of its own
+    assert entries[0] is entries[2] and tables[0] is tables[2]
+    assert len({id(cfgs) for cfgs in entries}) == 4
+    assert entries[1] is not entries[0] and entries[3] is not entries[0] and entries[4] is not entries[0]
+    assert (pool.builds, pool.hits) == (4, 1) and len(built) == 4 and len(computed) == 4
+    assert pool.summary() == "CFG pool: 4 definitions built, 1 instances shared"
+
+
+def test_instances_module_count_missed_get_no_overrides():
+    found = overrides()
+    assert definition_key("sub", found, 3) == ("sub", (("W", "8"),))
+    assert definition_key("sub", found, len(found)) == ("sub", ())
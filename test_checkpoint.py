@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Deadline signal handling and checkpoints, see engine/checkpoint.py
+"""
+
+import sys
+import os
+import signal
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from engine.checkpoint import Deadline, Checkpoint
+from engine.execution_manager import ExecutionManager
+from engine.properties import PropertySet, VIOLATED
+
+
+def test_handlers_installed_only_inside_the_block():
+    deadline = Deadline()
+    before = signal.getsignal(signal.SIGINT)
+    with deadline.handling_signals():
+        assert signal.getsignal(signal.SIGINT) == deadline.stop
+        assert signal.getsignal(signal.SIGTERM) == deadline.stop
+    assert signal.getsignal(signal.SIGINT) is before
+
+
+def test_second_sigint_raises():
+    deadline = Deadline()
+    with deadline.handling_signals():
+        os.kill(os.getpid(), signal.SIGINT)
+        assert deadline.expired()
+        with pytest.raises(KeyboardInterrupt):
+            os.kill(os.getpid(), signal.SIGINT)
+
+
+def test_handlers_restored_when_the_loop_is_left_early():
+    """The exploration loop iterates through a generator that holds the handlers."""
+    deadline = Deadline()
+    before = signal.getsignal(signal.SIGINT)
+
+    def paths():
+        with deadline.handling_signals():
+            yield from range(10)
+
+    def explore():
+        for i in paths():
+            if i == 2:
+                return i
+
+    assert explore() == 2
+    assert signal.getsignal(signal.SIGINT) is before
+
+
+def test_checkpoint_round_trip():
+    m = ExecutionManager()
+    m.properties = PropertySet()
+    m.properties.add("top:3", "bad")
+    m.properties.monitors["top:3"].status = VIOLATED
+    m.properties.monitors["top:3"].cycle = 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.json")
+        Checkpoint(path, "design:2").save(m, 7, 20, 7, 1.5)
+        resumed = ExecutionManager()
+        resumed.properties = PropertySet()
+        checkpoint = Checkpoint(path, "design:2")
+        assert checkpoint.restore(resumed, checkpoint.load(20)) == 7
+        assert resumed.properties.monitors["top:3"].status == VIOLATED
+        assert Checkpoint(path, "other:2").load(20) is None
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Constraint-independence slicing of branch feasibility queries, see helpers/constraint_slicing.py
+"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from helpers.constraint_slicing import ConstraintSlicer
+
+
+def path(*constraints):
+    """A path condition whose last constraint is the branch being taken, tracked like the engine does."""
+    solver = z3.Solver()
+    for i, c in enumerate(constraints):
+        solver.assert_and_track(c, f"p{i}")
+    return solver
+
+
+def full_solve(solver: z3.Solver) -> bool:
+    return solver.check() == z3.sat
+
+
+def test_unrelated_slice_is_answered_from_the_group_results():
+    x, y, z = z3.BitVecs("x y z", 8)
+    slicer = ConstraintSlicer()
+    first = path(x == 1, z3.UGT(y, 2))
+    assert slicer.feasible(first, z3.UGT(y, 2)) == full_solve(first) == True
+    # a different prefix over x and z leaves the same slice for the branch on y
+    second = path(x == 5, z == x + 1, z3.UGT(y, 2))
+    assert slicer.feasible(second, z3.UGT(y, 2)) == full_solve(second) == True
+    assert slicer.stats["cached"] == 1
+    assert slicer.stats["sliced"] == 2
+
+
+def test_connected_constraints_stay_in_the_slice():
+    x, y, z = z3.BitVecs("x y z", 8)
+    slicer = ConstraintSlicer()
+    # y is tied to x through z, so the branch on y sees x == 1
+    solver = path(x == 1, z == x, y == z, y == 2)
+    constraints = [x == 1, z == x, y == z, y == 2, z3.UGT(z3.BitVec("w", 8), 0)]
+    assert [str(c) for c in slicer.slice(constraints, y == 2)] == ["x == 1", "z == x", "y == z", "y == 2"]
+    assert slicer.feasible(solver, y == 2) == full_solve(solver) == False
+    assert slicer.stats["cached"] == 0
+
+
+def test_verdicts_match_a_full_solve():
+    rng = random.Random(0)
+    names = z3.BitVecs("a b c d e", 4)
+    slicer = ConstraintSlicer()
+    for _trial in range(200):
+        prefix = []
+        for _step in range(rng.randrange(1, 5)):
+            left, right = rng.sample(names, 2) if rng.random() < 0.3 else (rng.choice(names), None)
+            value = z3.BitVecVal(rng.randrange(16), 4)
+            c = rng.choice([lambda: left == (right if right is not None else value),
+                            lambda: z3.ULT(left, right if right is not None else value),
+                            lambda: left != value])()
+            # only satisfiable prefixes, as on an explored path
+            if z3.Solver().check(*prefix, c) == z3.sat:
+                prefix.append(c)
+        target = rng.choice([lambda x: x == rng.randrange(16), lambda x: z3.UGT(x, rng.randrange(16))])(rng.choice(names))
+        solver = path(*prefix, target)
+        assert slicer.feasible(solver, target) == full_solve(solver), (prefix, target)
+    assert slicer.stats["cached"] > 0
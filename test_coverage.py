@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Coverage guided path order and coverage curve, see strategies/coverage.py
+"""
+
+import sys
+import os
+from itertools import product
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engine.execution_manager import ExecutionManager
+from strategies.coverage import CoverageGuided, path_branches
+from test_branch_correlation import module_cfgs
+
+SOURCE = """
+module top(input clk, input a); reg x;
+  always @(posedge clk) begin if (a) x <= 1; else x <= 0; end
+endmodule"""
+
+
+def explore(strategy: CoverageGuided, sim_covered=()) -> list:
+    """Order the two-cycle paths, covering the directions of each path as it is explored."""
+    (cfg,) = module_cfgs(SOURCE)
+    cfgs_by_module = {"top": [cfg]}
+    total_paths = [{"top": [(taken,) for taken in cycles]} for cycles in product(cfg.paths, repeat=2)]
+    m = ExecutionManager()
+    m.sim_covered = set(sim_covered)
+    order = []
+    for i in strategy.order(m, 0, total_paths, cfgs_by_module):
+        order.append(i)
+        for cycle, (cfg_path,) in enumerate(total_paths[i]["top"]):
+            for line, direction in path_branches(cfg, cfg_path):
+                strategy.covered |= strategy.bit(("top", line, direction, cycle))
+        strategy.finish_path(m, i)
+    return order
+
+
+def test_paths_adding_the_most_directions_come_first():
+    # paths 0..3 take (a, a), (a, !a), (!a, a), (!a, !a) in the two cycles
+    order = explore(CoverageGuided())
+    assert order[:2] == [0, 3]
+    assert sorted(order) == [0, 1, 2, 3]
+
+
+def test_simulated_directions_are_not_sought_again():
+    order = explore(CoverageGuided(), sim_covered={("top", 3, 1, 0), ("top", 3, 1, 1)})
+    # simulation took a in both cycles, so (a, a) would add nothing and (!a, !a) comes first
+    assert order[0] == 3
+
+
+def test_curve_records_each_coverage_increase(capsys):
+    strategy = CoverageGuided()
+    explore(strategy)
+    assert [(paths, covered) for _, paths, covered in strategy.curve] == [(1, 2), (2, 4)]
+    strategy.report()
+    out = capsys.readouterr().out
+    assert "Branch coverage: 4 of 4 directions after 4 paths, 0 found infeasible" in out
+    assert "2 paths: 4 directions" in out
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Store tables of an elaborated SystemVerilog design, see engine/elaboration.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+import pyslang as ps
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from engine.elaboration import elaborate, attach, init_store
+from helpers.bv_encoding import lower_store_value
+
+SOURCE = """
+module child #(parameter W = 1) (input [3:0] a, output [3:0] q, output [3:0] r, output [3:0] k);
+  localparam L = W + 1;
+  assign q = a;
+  assign r = a + L;
+  assign k = L;
+endmodule
+module top(input [3:0] x);
+  wire [3:0] q0, r0, k0, q1, r1, k1;
+  child #(.W(1)) c0(.a(x), .q(q0), .r(r0), .k(k0));
+  child #(.W(2)) c1(.a(x), .q(q1), .r(r1), .k(k1));
+  child #(.W(1)) c2(.a(x), .q(), .r(), .k());
+endmodule"""
+
+
+def start_path():
+    compilation = ps.Compilation()
+    compilation.addSyntaxTree(ps.SyntaxTree.fromText(SOURCE))
+    tables = elaborate(compilation)
+    m = ExecutionManager()
+    m.sig_widths, m.param_values, m.symbol_widths = {}, {}, {}
+    m.names_list = list(tables)
+    attach(m, tables)
+    s = SymbolicState()
+    s.pc = z3.Solver()
+    init_store(m, s, tables)
+    return tables, m, s
+
+
+def test_instances_get_their_own_parameter_values():
+    tables, m, s = start_path()
+    assert sorted(tables) == ["child_0", "child_1", "child_2", "top"]
+    assert tables["child_0"] is tables["child_2"]
+    assert m.param_values["child_0"]["L"] == 2
+    assert m.param_values["child_1"]["L"] == 3
+    assert s.store["child_0"]["k"] == "2"
+    assert s.store["child_1"]["k"] == "3"
+
+
+def test_continuous_assigns_drive_their_outputs():
+    _, m, s = start_path()
+    store = s.store["child_1"]
+    assert store["q"] == store["a"]
+    a, r = lower_store_value(m, store["a"], 4), lower_store_value(m, store["r"], 4)
+    s.pc.add(r != a + 3)
+    assert s.pc.check() == z3.unsat
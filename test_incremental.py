@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Property results reused across runs by context hash, see engine/incremental.py
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pyverilog.vparser.parser import VerilogParser
+from engine.incremental import ResultCache
+from engine.properties import PropertySet, HOLDS, UNKNOWN
+
+CHILD = """
+module child(input clk, input a);
+  always @(posedge clk) begin if (a) $display("bad"); end
+endmodule"""
+
+TOP = """
+module top(input clk, input x); child c(.clk(clk), .a(%s)); endmodule"""
+
+OTHER = """
+module other(input clk); endmodule"""
+
+
+def definitions(parent_drive: str, other: str = "") -> dict:
+    ast = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(CHILD + TOP % parent_drive + other)
+    return {module.name: module for module in ast.description.definitions}
+
+
+def rerun(first: dict, second: dict) -> bool:
+    """Whether the second run reuses the child result the first run saved."""
+    path = os.path.join(tempfile.mkdtemp(), "results.json")
+    properties = PropertySet()
+    properties.add("child:3", "bad")
+    cache = ResultCache(path)
+    cache.reuse(properties, first, 2)
+    properties.monitors["child:3"].status = HOLDS
+    cache.save(properties, 2)
+    properties = PropertySet()
+    properties.add("child:3", "bad")
+    ResultCache(path).reuse(properties, second, 2)
+    return properties.monitors["child:3"].status != UNKNOWN
+
+
+def test_unchanged_design_reuses_the_child_result():
+    assert rerun(definitions("1'b0"), definitions("1'b0"))
+
+
+def test_parent_edit_invalidates_the_child_result():
+    """The child's a input was tied low, so its call held; now the parent drives it from x."""
+    assert not rerun(definitions("1'b0"), definitions("x"))
+
+
+def test_unrelated_definition_keeps_the_child_result():
+    assert rerun(definitions("1'b0"), definitions("1'b0", OTHER))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Levelized evaluation of the continuous assigns, see engine/levelize.py
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pyverilog.vparser.parser import VerilogParser
+from pyverilog.vparser.ast import Assign, Always
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from engine.levelize import CombNetwork
+from engine.signal_index import identifiers
+
+SOURCE = """
+module top(input a, output d, output h);
+  wire b, c;
+  reg h;
+  assign d = c;
+  assign c = b + 1;
+  assign b = a & 1;
+  always @(*) h = d;
+endmodule"""
+
+LOOPS = """
+module top(input a, output e);
+  wire f, g;
+  assign e = f;
+  assign f = e ^ a;
+  assign g = g + 1;
+endmodule"""
+
+
+def items(source: str) -> list:
+    ast = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(source)
+    return ast.description.definitions[0].items
+
+
+def lhs(assign) -> str:
+    return sorted(identifiers(assign.left))[0]
+
+
+def test_assigns_are_ordered_after_their_drivers():
+    module = items(SOURCE)
+    assigns = [item for item in module if isinstance(item, Assign)]
+    block = next(item for item in module if isinstance(item, Always))
+    # an assign collected twice, e.g. once per CFG, is one node
+    network = CombNetwork(assigns + assigns[:1], {0: block})
+    assert len(network.assigns) == 4 and network.blocks == {3: 0}
+    assert network.levels == [[2], [1], [0], [3]]
+    assert [lhs(network.assigns[i]) for i in network.order[:3]] == ["b", "c", "d"]
+    assert network.loops == []
+
+
+def test_combinational_loops_are_found_in_the_condensation():
+    network = CombNetwork([item for item in items(LOOPS) if isinstance(item, Assign)])
+    # e and f drive each other, g drives itself
+    assert sorted(network.loops) == [["e", "f"], ["g"]]
+    # every assign is still visited once per cycle
+    assert sorted(network.order) == [0, 1, 2]
+
+
+def test_unchanged_inputs_are_skipped():
+    module = items(SOURCE)
+    network = CombNetwork([item for item in module if isinstance(item, Assign)])
+    m = ExecutionManager()
+    m.curr_module = "top"
+    s = SymbolicState()
+    s.store["top"] = {"a": "a0", "b": "b0", "c": "c0", "d": "d0"}
+    visited = []
+
+    def visit(assign):
+        # the value of an assign is a function of its inputs, like the symbolic visitor's
+        store = s.store["top"]
+        visited.append(lhs(assign))
+        store[lhs(assign)] = "f(" + ",".join(store[name] for name in sorted(identifiers(assign.right))) + ")"
+
+    network.evaluate(m, s, visit)
+    assert visited == ["b", "c", "d"]
+    assert s.store["top"]["d"] == "f(f(f(a0)))"
+    visited.clear()
+    network.evaluate(m, s, visit)
+    assert visited == [] and network.skips == 3
+    # a new input only revisits what depends on it
+    s.store["top"]["a"] = "a1"
+    network.evaluate(m, s, visit)
+    assert visited == ["b", "c", "d"]
+    # an output written elsewhere revisits its assign, even when the inputs are the same; it gets
+    # back its old value, so what reads it is still skipped
+    visited.clear()
+    s.store["top"]["c"] = "c9"
+    network.evaluate(m, s, visit)
+    assert visited == ["c"] and s.store["top"]["c"] == "f(f(a1))"
+    # a new path starts with nothing memoized
+    visited.clear()
+    network.reset()
+    network.evaluate(m, s, visit)
+    assert visited == ["b", "c", "d"]
+    assert network.visits == 10
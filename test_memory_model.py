@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Branches on unpacked array elements, see helpers/memory_model.py
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from pyverilog.vparser.parser import VerilogParser
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from helpers.bv_encoding import infer_widths
+from helpers.abstract_domain import AbstractStore
+from helpers.memory_model import Memory
+from strategies.dfs import DepthFirst
+
+SOURCE = """
+module top(input [1:0] i); reg [3:0] mem [0:3]; reg r;
+  always @(*) begin if (mem[i]) r = 1; end
+  always @(*) case (mem[i]) 4'd5: r = 1; default: r = 0; endcase
+endmodule"""
+
+
+def start(value: int):
+    """A path where every element of mem holds value."""
+    ast = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(SOURCE)
+    module = ast.description.definitions[0]
+    m = ExecutionManager()
+    m.sig_widths, m.param_values, m.symbol_widths = {}, {}, {}
+    m.memory_model = True
+    m.memory_reads = {}
+    m.curr_module = "top"
+    m.cond_assigns = {"top": {}}
+    m.path_code = "0" * 4
+    infer_widths(m, module)
+    s = SymbolicState()
+    s.pc = z3.Solver()
+    s.domain = AbstractStore()
+    array = z3.K(z3.BitVecSort(2), z3.BitVecVal(value, 4))
+    s.store["top"] = {"i": "i_sym", "r": "r_sym", "mem": Memory("mem", array)}
+    return module, m, s
+
+
+def test_bare_memory_element_condition_is_constrained():
+    module, m, s = start(0)
+    condition = module.items[-2].statement.statements[0].cond
+    strategy = DepthFirst()
+    strategy.branch = True
+    strategy.visit_expr(m, s, condition)
+    assert m.abandon
+    module, m, s = start(0)
+    strategy.branch = False
+    strategy.visit_expr(m, s, condition)
+    assert not m.abandon
+
+
+def test_case_on_memory_element_is_constrained():
+    module, m, s = start(5)
+    case = module.items[-1].statement
+    m.curr_case = case
+    DepthFirst().visit_stmt(m, s, case.caselist[0], None, 0)
+    assert m.abandon
+    module, m, s = start(5)
+    m.curr_case = case
+    DepthFirst().visit_stmt(m, s, case.caselist[0], None, 1)
+    assert not m.abandon
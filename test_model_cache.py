@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Counterexample cache in front of the solver, see helpers/model_cache.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from helpers.model_cache import ModelCache
+from helpers.rvalue_to_z3 import solve_pc
+
+
+class Store:
+    """The get/set of the Redis client the persistent cache goes through, in memory."""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = str(value).encode()
+
+
+def symbols():
+    return z3.BitVec("x", 8), z3.BitVec("y", 8)
+
+
+def test_subset_of_a_sat_set_is_sat():
+    x, y = symbols()
+    cache = ModelCache()
+    cache.record_constraints([x == 1, y == 2, z3.ULT(x, y)], "sat")
+    assert cache.lookup_constraints([x == 1, z3.ULT(x, y)]) is True
+    assert cache.stats["subset"] == 1
+
+
+def test_superset_of_an_unsat_set_is_unsat():
+    x, y = symbols()
+    cache = ModelCache()
+    cache.record_constraints([x == 1, x == 2], "unsat")
+    assert cache.lookup_constraints([y == 0, x == 2, x == 1]) is False
+    assert cache.stats["superset"] == 1
+    # a subset of an unsat set says nothing
+    assert cache.lookup_constraints([x == 1]) is None
+    assert cache.stats["miss"] == 1
+
+
+def test_a_cached_model_answers_a_new_query_it_satisfies():
+    x, y = symbols()
+    cache = ModelCache()
+    solver = z3.Solver()
+    solver.add(x == 5, y == x + 1)
+    assert solve_pc(solver, cache)
+    assert cache.stats["miss"] == 1
+    # not a subset of the solved set, but x = 5, y = 6 satisfies it
+    query = z3.Solver()
+    query.add(z3.UGT(y, x), x != 0)
+    assert solve_pc(query, cache)
+    assert cache.stats["model"] == 1
+    # the set it answered is remembered, so asking again is a subset hit
+    assert cache.lookup(query) is True
+    assert cache.stats["subset"] == 1
+    # a query the model violates is not answered by it
+    assert cache.lookup_constraints([x == 7]) is None
+
+
+def test_tracked_constraints_are_cached_by_their_bodies():
+    x, _y = symbols()
+    cache = ModelCache()
+    solver = z3.Solver()
+    solver.assert_and_track(x == 3, "p1")
+    assert solve_pc(solver, cache)
+    assert cache.lookup_constraints([x == 3]) is True
+
+
+def test_persistent_cache_round_trip():
+    x, y = symbols()
+    store = Store()
+    first = ModelCache(persistent=store)
+    first.record_constraints([x == 1, y == 2], "sat")
+    first.record_constraints([x == 1, x == 2], "unsat")
+    first.record_constraints([z3.ULT(x, y)], "unknown")
+    assert len(store.data) == 2
+    # a later run starts with empty memory and finds the results in the store, in any order
+    second = ModelCache(persistent=store)
+    x, y = symbols()
+    assert second.lookup_constraints([y == 2, x == 1]) is True
+    assert second.lookup_constraints([x == 2, x == 1]) is False
+    assert second.lookup_constraints([z3.ULT(x, y)]) is None
+    assert second.stats["persistent"] == 2 and second.stats["miss"] == 1
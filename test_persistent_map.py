@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Persistent maps behind the symbolic store, see helpers/persistent_map.py
+"""
+
+import sys
+import os
+import copy
+import random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from helpers.persistent_map import PersistentMap, SymbolicStore
+from engine.symbolic_state import SymbolicState
+
+
+class Key:
+    """A key with a chosen hash, to force shared trie prefixes and full hash collisions."""
+    def __init__(self, name: str, h: int):
+        self.name = name
+        self.h = h
+
+    def __hash__(self) -> int:
+        return self.h
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Key) and self.name == other.name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+def test_matches_a_dict_under_random_updates():
+    rng = random.Random(0)
+    expected = {}
+    versions = []
+    pmap = PersistentMap()
+    for step in range(2000):
+        key = rng.randrange(300)
+        if rng.random() < 0.3:
+            expected.pop(key, None)
+            pmap = pmap.delete(key)
+        else:
+            expected[key] = step
+            pmap = pmap.set(key, step)
+        if step % 100 == 0:
+            versions.append((pmap, dict(expected)))
+    assert dict(pmap.items()) == expected
+    assert len(pmap) == len(expected)
+    # every older version still holds what it held when it was taken
+    for version, contents in versions:
+        assert dict(version.items()) == contents
+
+
+def test_colliding_keys_are_kept_apart_and_deleted():
+    # same low bits for several trie levels, and a full collision
+    a, b, c = Key("a", 1), Key("b", 1 | (1 << 40)), Key("c", 1)
+    pmap = PersistentMap().set(a, 1).set(b, 2).set(c, 3)
+    assert (pmap[a], pmap[b], pmap[c]) == (1, 2, 3)
+    smaller = pmap.delete(c)
+    assert c not in smaller and smaller[a] == 1 and len(smaller) == 2
+    assert pmap[c] == 3
+    empty = smaller.delete(a).delete(b)
+    assert len(empty) == 0 and list(empty) == []
+    # deleting a missing key gives back the same map
+    assert smaller.delete(Key("d", 1)) is smaller
+
+
+def test_forked_stores_are_isolated():
+    store = SymbolicStore()
+    store["top"] = {"a": "a0", "b": "b0"}
+    fork = store.fork()
+    fork["top"]["a"] = "a1"
+    store["top"]["b"] = "b1"
+    del fork["top"]["b"]
+    assert dict(store["top"].items()) == {"a": "a0", "b": "b1"}
+    assert dict(fork["top"].items()) == {"a": "a1"}
+    state = SymbolicState()
+    state.store = store
+    copied = copy.deepcopy(state.store)
+    copied["top"]["a"] = "a2"
+    assert state.store["top"]["a"] == "a0"
+
+
+def test_snapshot_is_unchanged_by_later_writes():
+    store = SymbolicStore()
+    store["top"] = {"a": "a0"}
+    store["child_0"] = {"q": "q0"}
+    snapshot = store.snapshot()
+    store["top"]["a"] = "a1"
+    del store["child_0"]
+    assert "child_0" not in store
+    store.restore(snapshot)
+    assert store["top"]["a"] == "a0"
+    assert store["child_0"]["q"] == "q0"
+
+
+def test_iterating_a_module_while_writing_it():
+    store = SymbolicStore()
+    store["top"] = {f"s{i}": str(i) for i in range(40)}
+    for name in store["top"]:
+        store["top"][name + "_next"] = name
+        del store["top"][name]
+    assert sorted(store["top"]) == sorted(f"s{i}_next" for i in range(40))
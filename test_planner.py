@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Dry-run path and query counts, see engine/planner.py
+"""
+
+import sys
+import os
+import tempfile
+from itertools import product
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pyverilog.vparser.parser import VerilogParser
+from pyverilog.vparser.ast import Always
+from engine.planner import PathPlan, magnitude
+from engine.scheduler import Schedule, changing_signals
+from test_branch_correlation import module_cfgs
+
+TOP = """
+module top(input clk, input a, input b); reg x, y, z, w, stuck;
+  always @(posedge clk) begin if (a) x <= 1; else x <= 0; end
+  always @(posedge clk) begin if (a) y <= 1; else y <= 0; end
+  always @(posedge clk) begin if (b) z <= 1; else z <= 0; end
+  always @(posedge stuck) begin if (b) w <= 1; else w <= 0; end
+endmodule"""
+
+SUB = """
+module sub(input clk, input [1:0] s); reg [1:0] q;
+  always @(posedge clk) begin case (s) 2'd0: q <= 1; 2'd1: q <= 2; endcase end
+endmodule"""
+
+
+def schedule(source: str) -> Schedule:
+    top = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(source).description.definitions[0]
+    return Schedule([item for item in top.items if isinstance(item, Always)], changing_signals(top))
+
+
+def enumerate_design(cfgs_by_module: dict, num_cycles: int, live=None):
+    """(paths, decisions) by walking every multi cycle path, as the exploration loop would."""
+    plan = PathPlan(cfgs_by_module, num_cycles)
+    single = {}
+    for name, cfgs in cfgs_by_module.items():
+        keep = live.get(name, range(len(cfgs))) if live else range(len(cfgs))
+        decisions = [plan.modules[name].cfgs[k].decisions if k in keep else [0] for k in range(len(cfgs))]
+        single[name] = [sum(choice) for choice in product(*decisions)]
+    paths, queries = 0, 0
+    for cycles in product(*(product(counts, repeat=num_cycles) for counts in single.values())):
+        paths += 1
+        queries += sum(sum(cycle) for cycle in cycles)
+    return paths, queries
+
+
+def test_counts_of_a_known_design():
+    cfgs_by_module = {"top": module_cfgs(TOP), "sub": module_cfgs(SUB)}
+    plan = PathPlan(cfgs_by_module, 2)
+    top, sub = plan.modules["top"], plan.modules["sub"]
+    assert [cfg.paths for cfg in top.cfgs] == [2, 2, 2, 2]
+    assert [cfg.decisions for cfg in top.cfgs] == [[1, 1]] * 4
+    # two items and the implicit default arm
+    assert (sub.cfgs[0].paths, sub.cfgs[0].arms) == (3, 3)
+    assert (top.single, sub.single) == (16, 3)
+    # 4 decisions on each of the 16 paths, 1 on each of the 3
+    assert (top.single_decisions, sub.single_decisions) == (64, 3)
+    single = {"top": 16, "sub": 3}
+    decisions = {"top": 64, "sub": 3}
+    assert plan.paths(single, 2) == 16 ** 2 * 3 ** 2
+    assert (plan.paths(single, 2), plan.queries(single, decisions)) == enumerate_design(cfgs_by_module, 2)
+
+
+def test_schedule_drops_blocks_that_never_run():
+    cfgs_by_module = {"top": module_cfgs(TOP), "sub": module_cfgs(SUB)}
+    plan = PathPlan(cfgs_by_module, 2, {"top": schedule(TOP)})
+    top = plan.modules["top"]
+    assert top.never == [3]
+    assert (top.scheduled, top.scheduled_decisions) == (8, 24)
+    scheduled = {name: module.scheduled for name, module in plan.modules.items()}
+    decisions = {name: module.scheduled_decisions for name, module in plan.modules.items()}
+    expected = enumerate_design(cfgs_by_module, 2, {"top": [0, 1, 2]})
+    # the never triggered block still counts as one path per cycle, now taking no decisions
+    assert (plan.paths(scheduled, 2), plan.queries(scheduled, decisions)) == expected
+
+
+def test_correlated_branches_keep_the_consistent_combinations():
+    plan = PathPlan({"top": module_cfgs(TOP)}, 3)
+    # the two blocks branching on a agree, and so do the two branching on b: 4 of 16 combinations
+    assert plan.modules["top"].correlated == 4
+    assert PathPlan({"sub": module_cfgs(SUB)}, 3).modules["sub"].correlated == 3
+
+
+def test_report(capsys):
+    cfgs = module_cfgs(SUB)
+    plan = PathPlan({"top": module_cfgs(TOP), "u0": cfgs, "u1": cfgs}, 2, {"top": schedule(TOP)})
+    plan.report()
+    out = capsys.readouterr().out
+    assert "u1 (shares its CFGs with u0)" in out
+    assert "cfg 3: 3 blocks, 1 branches, 0 case arms, 2 paths, 1..1 decisions per path, never triggered" in out
+    assert f"Total: {16 ** 2 * 9 ** 2} paths" in out
+    assert f"with --schedule: {8 ** 2 * 9 ** 2} paths" in out
+    assert f"with --correlate_branches: {4 ** 2 * 9 ** 2} paths" in out
+    assert magnitude(12345678901) == "12345678901 (~1.23e10)"
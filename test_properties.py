@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Per-property monitors of --multi_property, see engine/properties.py
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from pyverilog.vparser.parser import VerilogParser
+from engine.properties import PropertySet, system_calls, UNKNOWN
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class Blocks:
+    """Stands in for a CFG: only the basic blocks are read when collecting."""
+    def __init__(self, basic_block_list):
+        self.basic_block_list = basic_block_list
+
+
+def test_collect_finds_system_calls_in_blocks():
+    ast = VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse("""
+module top(input clk, input a);
+  always @(posedge clk) begin
+    if (a) begin
+      $display("one");
+      $error("two");
+    end
+  end
+endmodule""")
+    block = ast.description.definitions[0].items[-1].statement.statements[0].true_statement
+    assert [call.syscall for call in system_calls(block)] == ["display", "error"]
+    properties = PropertySet()
+    properties.collect({"top": [Blocks([[], [block]])]})
+    assert len(properties.monitors) == 2
+    assert set(properties.blocks) == {("top", 0, 1)}
+    assert all(monitor.status == UNKNOWN for monitor in properties.monitors.values())
+
+
+def test_sv_multi_property_needs_check_sva():
+    """The slang CFGs hold syntax nodes, so without compiled SVA monitors nothing would be checked."""
+    pytest.importorskip("engine.execution_engine", exc_type=ImportError)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "top.sv")
+        with open(source, "w") as f:
+            f.write("module top(input clk); endmodule\n")
+        run = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "1", source, "--sv", "--multi_property"],
+                             cwd=tmp, capture_output=True, text=True)
+    assert run.returncode == 2
+    assert "--check_sva" in run.stderr
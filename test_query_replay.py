@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Solver queries recorded with timed_check and replayed offline, see helpers/query_log.py and query_replay.py
+"""
+
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from helpers.model_cache import ModelCache
+from helpers.query_log import QueryLog, timed_check
+from query_replay import load_queries, replay
+
+OPTIONS = SimpleNamespace(tactic=None, timeout=0, settings=[], repeat=1)
+
+
+def record(path: str) -> list:
+    """Log a sat, an unsat, a tracked and a sliced query; the results timed_check gave."""
+    x, y = z3.BitVecs("x y", 8)
+    QueryLog.active = QueryLog(path)
+    results = []
+    try:
+        QueryLog.active.note_branch(SimpleNamespace(curr_module="top", cycle=2), "top:x < y")
+        solver = z3.Solver()
+        solver.add(z3.ULT(x, y), x + y == 10)
+        results.append(timed_check(solver, "solve_pc"))
+        solver.add(x == y)
+        results.append(timed_check(solver, "solve_pc"))
+        tracked = z3.Solver()
+        tracked.assert_and_track(x * 3 == 7, "p1")
+        results.append(timed_check(tracked, "branch"))
+        sliced = z3.Solver()
+        sliced.add(y == 1)
+        results.append(timed_check(sliced, "slice", [y == 1, y != 1]))
+    finally:
+        QueryLog.active.close()
+        QueryLog.active = None
+    return results
+
+
+def test_recorded_queries_replay_to_the_same_results():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.jsonl.gz")
+        results = record(path)
+        assert results == ["sat", "unsat", "sat", "sat"]
+        entries = list(load_queries(path))
+    assert [entry["id"] for entry in entries] == [0, 1, 2, 3]
+    assert [entry["result"] for entry in entries] == results
+    assert (entries[0]["module"], entries[0]["cycle"], entries[0]["branch"]) == ("top", 2, "top:x < y")
+    # the tracked constraint is logged without its tracking literal, so it replays on its own
+    assert entries[2]["size"] == 1 and "p1" not in entries[2]["smt2"]
+    replayed = [replay(entry, OPTIONS)[0] for entry in entries]
+    # the sliced query was logged with the constraints passed in, which are unsat
+    assert replayed == ["sat", "unsat", "sat", "unsat"]
+
+
+def test_replay_by_source_and_through_the_model_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.jsonl.gz")
+        record(path)
+        assert [entry["id"] for entry in load_queries(path, "solve_pc")] == [0, 1]
+        cache = ModelCache()
+        first = [replay(entry, OPTIONS, cache) for entry in load_queries(path)]
+        again = [replay(entry, OPTIONS, cache) for entry in load_queries(path)]
+    assert [result for result, _time, _cached in first] == [result for result, _time, _cached in again]
+    assert not any(cached for _result, _time, cached in first[:2])
+    assert all(cached for _result, _time, cached in again)
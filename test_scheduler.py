@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Procedural blocks scheduled by their timing control, see engine/scheduler.py
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+import pyslang as ps
+from pyverilog.vparser.parser import VerilogParser
+from pyverilog.vparser.ast import Always, NonblockingSubstitution
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from engine.scheduler import Schedule, changing_signals, CLOCKED, COMB, NEVER, LATCH
+from test_branch_correlation import module_cfgs
+
+SOURCE = """
+module top(input clk, input d, output reg q, output reg r);
+  reg stuck, y, z;
+  always @(posedge clk) q <= d;
+  always @(*) r = q;
+  always @(d or q) y = d & q;
+  always @(posedge stuck) z <= d;
+endmodule"""
+
+SWAP = """
+module top(input clk); reg a, b;
+  always @(posedge clk) a <= b;
+  always @(posedge clk) b <= a;
+endmodule"""
+
+SV_SOURCE = """
+module top(input clk, input d, output logic q, output logic r, output logic l);
+  always_ff @(posedge clk) q <= d;
+  always_comb r = q;
+  always_latch if (clk) l = d;
+  initial q = 0;
+  always @(d) r = d;
+endmodule"""
+
+
+def module(source: str):
+    return VerilogParser(outputdir=tempfile.gettempdir(), debug=False).parse(source).description.definitions[0]
+
+
+def test_blocks_are_classified_by_their_timing():
+    top = module(SOURCE)
+    blocks = [item for item in top.items if isinstance(item, Always)]
+    schedule = Schedule(blocks, changing_signals(top))
+    # nothing drives stuck, so its block never runs
+    assert schedule.kinds == [CLOCKED, COMB, COMB, NEVER]
+    assert (schedule.clocked, schedule.comb, schedule.never) == ([0], [1, 2], [3])
+    assert set(schedule.comb_blocks) == {1, 2}
+    assert schedule.summary() == "1 clocked, 2 combinational, 1 never triggered"
+    # without the signals that change, the edge is taken on trust
+    assert Schedule(blocks).kinds[3] == CLOCKED
+
+
+def test_sv_blocks_are_classified_by_their_procedure():
+    compilation = ps.Compilation()
+    compilation.addSyntaxTree(ps.SyntaxTree.fromText(SV_SOURCE))
+    body = compilation.getRoot().topInstances[0].body
+    blocks = [member for member in body if member.kind == ps.SymbolKind.ProceduralBlock]
+    schedule = Schedule(blocks)
+    assert schedule.kinds == [CLOCKED, COMB, LATCH, NEVER, COMB]
+    assert schedule.comb == [1, 2, 4] and schedule.comb_blocks == {}
+
+
+def test_prune_leaves_one_empty_path_for_blocks_that_never_run():
+    top = module(SOURCE)
+    cfgs = module_cfgs(SOURCE)
+    schedule = Schedule([item for item in top.items if isinstance(item, Always)], changing_signals(top))
+    paths = [list(cfg.paths) for cfg in cfgs]
+    schedule.prune(cfgs)
+    assert cfgs[3].paths == [()]
+    assert [cfg.paths for cfg in cfgs[:3]] == paths[:3]
+
+
+class Assigner:
+    """Runs the non-blocking assignments of a CFG path by copying the right hand side's value."""
+    def visit_stmt(self, m, s, stmt, modules, direction):
+        if isinstance(stmt, NonblockingSubstitution):
+            s.store[m.curr_module][stmt.left.var.name] = s.store[m.curr_module][stmt.right.var.name]
+
+
+def test_clocked_blocks_see_the_store_from_before_the_edge():
+    execution_engine = pytest.importorskip("engine.execution_engine", exc_type=ImportError)
+    top = module(SWAP)
+    cfgs = module_cfgs(SWAP)
+    engine = execution_engine.ExecutionEngine()
+    engine.search_strategy = Assigner()
+    m = ExecutionManager()
+    m.curr_module = "top"
+    m.schedules = {"top": Schedule([item for item in top.items if isinstance(item, Always)], changing_signals(top))}
+    m.comb_networks = None
+    s = SymbolicState()
+    s.store["top"] = {"a": "a0", "b": "b0"}
+    path = [cfg.paths[0] for cfg in cfgs]
+    engine.scheduled_cycle(m, s, "top", path, cfgs, {})
+    # both blocks read the old values, so the registers swap instead of both becoming b0
+    assert (s.store["top"]["a"], s.store["top"]["b"]) == ("b0", "a0")
+    engine.scheduled_cycle(m, s, "top", path, cfgs, {})
+    assert (s.store["top"]["a"], s.store["top"]["b"]) == ("a0", "b0")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Event-driven propagation of always block updates, see engine/signal_index.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from engine.signal_index import UpdateTable
+from strategies.dfs import DepthFirst
+
+
+def manager(event_driven: bool) -> tuple:
+    """b follows a, and a was just written over its previous symbol a0."""
+    m = ExecutionManager()
+    m.event_driven = event_driven
+    m.curr_module = "top"
+    m.dependencies = {"top": {"b": "a"}}
+    m.cond_assigns = {"top": {}}
+    m.updates = UpdateTable({"a": (1, "a0"), "b": (0, None)})
+    s = SymbolicState()
+    s.store["top"] = {"a": "a1", "b": "a0"}
+    return m, s
+
+
+def test_propagation_matches_the_full_walk():
+    for event_driven in (False, True):
+        m, s = manager(event_driven)
+        DepthFirst().propagate_updates(m, s)
+        assert s.store["top"]["b"] == "a1"
+
+
+def test_propagated_updates_are_no_longer_dirty():
+    m, s = manager(True)
+    DepthFirst().propagate_updates(m, s)
+    assert m.updates.dirty == {}
+    m.updates["c"] = (1, "c0")
+    assert list(m.updates.dirty) == ["c"]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Adaptive timeouts and the solver race for hard queries, see engine/solver_portfolio.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+from engine.solver_portfolio import SolverPortfolio
+from helpers.query_log import timed_check
+
+
+def easy(satisfiable: bool):
+    x, y = z3.BitVecs("x y", 8)
+    solver = z3.Solver()
+    solver.add(z3.ULT(x, y), x + y == 10)
+    if not satisfiable:
+        solver.add(x == y)
+    return solver
+
+
+def hard():
+    """Factoring a 62 bit semiprime, far beyond a millisecond."""
+    x, y = z3.BitVecs("x y", 64)
+    solver = z3.Solver()
+    solver.add(x * y == 2305843009213693951 * 3, z3.UGT(x, 3), z3.UGT(y, 3), z3.ULT(x, 1 << 32), z3.ULT(y, 1 << 32))
+    return solver
+
+
+def test_easy_queries_are_answered_incrementally():
+    portfolio = SolverPortfolio()
+    SolverPortfolio.active = portfolio
+    try:
+        assert timed_check(easy(True), "solve_pc") == "sat"
+        assert timed_check(easy(False), "solve_pc") == "unsat"
+    finally:
+        SolverPortfolio.active = None
+        portfolio.close()
+    assert portfolio.stats == {"incremental": 2, "raced": 0, "unknown": 0}
+    assert len(portfolio.latencies) == 2
+
+
+def test_the_race_agrees_with_the_solver():
+    portfolio = SolverPortfolio()
+    try:
+        result, winner = portfolio.race(easy(True).assertions())
+        assert result == "sat" and winner in [name for name, _, _ in portfolio.configs]
+        result, _ = portfolio.race(easy(False).assertions())
+        assert result == "unsat"
+        # the workers that lost the first race were restarted for the second
+        assert all(process.is_alive() for process, _ in portfolio.workers.values())
+    finally:
+        portfolio.close()
+
+
+def test_a_query_nothing_decides_falls_back_to_unknown():
+    portfolio = SolverPortfolio(first_timeout=1, hard_timeout=1)
+    solver = hard()
+    try:
+        assert portfolio.check(solver, "branch") == "unknown"
+    finally:
+        portfolio.close()
+    assert portfolio.stats == {"incremental": 0, "raced": 1, "unknown": 1}
+    assert portfolio.unknowns == {"branch": 1} and portfolio.wins == {}
+
+
+def test_timeout_adapts_to_the_observed_latency():
+    portfolio = SolverPortfolio(first_timeout=2000, min_timeout=100, factor=10.0)
+    assert portfolio.timeout() == 2000
+    portfolio.latencies.extend([0.001] * 20)
+    assert portfolio.timeout() == 100
+    portfolio.latencies.extend([0.05] * 100)
+    assert portfolio.timeout() == 500
+    portfolio.latencies.extend([1.0] * 200)
+    assert portfolio.timeout() == 2000
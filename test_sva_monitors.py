@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+SVA monitors compiled per module definition, see engine/sva_monitors.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import z3
+import pyslang as ps
+from engine.execution_manager import ExecutionManager
+from engine.symbolic_state import SymbolicState
+from engine.properties import PropertySet, VIOLATED, UNKNOWN
+from engine.sva_monitors import build_monitors
+from helpers.abstract_domain import AbstractStore
+
+SOURCE = """
+module child(input clk, input a, input b, input [1:0] s);
+  always @(posedge clk) begin
+    if (a) begin
+      assert (b);
+    end else begin
+      case (s) 2'd1, 2'd2: assert (!b); default: ; endcase
+    end
+  end
+  always @(posedge clk) for (int i = 0; i < 2; i++) assert (b);
+endmodule
+module top(input clk, input x, input y);
+  child c0(.clk(clk), .a(x), .b(y), .s(2'd0));
+  child c1(.clk(clk), .a(y), .b(x), .s(2'd1));
+endmodule"""
+
+
+def compile_design():
+    compilation = ps.Compilation()
+    compilation.addSyntaxTree(ps.SyntaxTree.fromText(SOURCE))
+    return build_monitors(compilation)
+
+
+def check(monitors, module_name: str, values: dict) -> PropertySet:
+    """One cycle of module_name with concrete signal values."""
+    properties = PropertySet()
+    monitors.register(properties, ["top", "child_0", "child_1"])
+    m = ExecutionManager()
+    m.properties = properties
+    m.curr_module = module_name
+    s = SymbolicState()
+    s.pc = z3.Solver()
+    s.domain = AbstractStore()
+    s.store[module_name] = {name: str(value) for name, value in values.items()}
+    monitors.reset()
+    monitors.step(m, s)
+    return properties
+
+
+def test_assertions_of_child_definitions_are_compiled_per_instance():
+    monitors = compile_design()
+    # the assertion under a loop has no guard the monitor can express
+    assert len(monitors.monitors) == 2
+    assert {monitor.module for monitor in monitors.monitors} == {"child"}
+    properties = PropertySet()
+    monitors.register(properties, ["top", "child_0", "child_1"])
+    assert sorted(properties.monitors) == sorted(f"child_{i}:{monitor.name.partition(':')[2]}" for i in (0, 1) for monitor in monitors.monitors)
+
+
+def test_immediate_assertion_checked_under_its_if():
+    monitors = compile_design()
+    if_name, case_name = (f"child_0:{monitor.name.partition(':')[2]}" for monitor in monitors.monitors)
+    properties = check(monitors, "child_0", {"a": 0, "b": 0, "s": 0})
+    assert properties.monitors[if_name].status == UNKNOWN
+    properties = check(monitors, "child_0", {"a": 1, "b": 0, "s": 0})
+    assert properties.monitors[if_name].status == VIOLATED
+    assert properties.monitors[case_name].status == UNKNOWN
+
+
+def test_immediate_assertion_checked_under_its_case_arm():
+    monitors = compile_design()
+    case_name = f"child_1:{monitors.monitors[1].name.partition(':')[2]}"
+    assert check(monitors, "child_1", {"a": 0, "b": 1, "s": 0}).monitors[case_name].status == UNKNOWN
+    assert check(monitors, "child_1", {"a": 0, "b": 1, "s": 2}).monitors[case_name].status == VIOLATED